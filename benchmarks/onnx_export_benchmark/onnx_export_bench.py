@@ -0,0 +1,76 @@
+import argparse
+import io
+import sys
+import torch
+import torch.utils.benchmark as benchmark_utils
+
+
+def prepare_transformer(bench_args):
+    layer = torch.nn.TransformerEncoderLayer(bench_args.dModel, bench_args.nHead,
+                                             dim_feedforward=bench_args.dimFeedforward)
+    model = torch.nn.TransformerEncoder(layer, bench_args.numLayers)
+    model.eval()
+    inputs = (torch.randn(bench_args.seqLength, bench_args.miniBatch, bench_args.dModel),)
+    return inputs, model
+
+
+def export(model, inputs, opset_version, parallel_constant_folding):
+    torch.onnx.export(model, inputs, io.BytesIO(), opset_version=opset_version,
+                      parallel_constant_folding=parallel_constant_folding)
+
+
+NUM_THREADS = [1, 2, 4, 8, 16, 32]
+
+
+def run_bench(bench_args):
+    inputs, model = prepare_transformer(bench_args)
+
+    print("Benchmarking ONNX export of a {}-layer transformer encoder".format(bench_args.numLayers))
+    print("Running warmup...", end=" ")
+    sys.stdout.flush()
+    for _ in range(bench_args.warmup):
+        export(model, inputs, bench_args.opsetVersion, False)
+    print("finished")
+
+    results = []
+    for num_threads in NUM_THREADS:
+        for parallel in [False, True]:
+            print("Running {} constant folding, num threads {} ...".format(
+                "parallel" if parallel else "serial", num_threads), end=" ")
+            sys.stdout.flush()
+            timer = benchmark_utils.Timer(
+                stmt="export(model, inputs, opset_version, parallel)",
+                globals={"export": export, "model": model, "inputs": inputs,
+                         "opset_version": bench_args.opsetVersion, "parallel": parallel},
+                description="transformer_{}_layers".format(bench_args.numLayers),
+                label="ONNX export",
+                sub_label=f"{'parallel' if parallel else 'serial'} constant folding, num_threads {num_threads}",
+                num_threads=num_threads)
+            result = timer.blocked_autorange(min_run_time=bench_args.timer_min_run_time)
+            print("finished")
+            print(result)
+            sys.stdout.flush()
+            results.append(result)
+
+    comparison = benchmark_utils.Compare(results)
+    comparison.trim_significant_figures()
+    comparison.highlight_warnings()
+    comparison.print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark ONNX export of a deep transformer with serial and parallel constant folding')
+
+    parser.add_argument('--numLayers', default='48', type=int)
+    parser.add_argument('--dModel', default='1024', type=int)
+    parser.add_argument('--nHead', default='16', type=int)
+    parser.add_argument('--dimFeedforward', default='4096', type=int)
+    parser.add_argument('--seqLength', default='16', type=int)
+    parser.add_argument('--miniBatch', default='1', type=int)
+    parser.add_argument('--opsetVersion', default='12', type=int)
+    parser.add_argument('--warmup', default='1', type=int)
+    parser.add_argument('--timer_min_run_time', default=60, type=int)
+
+    args = parser.parse_args()
+    run_bench(args)
@@ -0,0 +1,66 @@
+import argparse
+import sys
+import torch
+import torch_ort
+import torch.utils.benchmark as benchmark_utils
+
+
+def prepare_ops(bench_args):
+    device = torch_ort.device.cpu()
+    n = bench_args.size
+    x = torch.rand(n, n).to(device)
+    y = torch.rand(n, n).to(device)
+    bias = torch.rand(n).to(device)
+    return {
+        "add": ("torch.add(x, y)", {"x": x, "y": y}),
+        "add_alpha": ("torch.add(x, y, alpha=2)", {"x": x, "y": y}),
+        "relu": ("torch.relu(x)", {"x": x}),
+        "softmax": ("torch.softmax(x, dim=1)", {"x": x}),
+        "addmm": ("torch.addmm(bias, x, y, beta=0.5, alpha=2)", {"x": x, "y": y, "bias": bias}),
+    }
+
+
+def run_bench(bench_args):
+    ops = prepare_ops(bench_args)
+
+    print("Benchmarking ORT eager per-op latency on {0}x{0} tensors".format(bench_args.size))
+    results = []
+    for cached in [False, True]:
+        torch_ort.set_kernel_cache_enabled(cached)
+        for name, (stmt, op_globals) in ops.items():
+            print("Running {} {} ...".format(name, "kernel cache" if cached else "invoker"), end=" ")
+            sys.stdout.flush()
+            op_globals = dict(op_globals, torch=torch)
+            for _ in range(bench_args.warmup):
+                eval(stmt, op_globals)
+            timer = benchmark_utils.Timer(
+                stmt=stmt,
+                globals=op_globals,
+                description=name,
+                label="ORT eager op latency",
+                sub_label="kernel cache" if cached else "invoker.Invoke",
+                num_threads=bench_args.numThreads)
+            result = timer.blocked_autorange(min_run_time=bench_args.timer_min_run_time)
+            print("finished")
+            print(result)
+            sys.stdout.flush()
+            results.append(result)
+    torch_ort.set_kernel_cache_enabled(True)
+
+    comparison = benchmark_utils.Compare(results)
+    comparison.trim_significant_figures()
+    comparison.highlight_warnings()
+    comparison.print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark ORT eager ops run through the kernel cache against invoking kernels by name')
+
+    parser.add_argument('--size', default='16', type=int)
+    parser.add_argument('--numThreads', default='1', type=int)
+    parser.add_argument('--warmup', default='10', type=int)
+    parser.add_argument('--timer_min_run_time', default=5, type=int)
+
+    args = parser.parse_args()
+    run_bench(args)
@@ -152,7 +152,8 @@ class TestONNXRuntime(unittest.TestCase):
     def run_model_test_with_external_data(self, model, input, rtol=0.001, atol=1e-7,
                                           example_outputs=None, do_constant_folding=True,
                                           dynamic_axes=None, input_names=None, output_names=None,
-                                          ort_optim_on=True):
+                                          ort_optim_on=True, external_data_shard_size=0,
+                                          expected_external_files=None):
         import os
         import tempfile
 
@@ -179,7 +180,11 @@ class TestONNXRuntime(unittest.TestCase):
                                   keep_initializers_as_inputs=self.keep_initializers_as_inputs,
                                   dynamic_axes=dynamic_axes,
                                   input_names=input_names, output_names=output_names,
-                                  use_external_data_format=True)
+                                  use_external_data_format=True,
+                                  external_data_shard_size=external_data_shard_size)
+                if expected_external_files is not None:
+                    self.assertEqual(sorted(os.listdir(tmpdirname)),
+                                     sorted(['model.onnx'] + expected_external_files))
                 # compute onnxruntime output prediction
                 ort_sess_opt = onnxruntime.SessionOptions()
                 ort_sess_opt.graph_optimization_level = \
@@ -212,6 +217,98 @@ class TestONNXRuntime(unittest.TestCase):
         x = torch.tensor([2], dtype=torch.long)
         self.run_model_test_with_external_data(model, x)
 
+    @skipIfUnsupportedMinOpsetVersion(9)  # Because external data format was released with Opset 9.
+    def test_sharded_external_data(self):
+        class LargeModel(torch.nn.Module):
+            def __init__(self):
+                super(LargeModel, self).__init__()
+                self.lin1 = torch.nn.Linear(64, 64)
+                self.lin2 = torch.nn.Linear(64, 64)
+                self.lin3 = torch.nn.Linear(64, 128)
+
+            def forward(self, input):
+                return self.lin3(self.lin2(self.lin1(input)))
+
+        # The 16KB weights of lin1 and lin2 share a 32KB shard; the 32KB
+        # weight of lin3 does not fit after them. The biases stay inline.
+        # Without constant folding the weights keep their names, and so
+        # their order.
+        x = torch.randn(2, 64)
+        self.run_model_test_with_external_data(LargeModel(), x, rtol=1e-3, atol=1e-5,
+                                               do_constant_folding=False,
+                                               external_data_shard_size=32 * 1024,
+                                               expected_external_files=['model.onnx.data.0',
+                                                                        'model.onnx.data.1'])
+
+    def test_update_params(self):
+        model = torch.nn.Sequential(torch.nn.Linear(8, 16), torch.nn.ReLU(), torch.nn.Linear(16, 4))
+        model.eval()
+        x = torch.randn(2, 8)
+
+        f = io.BytesIO()
+        torch.onnx.export(model, x, f, opset_version=self.opset_version,
+                          do_constant_folding=False, updatable_params=True,
+                          keep_initializers_as_inputs=self.keep_initializers_as_inputs)
+        with torch.no_grad():
+            for param in model.parameters():
+                param.add_(torch.randn_like(param))
+        torch.onnx.update_params(model, f)
+
+        ort_sess = onnxruntime.InferenceSession(f.getvalue())
+        ort_compare_with_pytorch(run_ort(ort_sess, (x,)), (model(x),), rtol=1e-3, atol=1e-6)
+
+        # The structure of the module is checked
+        model[1] = torch.nn.Tanh()
+        with self.assertRaisesRegex(RuntimeError, "not exported from a module with the same"):
+            torch.onnx.update_params(model, f)
+
+        # Models are only updatable when exported with updatable_params
+        f = io.BytesIO()
+        torch.onnx.export(model, x, f, opset_version=self.opset_version,
+                          do_constant_folding=False,
+                          keep_initializers_as_inputs=self.keep_initializers_as_inputs)
+        with self.assertRaisesRegex(RuntimeError, "updatable_params=True"):
+            torch.onnx.update_params(model, f)
+
+    @skipIfUnsupportedMinOpsetVersion(9)  # Because external data format was released with Opset 9.
+    def test_update_params_with_external_data(self):
+        import os
+        import tempfile
+
+        model = torch.nn.Sequential(torch.nn.Linear(64, 64), torch.nn.Linear(64, 128))
+        model.eval()
+        x = torch.randn(2, 64)
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            model_file_name = os.path.join(tmpdirname, 'model.onnx')
+            torch.onnx.export(model, x, model_file_name, opset_version=self.opset_version,
+                              do_constant_folding=False, updatable_params=True,
+                              keep_initializers_as_inputs=self.keep_initializers_as_inputs,
+                              use_external_data_format=True,
+                              external_data_shard_size=32 * 1024)
+            new_model = copy.deepcopy(model)
+            with torch.no_grad():
+                for param in new_model.parameters():
+                    param.add_(torch.randn_like(param))
+
+            # A mismatch in any parameter leaves all external data untouched
+            def read_external_data():
+                return [open(os.path.join(tmpdirname, name), 'rb').read()
+                        for name in ['model.onnx.data.0', 'model.onnx.data.1']]
+            external_data = read_external_data()
+            bad_state_dict = new_model.state_dict()
+            bad_state_dict['1.bias'] = torch.randn(64)
+            with self.assertRaisesRegex(RuntimeError, 'dtype and shape'):
+                torch.onnx.update_params(model, model_file_name, state_dict=bad_state_dict)
+            self.assertEqual(read_external_data(), external_data)
+
+            torch.onnx.update_params(model, model_file_name, state_dict=new_model.state_dict())
+            self.assertEqual(sorted(os.listdir(tmpdirname)),
+                             ['model.onnx', 'model.onnx.data.0', 'model.onnx.data.1'])
+
+            ort_sess = onnxruntime.InferenceSession(model_file_name)
+            ort_compare_with_pytorch(run_ort(ort_sess, (x,)), (new_model(x),), rtol=1e-3, atol=1e-6)
+
     @skipIfUnsupportedMinOpsetVersion(9)  # Because external data format was released with Opset 9.
     def test_mobilenet_v2_with_external_data(self):
         model = torchvision.models.mobilenet_v2(pretrained=True)
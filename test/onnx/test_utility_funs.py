@@ -15,6 +15,7 @@ import onnx
 
 import io
 import copy
+import tempfile
 import unittest
 
 
@@ -286,6 +287,41 @@ class TestUtilityFuns(TestCase):
             assert node.kind() != "onnx::Unsqueeze"
         assert len(list(graph.nodes())) == 3
 
+    def test_constant_fold_parallel(self):
+        class GruNet(torch.nn.Module):
+            def __init__(self):
+                super(GruNet, self).__init__()
+                self.mygru = torch.nn.GRU(7, 3, 2, bidirectional=True)
+
+            def forward(self, input, initial_state):
+                return self.mygru(input, initial_state)
+
+        _set_opset_version(self.opset_version)
+        _set_operator_export_type(OperatorExportTypes.ONNX)
+        model = GruNet()
+        input = torch.randn(5, 3, 7)
+        h0 = torch.randn(4, 3, 3)
+
+        def model_to_graph(parallel_constant_folding):
+            return utils._model_to_graph(model, (input, h0),
+                                         _disable_torch_constant_prop=True,
+                                         training=TrainingMode.EVAL,
+                                         use_new_jit_passes=self.use_new_jit_passes,
+                                         parallel_constant_folding=parallel_constant_folding)
+
+        graph, params_dict, _ = model_to_graph(False)
+        parallel_graph, parallel_params_dict, _ = model_to_graph(True)
+
+        # Only the names of the folded initializers may differ
+        self.assertEqual([node.kind() for node in parallel_graph.nodes()],
+                         [node.kind() for node in graph.nodes()])
+        self.assertEqual(len(parallel_params_dict), len(params_dict))
+        for node, parallel_node in zip(graph.nodes(), parallel_graph.nodes()):
+            for value, parallel_value in zip(node.inputs(), parallel_node.inputs()):
+                if value.debugName() in params_dict:
+                    self.assertEqual(parallel_params_dict[parallel_value.debugName()],
+                                     params_dict[value.debugName()])
+
     def test_constant_fold_transpose_matmul(self):
         class MatMulNet(torch.nn.Module):
             def __init__(self):
@@ -470,6 +506,78 @@ class TestUtilityFuns(TestCase):
         # test strip_doc_string=False
         self.assertFalse(is_model_stripped(io.BytesIO(), False))
 
+    def test_symbolic_registry_lookup(self):
+        import torch.onnx.symbolic_registry as sym_registry
+        import torch.onnx.symbolic_opset9
+
+        def custom_add(g, self, other, alpha=None):
+            return g.op("Add", self, other)
+
+        domain = "test_registry_domain"
+        version = self.opset_version
+        sym_registry.register_op("add", custom_add, domain, version)
+        sym_registry.register_version(domain, version)
+
+        # ops registered before the version keep precedence over builtins
+        self.assertIs(sym_registry.get_registered_op("add", domain, version), custom_add)
+        # builtin symbolics are resolved on first lookup only
+        self.assertNotIn("mul", sym_registry._registry[(domain, version)])
+        mul = sym_registry.get_registered_op("mul", domain, version)
+        self.assertIs(mul, torch.onnx.symbolic_opset9.mul)
+        self.assertIs(sym_registry._registry[(domain, version)]["mul"], mul)
+        self.assertEqual(sym_registry.get_registered_op("list", domain, version).__name__, "_list")
+        self.assertFalse(sym_registry.is_registered_op("_list", domain, version))
+        self.assertFalse(sym_registry.is_registered_op("not_an_op", domain, version))
+        with self.assertRaisesRegex(RuntimeError, "not_an_op"):
+            sym_registry.get_registered_op("not_an_op", domain, version)
+
+    def test_export_cache(self):
+        traced_calls = []
+
+        class MyModule(torch.nn.Module):
+            def __init__(self):
+                super(MyModule, self).__init__()
+                self.linear = torch.nn.Linear(4, 3)
+                self.scale = torch.tensor(2.)
+
+            def forward(self, x):
+                if torch.jit.is_tracing():
+                    traced_calls.append(x)
+                return torch.relu(self.linear(x)) * self.scale
+
+        model = MyModule()
+        x = torch.randn(2, 4)
+
+        def export(model, x):
+            f = io.BytesIO()
+            torch_out = torch.onnx.export(model, x, f, opset_version=self.opset_version,
+                                          export_cache_dir=cache_dir)
+            # Hits and misses both return the outputs of the model
+            self.assertEqual(torch_out, model(x))
+            return f.getvalue()
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proto = export(model, x)
+            self.assertEqual(len(traced_calls), 1)
+            # A hit writes the cached model without tracing the model
+            self.assertEqual(export(model, x), proto)
+            self.assertEqual(len(traced_calls), 1)
+            # Inputs of another shape, new weights, new tensor attributes and
+            # other options miss
+            export(model, torch.randn(5, 4))
+            self.assertEqual(len(traced_calls), 2)
+            with torch.no_grad():
+                model.linear.weight.add_(1)
+            self.assertNotEqual(export(model, x), proto)
+            self.assertEqual(len(traced_calls), 3)
+            model.scale = torch.tensor(3.)
+            export(model, x)
+            self.assertEqual(len(traced_calls), 4)
+            f = io.BytesIO()
+            torch.onnx.export(model, x, f, opset_version=self.opset_version,
+                              input_names=['x'], export_cache_dir=cache_dir)
+            self.assertEqual(len(traced_calls), 5)
+
     # NB: remove this test once DataParallel can be correctly handled
     def test_error_on_data_parallel(self):
         model = torch.nn.DataParallel(torch.nn.ReflectionPad2d((1, 2, 3, 4)))
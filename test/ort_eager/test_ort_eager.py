@@ -1,3 +1,6 @@
+import json
+import os
+import tempfile
 import unittest
 import torch
 import torch_ort
@@ -22,6 +25,31 @@ class TestCustomOps(unittest.TestCase):
         z_pt = x.cpu() - y.cpu()
         assert torch.allclose(z.cpu(), z_pt)
     
+    def test_add_alpha(self):
+        device = torch_ort.device.cpu()
+        x = torch.rand(5, 3)
+        y = torch.rand(5, 3)
+        for alpha in [1, 2.5]:
+            z = torch.add(x.to(device), y.to(device), alpha=alpha)
+            assert torch.allclose(z.cpu(), torch.add(x, y, alpha=alpha))
+            z = torch.sub(x.to(device), y.to(device), alpha=alpha)
+            assert torch.allclose(z.cpu(), torch.sub(x, y, alpha=alpha))
+
+    def test_integer_and_half_dtypes(self):
+        device = torch_ort.device.cpu()
+        x = torch.randint(-100, 100, (5, 3), dtype=torch.int64)
+        y = torch.randint(-100, 100, (5, 3), dtype=torch.int64)
+        big = 2 ** 40 + 1
+        z = torch.add(x.to(device), y.to(device), alpha=big)
+        assert z.dtype == torch.int64
+        assert torch.equal(z.cpu(), torch.add(x, y, alpha=big))
+        with self.assertRaisesRegex(RuntimeError, 'alpha must not be a floating point'):
+            torch.add(x.to(device), y.to(device), alpha=2.5)
+        for dtype in [torch.int8, torch.uint8, torch.int32, torch.float16]:
+            ort_x = x.to(dtype).to(device)
+            assert ort_x.dtype == dtype
+            assert torch.equal(ort_x.cpu(), x.to(dtype))
+
     def test_relu(self):
         device = torch_ort.device.apollo()
         x = torch.empty(5, 3, device = device)
@@ -29,6 +57,450 @@ class TestCustomOps(unittest.TestCase):
         z_pt = torch.relu(x.cpu())
         assert torch.allclose(z.cpu(), z_pt)
 
-    
+    def _assert_backward_matches_cpu(self, fn, *inputs):
+        device = torch_ort.device.cpu()
+        cpu_inputs = [x.clone().requires_grad_(x.is_floating_point()) for x in inputs]
+        ort_inputs = [x.detach().to(device).requires_grad_(x.is_floating_point()) for x in inputs]
+        cpu_out = fn(*cpu_inputs)
+        ort_out = fn(*ort_inputs)
+        assert ort_out.device == device
+        assert torch.allclose(ort_out.cpu(), cpu_out, atol=1e-5)
+        cpu_out.sum().backward()
+        ort_out.sum().backward()
+        for cpu_x, ort_x in zip(cpu_inputs, ort_inputs):
+            if cpu_x.requires_grad:
+                assert ort_x.grad.device == device
+                assert torch.allclose(ort_x.grad.cpu(), cpu_x.grad, atol=1e-5)
+
+    def test_classification_loss_backward(self):
+        x = torch.rand(8, 10)
+        target = torch.randint(0, 10, (8,))
+        target[3] = -100
+        weight = torch.rand(10)
+        self._assert_backward_matches_cpu(
+            lambda x, t: torch.nn.functional.cross_entropy(x, t), x, target)
+        self._assert_backward_matches_cpu(
+            lambda x, t, w: torch.nn.functional.nll_loss(
+                torch.log_softmax(x, dim=1), t, weight=w, reduction='sum'),
+            x, target, weight)
+        self._assert_backward_matches_cpu(
+            lambda x: torch.softmax(x, dim=-1) * x, x)
+
+    def test_transformer_layers_backward(self):
+        x = torch.rand(2, 4, 16)
+        weight = torch.rand(16)
+        bias = torch.rand(16)
+        self._assert_backward_matches_cpu(
+            lambda x, w, b: torch.nn.functional.gelu(
+                torch.nn.functional.layer_norm(x, (16,), w, b)),
+            x, weight, bias)
+        embedding_weight = torch.rand(20, 16)
+        indices = torch.tensor([[0, 3, 3, 7], [19, 0, 2, 3]])
+        self._assert_backward_matches_cpu(
+            lambda w, i: torch.nn.functional.embedding(i, w, padding_idx=3),
+            embedding_weight, indices)
+
+    def test_dropout(self):
+        device = torch_ort.device.cpu()
+        x = torch.ones(1000).to(device).requires_grad_()
+        y = torch.nn.functional.dropout(x, p=0.25, training=True)
+        y.sum().backward()
+        y = y.cpu()
+        assert set(y.unique().tolist()) <= {0, 1 / 0.75}
+        assert 600 < (y > 0).sum().item() < 900
+        assert torch.equal(x.grad.cpu(), y)
+        # Masks are drawn from the torch generator
+        masks = []
+        for _ in range(2):
+            torch.manual_seed(0)
+            masks.append(torch.nn.functional.dropout(x, p=0.25).cpu())
+        assert torch.equal(*masks)
+
+    def test_profiler(self):
+        device = torch_ort.device.cpu()
+        x = torch.rand(5, 3).to(device)
+        torch_ort.profiler.reset()
+        torch_ort.profiler.set_enabled(True)
+        try:
+            with torch.autograd.profiler.profile() as prof:
+                y = torch.add(x, x, alpha=2).relu().cpu()
+        finally:
+            torch_ort.profiler.set_enabled(False)
+
+        stats = {(s['kind'], s['name']): s for s in torch_ort.profiler.stats()}
+        assert stats[('aten', 'aten::add.Tensor')]['count'] == 1
+        assert stats[('aten', 'aten::add.Tensor')]['bytes'] >= y.numel() * 4
+        assert stats[('kernel', 'Mul+Add')]['count'] == 1
+        assert stats[('copy', 'copy_ort_to_cpu')]['count'] == 1
+        assert 'aten::add.Tensor' in torch_ort.profiler.table()
+        assert any(e.name == 'ort::Mul+Add' for e in prof.function_events)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.json')
+            torch_ort.profiler.export_chrome_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+        names = [e['name'] for e in trace['traceEvents']]
+        assert 'aten::relu' in names and 'Relu' in names
+
+        # Nothing is recorded while disabled
+        torch.add(x, x, alpha=2)
+        stats = {(s['kind'], s['name']): s for s in torch_ort.profiler.stats()}
+        assert stats[('aten', 'aten::add.Tensor')]['count'] == 1
+        torch_ort.profiler.reset()
+        assert torch_ort.profiler.stats() == []
+
+    def test_fused_elementwise_chain(self):
+        device = torch_ort.device.cpu()
+        x = torch.rand(5, 3)
+        y = torch.rand(3)
+        torch_ort.profiler.reset()
+        torch_ort.profiler.set_enabled(True)
+        try:
+            z = torch.sub(x.to(device), y.to(device), alpha=2)
+            w = x.to(device)
+            w.add_(y.to(device), alpha=0.5)
+            v = torch.add(x.to(device), y.to(device))
+        finally:
+            torch_ort.profiler.set_enabled(False)
+
+        assert torch.allclose(z.cpu(), torch.sub(x, y, alpha=2))
+        assert torch.allclose(w.cpu(), torch.add(x, y, alpha=0.5))
+        assert torch.allclose(v.cpu(), x + y)
+
+        # The intermediate product with alpha is never a kernel output, and
+        # an alpha of one runs the remaining node alone
+        kernels = {s['name']: s['count'] for s in torch_ort.profiler.stats()
+            if s['kind'] == 'kernel'}
+        torch_ort.profiler.reset()
+        assert kernels == {'Mul+Sub': 1, 'Mul+Add': 1, 'Add': 1}
+
+    def test_kernel_handles(self):
+        # Kernel handles are reused across calls, but must not share a
+        # session between attribute values or input types
+        device = torch_ort.device.cpu()
+        x = torch.randn(4, 3)
+        for dim in [0, 1, 0]:
+            y = torch.softmax(x.to(device), dim=dim)
+            assert torch.allclose(y.cpu(), torch.softmax(x, dim=dim))
+        for dtype in [torch.float, torch.double, torch.float]:
+            y = torch.relu(x.to(dtype).to(device))
+            assert y.dtype == dtype
+            assert torch.allclose(y.cpu(), torch.relu(x.to(dtype)))
+
+    def test_kernel_cache_matches_invoker(self):
+        device = torch_ort.device.cpu()
+        x = torch.rand(4, 3)
+        y = torch.rand(3, 5)
+        bias = torch.rand(5)
+        results = []
+        try:
+            for enabled in [True, False]:
+                torch_ort.set_kernel_cache_enabled(enabled)
+                assert torch_ort.is_kernel_cache_enabled() == enabled
+                # A session compiled for one alpha and beta is not reused for another
+                results.append([
+                    torch.addmm(bias.to(device), x.to(device), y.to(device),
+                                beta=beta, alpha=alpha).cpu()
+                    for alpha, beta in [(1, 1), (2, 0.5), (0.25, 3)]])
+        finally:
+            torch_ort.set_kernel_cache_enabled(True)
+        for alpha, beta, cached, uncached in zip(
+                [1, 2, 0.25], [1, 0.5, 3], *results):
+            expected = torch.addmm(bias, x, y, beta=beta, alpha=alpha)
+            assert torch.allclose(cached, expected)
+            assert torch.allclose(uncached, expected)
+
+    def test_log_level(self):
+        saved_level = torch_ort.get_log_level()
+        try:
+            torch_ort.set_log_level(5)
+            assert torch_ort.get_log_level() == 5
+            torch_ort.set_log_level(100)
+            assert torch_ort.get_log_level() == 6
+        finally:
+            torch_ort.set_log_level(saved_level)
+
+    def test_views_alias_storage(self):
+        device = torch_ort.device.cpu()
+        x_cpu = torch.tensor([[-1., 2., -3.], [4., -5., 6.]])
+        x = x_cpu.to(device)
+        flat = x.view(6)
+        transposed = x.t()
+        expanded = x.unsqueeze(0).expand(2, 2, 3)
+        torch.relu_(flat)
+        x_cpu = torch.relu(x_cpu)
+        assert torch.allclose(x.cpu(), x_cpu)
+        assert torch.allclose(transposed.cpu(), x_cpu.t())
+        assert torch.allclose(expanded.cpu(), x_cpu.expand(2, 2, 3))
+        assert torch.allclose(x.reshape(3, 2).cpu(), x_cpu.reshape(3, 2))
+
+    def test_zero_copy_transfer(self):
+        x_cpu = torch.rand(4, 3)
+        x = torch_ort.from_cpu(x_cpu)
+        assert x.device.type == 'ort'
+        x.relu_()
+        assert torch.allclose(x_cpu, x.cpu())
+        y = torch_ort.to_cpu(x.t())
+        assert y.device.type == 'cpu'
+        y.zero_()
+        assert not x_cpu.any()
+        del x_cpu
+        assert not x.cpu().any()
+
+    def test_lazy_mode(self):
+        device = torch_ort.device.cpu()
+        x = torch.rand(5, 3)
+        y = torch.rand(5, 3)
+        torch_ort.set_lazy_mode(True)
+        try:
+            assert torch_ort.is_lazy_mode_enabled()
+            z = torch.relu((x.to(device) + y.to(device)) * y.to(device))
+            z_pt = torch.relu((x + y) * y)
+            assert z.size() == z_pt.size()
+            assert torch.allclose(z.cpu(), z_pt)
+            # Released intermediates are not graph outputs, and a graph
+            # with nothing left to observe is dropped
+            w = x.to(device) + y.to(device)
+            v = w * y.to(device)
+            del w
+            assert torch.allclose(v.cpu(), (x + y) * y)
+            v = x.to(device) - y.to(device)
+            del v
+            torch_ort.synchronize()
+        finally:
+            torch_ort.set_lazy_mode(False)
+        assert not torch_ort.is_lazy_mode_enabled()
+
+    def test_async_mode(self):
+        device = torch_ort.device.cpu()
+        x = torch.rand(5, 3)
+        y = torch.rand(5, 3)
+        torch_ort.set_async_mode(True)
+        try:
+            assert torch_ort.is_async_mode_enabled()
+            z = torch.relu((x.to(device) + y.to(device)) * y.to(device))
+            z.add_(y.to(device))
+            torch_ort.synchronize()
+            z_pt = torch.relu((x + y) * y) + y
+            assert torch.allclose(z.cpu(), z_pt)
+            # Errors of queued kernels surface at the next sync point: only
+            # the Gather kernel checks that the indices are in range
+            torch.nn.functional.embedding(
+                torch.tensor([0, 7]).to(device), torch.rand(5, 3).to(device))
+            with self.assertRaises(RuntimeError):
+                torch_ort.synchronize()
+        finally:
+            torch_ort.set_async_mode(False)
+        assert not torch_ort.is_async_mode_enabled()
+
+    def test_device_config(self):
+        torch_ort.set_device_config(
+            device_index=3,
+            intra_op_num_threads=2,
+            inter_op_num_threads=1,
+            allow_spinning=False)
+        config = torch_ort.get_device_config(3)
+        assert config['intra_op_num_threads'] == 2
+        assert not config['allow_spinning']
+        x = torch.rand(5, 3)
+        y = torch.relu(x.to(torch_ort.device.cpu(3)))
+        assert torch.allclose(y.cpu(), torch.relu(x))
+        with self.assertRaises(RuntimeError):
+            torch_ort.set_device_config(device_index=3, intra_op_num_threads=4)
+
+    def test_caching_allocator(self):
+        device = torch_ort.device.cpu()
+        torch_ort.empty_cache()
+        x = torch.rand(64, 64).to(device)
+        allocated = torch_ort.memory_allocated()
+        y = torch.relu(x)
+        assert torch_ort.memory_allocated() > allocated
+        del y
+        assert torch_ort.memory_allocated() == allocated
+        hits = torch_ort.memory_stats()['num_cache_hits']
+        y = torch.relu(x)
+        assert torch_ort.memory_stats()['num_cache_hits'] > hits
+        assert torch_ort.max_memory_allocated() >= torch_ort.memory_allocated()
+        del y
+        reserved = torch_ort.memory_stats()['reserved_bytes']
+        torch_ort.empty_cache()
+        assert torch_ort.memory_stats()['reserved_bytes'] < reserved
+
+    def test_in_place_binds_self(self):
+        device = torch_ort.device.cpu()
+        x_cpu = torch.rand(3, 4) - 0.5
+        x = x_cpu.to(device)
+        torch_ort.reset_in_place_stats()
+        x.relu_()
+        assert torch.allclose(x.cpu(), x_cpu.relu())
+        assert torch_ort.in_place_stats()['aten::relu_']['in_place'] == 1
+        # A transposed view is still dense and is bound in place
+        x = x_cpu.to(device)
+        x.t().relu_()
+        assert torch.allclose(x.cpu(), x_cpu.relu())
+        assert torch_ort.in_place_stats()['aten::relu_']['in_place'] == 2
+        # A view with gaps between its elements cannot be bound as a kernel
+        # output
+        x = x_cpu.to(device)
+        x.as_strided((3, 2), (4, 2)).relu_()
+        expected = x_cpu.clone()
+        expected.as_strided((3, 2), (4, 2)).relu_()
+        assert torch.allclose(x.cpu(), expected)
+        assert torch_ort.in_place_stats()['aten::relu_']['copy'] == 1
+
+    def test_multiple_outputs(self):
+        device = torch_ort.device.cpu()
+        x_cpu = torch.rand(4, 5)
+        x = x_cpu.to(device)
+        values, indices = torch.topk(x, 3)
+        expected_values, expected_indices = torch.topk(x_cpu, 3)
+        assert indices.dtype == torch.int64
+        assert torch.allclose(values.cpu(), expected_values)
+        assert torch.equal(indices.cpu(), expected_indices)
+        values, indices = torch.max(x, 1)
+        expected_values, expected_indices = torch.max(x_cpu, 1)
+        assert torch.allclose(values.cpu(), expected_values)
+        assert torch.equal(indices.cpu(), expected_indices)
+        values, indices = torch.sort(x, descending=True)
+        expected_values, expected_indices = torch.sort(x_cpu, descending=True)
+        assert torch.allclose(values.cpu(), expected_values)
+        assert torch.equal(indices.cpu(), expected_indices)
+
+    def test_out_binds_output(self):
+        device = torch_ort.device.cpu()
+        a_cpu = torch.rand(3, 4)
+        b_cpu = torch.rand(3, 4)
+        a = a_cpu.to(device)
+        b = b_cpu.to(device)
+        out = torch.empty(3, 4).to(device)
+        data_ptr = out.data_ptr()
+        torch_ort.reset_in_place_stats()
+        torch.add(a, b, out=out)
+        assert out.data_ptr() == data_ptr
+        assert torch.allclose(out.cpu(), a_cpu + b_cpu)
+        assert torch_ort.in_place_stats()['aten::add.out']['in_place'] == 1
+        # An out tensor overlapping an input is written after the kernel runs
+        torch.mul(a, b, out=a)
+        assert torch.allclose(a.cpu(), a_cpu * b_cpu)
+        assert torch_ort.in_place_stats()['aten::mul.out']['copy'] == 1
+
+    def test_type_promotion(self):
+        device = torch_ort.device.cpu()
+        a_cpu = torch.rand(3, 4)
+        b_cpu = torch.rand(3, 4, dtype=torch.float64)
+        i_cpu = torch.tensor([[1, 2, 3, 4]])
+        a = a_cpu.to(device)
+        b = b_cpu.to(device)
+        i = i_cpu.to(device)
+        c = a + b
+        assert c.dtype == torch.float64
+        assert torch.allclose(c.cpu(), a_cpu + b_cpu)
+        c = a * i
+        assert c.dtype == torch.float32
+        assert torch.allclose(c.cpu(), a_cpu * i_cpu)
+        c = i + 2.5
+        assert c.dtype == torch.float32
+        assert torch.allclose(c.cpu(), i_cpu + 2.5)
+        # True division of integers
+        c = i / i
+        assert c.dtype == torch.float32
+        assert torch.allclose(c.cpu(), i_cpu / i_cpu)
+        # In-place results are cast back to self
+        a.add_(b)
+        assert a.dtype == torch.float32
+        assert torch.allclose(a.cpu(), a_cpu + b_cpu)
+        with self.assertRaises(RuntimeError):
+            i.add_(a)
+        with self.assertRaises(RuntimeError):
+            i.div_(2)
+        # self cannot be broadcast by an in-place op
+        with self.assertRaises(RuntimeError):
+            i.add_(torch.ones(2, 4, dtype=torch.int64).to(device))
+
+    def test_channels_last(self):
+        device = torch_ort.device.cpu()
+        channels_last = torch.channels_last
+        x_cpu = torch.rand(2, 3, 4, 5).contiguous(memory_format=channels_last)
+        y_cpu = torch.rand(2, 3, 4, 5).contiguous(memory_format=channels_last)
+        x = x_cpu.to(device)
+        y = y_cpu.to(device)
+        assert x.stride() == x_cpu.stride()
+        # Elementwise results keep the layout of their operands
+        z = torch.relu(x) + y
+        assert z.is_contiguous(memory_format=channels_last)
+        assert torch.allclose(z.cpu(), torch.relu(x_cpu) + y_cpu)
+        torch_ort.reset_in_place_stats()
+        x.mul_(y)
+        assert x.is_contiguous(memory_format=channels_last)
+        assert torch.allclose(x.cpu(), x_cpu * y_cpu)
+        assert torch_ort.in_place_stats()['aten::mul_.Tensor']['in_place'] == 1
+        # Operands in different layouts are gathered
+        w = x + x_cpu.contiguous().to(device)
+        assert torch.allclose(w.cpu(), x_cpu * y_cpu + x_cpu)
+
+        e = torch.empty(2, 3, 4, 5, device=device, memory_format=channels_last)
+        assert e.is_contiguous(memory_format=channels_last)
+        e = torch.empty_strided((2, 3), (1, 2), device=device)
+        assert e.stride() == (1, 2)
+
+    def test_cat(self):
+        device = torch_ort.device.cpu()
+        a_cpu = torch.rand(2, 3)
+        b_cpu = torch.rand(4, 3, dtype=torch.float64)
+        a = a_cpu.to(device)
+        b = b_cpu.to(device)
+        c = torch.cat([a, torch.empty(0, device=device), b])
+        assert c.dtype == torch.float64
+        assert torch.allclose(c.cpu(), torch.cat([a_cpu, b_cpu]))
+        assert torch.allclose(torch.cat([a, a], dim=-1).cpu(), torch.cat([a_cpu, a_cpu], dim=-1))
+
+    @unittest.skipUnless(torch.distributed.is_available(), 'torch.distributed is not available')
+    def test_distributed_data_parallel(self):
+        world_size = 2
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            init_method = 'file://' + f.name
+        try:
+            torch.multiprocessing.spawn(
+                _run_distributed_data_parallel,
+                args=(world_size, init_method),
+                nprocs=world_size)
+        finally:
+            if os.path.exists(f.name):
+                os.unlink(f.name)
+
+
+def _run_distributed_data_parallel(rank, world_size, init_method):
+    import torch.distributed as dist
+    device = torch_ort.device.cpu()
+    dist.init_process_group('ort', init_method=init_method, rank=rank, world_size=world_size)
+    try:
+        # Collectives work on the buffers of ORT tensors in place
+        x = torch.full((8,), rank + 1.).to(device)
+        dist.all_reduce(x)
+        assert x.device == device
+        assert torch.equal(x.cpu(), torch.full((8,), world_size * (world_size + 1) / 2))
+
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(
+            torch.nn.Linear(10, 16), torch.nn.ReLU(), torch.nn.Linear(16, 4))
+        ort_module = torch.nn.Sequential(
+            torch.nn.Linear(10, 16), torch.nn.ReLU(), torch.nn.Linear(16, 4)).to(device)
+        ort_module.load_state_dict(
+            {k: v.to(device) for k, v in model.state_dict().items()})
+        ort_model = torch.nn.parallel.DistributedDataParallel(ort_module, bucket_cap_mb=1e-4)
+
+        # Each rank runs its shard of the batch; the gradients DDP averages
+        # across ranks are those of the whole batch on one process
+        inputs = torch.rand(world_size * 5, 10)
+        (model(inputs).sum() / world_size).backward()
+        ort_model(inputs[rank * 5:(rank + 1) * 5].to(device)).sum().backward()
+        for p, ort_p in zip(model.parameters(), ort_model.module.parameters()):
+            assert ort_p.grad.device == device
+            assert torch.allclose(ort_p.grad.cpu(), p.grad, atol=1e-5)
+    finally:
+        dist.destroy_process_group()
+
+
 if __name__ == '__main__':
     unittest.main()
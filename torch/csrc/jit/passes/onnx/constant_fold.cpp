@@ -2,8 +2,10 @@
 #include <c10/util/Exception.h>
 #include <torch/csrc/jit/passes/onnx/helper.h>
 
+#include <ATen/Parallel.h>
 #include <c10/util/Optional.h>
 #include <algorithm>
+#include <unordered_set>
 
 namespace torch {
 namespace jit {
@@ -376,6 +378,87 @@ std::vector<Node*> getOnnxConstParentsToRemove(Node* node) {
   return parentNodes;
 }
 
+// Creates a new input to the block (prim::Param node output) holding
+// 'updatedVal', adds a corresponding entry in valToParamMap, replaces the
+// downstream uses of the output of 'node' with it and disconnects all the
+// input values of 'node', which is left for the caller to destroy.
+void replaceWithInitializer(
+    Block* b,
+    Node* node,
+    const at::Tensor& updatedVal,
+    ValueToParamPairMap& valsToParamsMap) {
+  auto newSourceNodeOutput = b->addInput();
+  valsToParamsMap.insert(
+      {newSourceNodeOutput,
+       std::make_pair(newSourceNodeOutput->debugName(), updatedVal)});
+  newSourceNodeOutput->inferTypeFrom(updatedVal);
+  node->outputs().at(0)->replaceAllUsesWith(newSourceNodeOutput);
+
+  // Before we start de-wiring this node, we check if any parents of this
+  // nodes were onnx::Constant and remove them first (following proper
+  // sequence as shown below). If the parent was an initializer (not
+  // onnx::Constant) then they are all removed by eraseUnusedBlockInputs()
+  // call once folding is done.
+  auto onnxConstParents = getOnnxConstParentsToRemove(node);
+  node->removeAllInputs();
+  for (auto* n : onnxConstParents) {
+    n->destroy();
+  }
+}
+
+// Folds the block in waves. Each wave collects the nodes whose inputs are
+// all constant at that point. No node of a wave depends on another, so
+// their torch kernels are run on the intra-op thread pool, and the graph
+// is then updated serially in node order. The next wave picks up the nodes
+// that only became constant through the folds of the previous one.
+//
+// The folded graph is the same as the one the serial pass produces, but
+// the folded initializers are created in a different order and so get
+// different names.
+void constantFoldInWaves(
+    Block* b,
+    ValueToParamPairMap& valsToParamsMap,
+    int opset_version) {
+  std::unordered_set<Node*> unsupportedNodes;
+  while (true) {
+    std::vector<Node*> wave;
+    for (auto node : b->nodes()) {
+      if (node->outputs().size() > 1 || node->inputs().empty() ||
+          unsupportedNodes.count(node) ||
+          !areNodeInputsConstant(node, valsToParamsMap)) {
+        continue;
+      }
+      wave.push_back(node);
+    }
+    if (wave.empty()) {
+      break;
+    }
+
+    std::vector<std::vector<at::Tensor>> waveInputs;
+    waveInputs.reserve(wave.size());
+    for (auto node : wave) {
+      waveInputs.push_back(getValues(node, valsToParamsMap));
+    }
+    std::vector<c10::optional<at::Tensor>> waveOutputs(wave.size());
+    at::parallel_for(0, wave.size(), 1, [&](int64_t begin, int64_t end) {
+      for (auto i = begin; i < end; i++) {
+        waveOutputs[i] =
+            runTorchBackendForOnnx(wave[i], waveInputs[i], opset_version);
+      }
+    });
+
+    for (size_t i = 0; i < wave.size(); i++) {
+      if (waveOutputs[i] == c10::nullopt) {
+        // Constant folding is not supported for this op. Skip it.
+        unsupportedNodes.insert(wave[i]);
+        continue;
+      }
+      replaceWithInitializer(b, wave[i], *waveOutputs[i], valsToParamsMap);
+      wave[i]->destroy();
+    }
+  }
+}
+
 } // Anonymous namespace
 
 // This method updates the block in-place to fold all the one-time
@@ -386,7 +469,14 @@ std::vector<Node*> getOnnxConstParentsToRemove(Node* node) {
 // This is more of a partial evaluation analysis, where operations on constant
 // nodes can be lifted so we run them earlier, before the usual parameters are
 // known.
-void ConstantFoldONNX(Block* b, ParamMap& paramsDict, int opset_version) {
+//
+// With 'parallel' set, independent constant subgraphs are folded
+// concurrently, see constantFoldInWaves.
+void ConstantFoldONNX(
+    Block* b,
+    ParamMap& paramsDict,
+    int opset_version,
+    bool parallel) {
   if (opset_version != ONNX_OPSET_9 && opset_version != ONNX_OPSET_10 &&
       opset_version != ONNX_OPSET_11 && opset_version != ONNX_OPSET_12) {
     // Number of elements of 'axes' and 'ends' 1-D input tensors should be the
@@ -400,6 +490,13 @@ void ConstantFoldONNX(Block* b, ParamMap& paramsDict, int opset_version) {
   auto valsToParamsMap = buildValueToParamsMap(b, paramsDict);
   // Only the root block is constant-folded. Folding nested blocks is
   // not supported for now.
+  if (parallel) {
+    constantFoldInWaves(b, valsToParamsMap, opset_version);
+    eraseUnusedValuesFromMap(valsToParamsMap);
+    eraseUnusedBlockInputs(b);
+    buildParamsMapFromValueToParamsMap(valsToParamsMap, paramsDict);
+    return;
+  }
   for (auto it = b->nodes().begin(), end = b->nodes().end(); it != end; ++it) {
     auto node = *it;
     if (node->outputs().size() > 1) {
@@ -424,29 +521,9 @@ void ConstantFoldONNX(Block* b, ParamMap& paramsDict, int opset_version) {
       // Constant folding is not supported for this op. Skip it.
       continue;
     }
-    // Create a new input to the block (prim::Param node output). Add a
-    // corresponding entryin valToParamMap. Replace the downstream inputs
-    // with this value, and disconnect all the input values of the folded node.
-    at::Tensor updatedVal = *updatedValWrapped;
-    auto newSourceNodeOutput = b->addInput();
-    valsToParamsMap.insert(
-        {newSourceNodeOutput,
-         std::make_pair(newSourceNodeOutput->debugName(), updatedVal)});
-    newSourceNodeOutput->inferTypeFrom(updatedVal);
-    node->outputs().at(0)->replaceAllUsesWith(newSourceNodeOutput);
-
-    // Next we remove the current node that has been replaced by
-    // an initializer. But before we start de-wiring this node,
-    // we check if any parents of this nodes were onnx::Constant
-    // and remove them first (following proper sequence as shown
-    // below), and then remove the current node. If the parent was
-    // an initializer (not onnx::Constant) then they are all removed
-    // by eraseUnusedBlockInputs() call (below) outside the loop.
-    auto onnxConstParents = getOnnxConstParentsToRemove(node);
-    node->removeAllInputs();
-    for (auto* n : onnxConstParents) {
-      n->destroy();
-    }
+    // Replace the output of the node with an initializer, then remove
+    // the node itself.
+    replaceWithInitializer(b, node, *updatedValWrapped, valsToParamsMap);
     it.destroyCurrent();
   }
   eraseUnusedValuesFromMap(valsToParamsMap);
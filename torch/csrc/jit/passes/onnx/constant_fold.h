@@ -12,7 +12,8 @@ const int ONNX_OPSET_12 = 12;
 void ConstantFoldONNX(
     Block* b,
     std::map<std::string, IValue>& paramDict,
-    int opset_version);
+    int opset_version,
+    bool parallel = false);
 
 } // namespace jit
 
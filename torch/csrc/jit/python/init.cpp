@@ -173,13 +173,19 @@ void initJITBindings(PyObject* module) {
           "_jit_pass_onnx_constant_fold",
           [](std::shared_ptr<Graph>& graph,
              std::map<std::string, IValue>& paramsDict,
-             int opset_version) {
+             int opset_version,
+             bool parallel) {
             ConstantFoldONNX(
                 graph->block(),
                 paramsDict,
-                opset_version); // overload resolution
+                opset_version,
+                parallel); // overload resolution
             return paramsDict;
           },
+          py::arg("graph"),
+          py::arg("params_dict"),
+          py::arg("opset_version"),
+          py::arg("parallel") = false,
           pybind11::return_value_policy::move)
       .def(
           "_jit_pass_onnx_eliminate_unused_items",
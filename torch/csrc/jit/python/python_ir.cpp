@@ -234,7 +234,10 @@ void initPythonIRBindings(PyObject* module_) {
              const std::map<std::string, int>& custom_opsets,
              bool add_node_names,
              bool use_external_data_format,
-             const std::string& onnx_file_path) {
+             const std::string& onnx_file_path,
+             size_t external_data_threshold,
+             size_t external_data_shard_size,
+             const std::map<std::string, std::string>& metadata_props) {
             std::string graph;
             std::shared_ptr<::ONNX_NAMESPACE::ModelProto> model_proto;
             RawDataExportMap export_map;
@@ -251,8 +254,10 @@ void initPythonIRBindings(PyObject* module_) {
                 custom_opsets,
                 add_node_names,
                 use_external_data_format,
-                onnx_file_path);
-            graph = serialize_model_proto_to_string(model_proto);
+                onnx_file_path,
+                external_data_threshold,
+                external_data_shard_size,
+                metadata_props);
             std::unordered_map<std::string, py::bytes>
                 python_serialized_export_map;
             for (auto& kv : export_map) {
@@ -265,6 +270,9 @@ void initPythonIRBindings(PyObject* module_) {
                   py::bytes(static_cast<const char*>(t.data_ptr()), copy_bytes);
             }
             graph = serialize_model_proto_to_string(model_proto);
+            // Free the model before it is copied into Python bytes, so that
+            // at most two copies of a model with inline parameters exist
+            model_proto.reset();
             return std::make_tuple(
                 py::bytes(graph), python_serialized_export_map);
           },
@@ -279,7 +287,10 @@ void initPythonIRBindings(PyObject* module_) {
           py::arg("custom_opsets"),
           py::arg("add_node_names") = true,
           py::arg("use_external_data_format") = false,
-          py::arg("onnx_file_path") = std::string())
+          py::arg("onnx_file_path") = std::string(),
+          py::arg("external_data_threshold") = 1024,
+          py::arg("external_data_shard_size") = 0,
+          py::arg("metadata_props") = std::map<std::string, std::string>())
       .def(
           "_pretty_print_onnx",
           [](const std::shared_ptr<Graph> g,
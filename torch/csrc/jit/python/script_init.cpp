@@ -1718,6 +1718,22 @@ void initJitScriptBindings(PyObject* module) {
       "_check_onnx_proto",
       [](const std::string& proto_string) { check_onnx_proto(proto_string); },
       py::arg("proto_string"));
+  m.def(
+      "_update_onnx_initializers",
+      [](const std::string& proto_string,
+         const std::map<std::string, at::Tensor>& initializers,
+         const std::map<std::string, std::string>& expected_metadata_props,
+         const std::string& onnx_file_path) {
+        return py::bytes(update_onnx_initializers(
+            proto_string,
+            initializers,
+            expected_metadata_props,
+            onnx_file_path));
+      },
+      py::arg("proto_string"),
+      py::arg("initializers"),
+      py::arg("expected_metadata_props"),
+      py::arg("onnx_file_path") = std::string());
   m.def("_jit_is_script_object", [](const py::object& obj) {
     return py::isinstance<Object>(obj);
   });
@@ -20,6 +20,7 @@
 #include <ATen/ATen.h>
 #include <c10/util/Optional.h>
 
+#include <algorithm>
 #include <fstream>
 #include <memory>
 #include <regex>
@@ -168,16 +169,99 @@ void CreateExternalFile(
   fwrite(tensor.data_ptr(), tensor.element_size(), tensor.numel(), fp.get());
 } // fclose() called here through CloseFile(), if FILE* is not a null pointer.
 
+// Writes the initializers stored outside of the model as it is encoded, one
+// at a time and straight from their storage, so that the ModelProto never
+// holds them. Without a shard size each tensor gets a file named after it.
+// With one, tensors are packed into files named <model file>.data.<index>
+// of up to that many bytes (a larger tensor gets a shard of its own), at
+// page-aligned offsets so that runtimes can memory-map them.
+class ExternalDataWriter {
+ public:
+  ExternalDataWriter(const std::string& onnx_file_path, size_t shard_size)
+      : onnx_file_path_(onnx_file_path),
+        shard_size_(shard_size),
+        shard_(nullptr, &CloseFile),
+        shard_offset_(0),
+        num_shards_(0) {}
+
+  void Write(onnx::TensorProto* tensor_proto, const at::Tensor& tensor) {
+    const size_t num_bytes = tensor.element_size() * tensor.numel();
+    auto* location = tensor_proto->mutable_external_data()->Add();
+    location->set_key("location");
+    tensor_proto->set_data_location(onnx::TensorProto_DataLocation_EXTERNAL);
+    if (shard_size_ == 0) {
+      auto tensorName = GetExternalFileName(tensor_proto->name());
+      CreateExternalFile(tensor, tensorName, onnx_file_path_);
+      location->set_value(tensorName);
+      return;
+    }
+
+    size_t offset = (shard_offset_ + kAlignment - 1) / kAlignment * kAlignment;
+    if (!shard_ || (offset > 0 && offset + num_bytes > shard_size_)) {
+      OpenShard();
+      offset = 0;
+    }
+    // Pad up to the aligned offset rather than seek, which takes a long
+    static const std::vector<char> padding(kAlignment, 0);
+    fwrite(padding.data(), 1, offset - shard_offset_, shard_.get());
+    if (fwrite(tensor.data_ptr(), 1, num_bytes, shard_.get()) != num_bytes) {
+      throw std::runtime_error(
+          std::string("ONNX export failed. Could not write to file: ") +
+          shard_location_);
+    }
+    shard_offset_ = offset + num_bytes;
+
+    location->set_value(shard_location_);
+    auto* offset_entry = tensor_proto->mutable_external_data()->Add();
+    offset_entry->set_key("offset");
+    offset_entry->set_value(std::to_string(offset));
+    auto* length_entry = tensor_proto->mutable_external_data()->Add();
+    length_entry->set_key("length");
+    length_entry->set_value(std::to_string(num_bytes));
+  }
+
+ private:
+  static constexpr size_t kAlignment = 4096;
+
+  void OpenShard() {
+    std::string path = onnx_file_path_;
+    std::replace(path.begin(), path.end(), '\\', '/');
+    shard_location_ = path.substr(path.find_last_of('/') + 1) + ".data." +
+        std::to_string(num_shards_++);
+    auto fullFilePath = GetFileRootPath(onnx_file_path_) + "/" + shard_location_;
+    shard_.reset(fopen(fullFilePath.c_str(), "wb"));
+    if (!shard_) {
+      throw std::runtime_error(
+          std::string("ONNX export failed. Could not open file or directory: ") +
+          fullFilePath);
+    }
+    shard_offset_ = 0;
+  }
+
+  std::string onnx_file_path_;
+  size_t shard_size_;
+  std::unique_ptr<FILE, decltype(&CloseFile)> shard_;
+  std::string shard_location_;
+  size_t shard_offset_;
+  size_t num_shards_;
+};
+
 class EncoderBase {
  public:
   EncoderBase(
       onnx_torch::OperatorExportTypes operator_export_type,
       bool strip_doc);
 
-  onnx::ModelProto get_model_proto() {
+  const onnx::ModelProto& get_model_proto() const {
     return model_proto_;
   }
 
+  // Moves the model out of the encoder rather than copying it, which for a
+  // model with its initializers inline would double the memory it takes.
+  onnx::ModelProto release_model_proto() {
+    return std::move(model_proto_);
+  }
+
   SymbolDimMap get_symbol_dim_param_map() {
     return symbol_dim_map_;
   }
@@ -255,13 +339,6 @@ class EncoderBase {
   onnx_torch::OperatorExportTypes operator_export_type_;
   bool strip_doc_;
   std::set<std::string> domains_;
-
-  // For large models, the parameters can be stored in separate binary files.
-  // This parameter sets a threshold on the number of elements in the parameter
-  // tensor, beyond which the parameter is stored in a separate file (if API
-  // argument use_external_data_format is set to True). This threshold is in
-  // place so as not to create too many external files.
-  const size_t ParamSizeThresholdForExternalStorage = 1024;
 };
 
 onnx::TensorProto_DataType ATenTypeToOnnxType(at::ScalarType at_type) {
@@ -682,7 +759,9 @@ class GraphEncoder : public EncoderBase {
       const std::map<std::string, int>& custom_opsets,
       bool add_node_names,
       bool use_external_data_format,
-      const std::string& onnx_file_path);
+      const std::string& onnx_file_path,
+      size_t external_data_threshold = 1024,
+      size_t external_data_shard_size = 0);
 
   RawDataExportMap get_raw_data_export_map() {
     return raw_data_export_map_;
@@ -698,6 +777,14 @@ class GraphEncoder : public EncoderBase {
 
   RawDataExportMap raw_data_export_map_;
   bool defer_weight_export_;
+
+  // For large models, the parameters can be stored in separate binary files.
+  // This parameter sets a threshold on the number of elements in the parameter
+  // tensor, beyond which the parameter is stored in a separate file (if API
+  // argument use_external_data_format is set to True). This threshold is in
+  // place so as not to create too many external files.
+  size_t external_data_threshold_;
+  std::unique_ptr<ExternalDataWriter> external_data_writer_;
 };
 
 GraphEncoder::GraphEncoder(
@@ -714,9 +801,12 @@ GraphEncoder::GraphEncoder(
     const std::map<std::string, int>& custom_opsets,
     bool add_node_names,
     bool use_external_data_format,
-    const std::string& onnx_file_path)
+    const std::string& onnx_file_path,
+    size_t external_data_threshold,
+    size_t external_data_shard_size)
     : EncoderBase(operator_export_type, strip_doc),
-      defer_weight_export_(defer_weight_export) {
+      defer_weight_export_(defer_weight_export),
+      external_data_threshold_(external_data_threshold) {
   if (operator_export_type != onnx_torch::OperatorExportTypes::RAW) {
     validateGraph(graph, operator_export_type);
   }
@@ -726,6 +816,8 @@ GraphEncoder::GraphEncoder(
         !onnx_file_path.empty(),
         "For large model export, f in torch.onnx.export must be a non-empty string "
         "specifying the location of the model.");
+    external_data_writer_ = std::make_unique<ExternalDataWriter>(
+        onnx_file_path, external_data_shard_size);
   }
 
   auto* imp = model_proto_.add_opset_import();
@@ -808,17 +900,10 @@ void GraphEncoder::EncodeTensor(
         std::end(tensor.sizes()),
         static_cast<int64_t>(1),
         std::multiplies<int64_t>()));
-    if (use_external_data_format &&
-        tensorSize > ParamSizeThresholdForExternalStorage) {
-      AT_ASSERT(!onnx_file_path.empty());
+    if (use_external_data_format && tensorSize > external_data_threshold_) {
+      AT_ASSERT(external_data_writer_);
       AT_ASSERT(tensor_proto->has_name());
-      auto tensorName = GetExternalFileName(tensor_proto->name());
-      CreateExternalFile(t, tensorName, onnx_file_path);
-      onnx::StringStringEntryProto* location =
-          tensor_proto->mutable_external_data()->Add();
-      location->set_key("location");
-      location->set_value(tensorName);
-      tensor_proto->set_data_location(onnx::TensorProto_DataLocation_EXTERNAL);
+      external_data_writer_->Write(tensor_proto, t);
     } else {
       tensor_proto->set_raw_data(std::string(
           static_cast<char*>(t.data_ptr()), t.element_size() * t.numel()));
@@ -882,7 +967,10 @@ export_onnx(
     const std::map<std::string, int>& custom_opsets,
     bool add_node_names,
     bool use_external_data_format,
-    const std::string& onnx_file_path) {
+    const std::string& onnx_file_path,
+    size_t external_data_threshold,
+    size_t external_data_shard_size,
+    const std::map<std::string, std::string>& metadata_props) {
   auto graph_encoder = GraphEncoder(
       graph,
       onnx_opset_version,
@@ -895,16 +983,24 @@ export_onnx(
       custom_opsets,
       add_node_names,
       use_external_data_format,
-      onnx_file_path);
+      onnx_file_path,
+      external_data_threshold,
+      external_data_shard_size);
   const size_t proto_size = graph_encoder.get_model_proto().ByteSizeLong();
   TORCH_CHECK(
       proto_size <= INT_MAX,
       "Exporting model exceed maximum protobuf size of 2GB. "
       "Please call torch.onnx.export with use_external_data_format=True.");
   GRAPH_DEBUG("onnx proto:", prettyPrint(graph_encoder.get_model_proto()));
+  auto model_proto = std::make_shared<::ONNX_NAMESPACE::ModelProto>(
+      graph_encoder.release_model_proto());
+  for (const auto& kv : metadata_props) {
+    auto* entry = model_proto->add_metadata_props();
+    entry->set_key(kv.first);
+    entry->set_value(kv.second);
+  }
   return std::make_tuple(
-      std::make_shared<::ONNX_NAMESPACE::ModelProto>(
-          graph_encoder.get_model_proto()),
+      model_proto,
       graph_encoder.get_raw_data_export_map(),
       graph_encoder.get_symbol_dim_param_map());
 }
@@ -923,5 +1019,121 @@ void check_onnx_proto(const std::string& proto_string) {
   onnx::checker::check_model(model);
 }
 
+std::string update_onnx_initializers(
+    const std::string& proto_string,
+    const std::map<std::string, at::Tensor>& initializers,
+    const std::map<std::string, std::string>& expected_metadata_props,
+    const std::string& onnx_file_path) {
+  onnx::ModelProto model;
+  if (!ParseProtoFromBytes(&model, proto_string.c_str(), proto_string.size())) {
+    throw std::runtime_error("Invalid ONNX proto string.");
+  }
+  for (const auto& kv : expected_metadata_props) {
+    const auto& props = model.metadata_props();
+    auto it = std::find_if(
+        props.begin(), props.end(), [&](const onnx::StringStringEntryProto& p) {
+          return p.key() == kv.first;
+        });
+    TORCH_CHECK(
+        it != props.end(),
+        "The ONNX model has no ",
+        kv.first,
+        " metadata; it was not exported by torch.onnx.export from an nn.Module "
+        "with updatable_params=True.");
+    TORCH_CHECK(
+        it->value() == kv.second,
+        "The ONNX model was not exported from a module with the same code, "
+        "attributes and parameter names, dtypes and shapes (",
+        kv.first,
+        " mismatch).");
+  }
+
+  // Validate every initializer before writing any, so that a mismatch does
+  // not leave the external data files partially updated
+  struct InitializerUpdate {
+    onnx::TensorProto* tensor_proto;
+    at::Tensor tensor;
+    size_t num_bytes;
+    // Empty unless the initializer is stored as external data
+    std::string external_path;
+    size_t offset;
+  };
+  std::vector<InitializerUpdate> updates;
+  for (auto& tensor_proto : *model.mutable_graph()->mutable_initializer()) {
+    auto it = initializers.find(tensor_proto.name());
+    TORCH_CHECK(
+        it != initializers.end(),
+        "Initializer ",
+        tensor_proto.name(),
+        " of the ONNX model is not a parameter of the module. Initializers "
+        "computed from parameters, e.g. by constant folding, cannot be "
+        "updated; export with do_constant_folding=False.");
+    const at::Tensor& tensor = it->second;
+    TORCH_CHECK(
+        tensor_proto.data_type() == ATenTypeToOnnxType(tensor.scalar_type()) &&
+            std::equal(
+                tensor_proto.dims().begin(),
+                tensor_proto.dims().end(),
+                tensor.sizes().begin(),
+                tensor.sizes().end()),
+        "Parameter ",
+        tensor_proto.name(),
+        " does not have the dtype and shape of the initializer it updates.");
+    // CPU's HalfTensor doesn't have contiguous(), so first calling contiguous()
+    at::Tensor t = tensor.is_quantized() ? tensor.contiguous()
+                                         : tensor.contiguous().cpu();
+    const size_t num_bytes = t.element_size() * t.numel();
+    InitializerUpdate update{&tensor_proto, t, num_bytes, "", 0};
+
+    if (tensor_proto.data_location() ==
+        onnx::TensorProto_DataLocation_EXTERNAL) {
+      std::string location;
+      size_t length = num_bytes;
+      for (const auto& entry : tensor_proto.external_data()) {
+        if (entry.key() == "location") {
+          location = entry.value();
+        } else if (entry.key() == "offset") {
+          update.offset = std::stoull(entry.value());
+        } else if (entry.key() == "length") {
+          length = std::stoull(entry.value());
+        }
+      }
+      TORCH_CHECK(
+          length == num_bytes,
+          "Parameter ",
+          tensor_proto.name(),
+          " does not have the size of the external data it updates.");
+      update.external_path = GetFileRootPath(onnx_file_path) + "/" + location;
+      std::fstream file(
+          update.external_path,
+          std::ios::in | std::ios::out | std::ios::binary);
+      if (!file) {
+        throw std::runtime_error(
+            std::string("Could not open external data file: ") +
+            update.external_path);
+      }
+    }
+    updates.push_back(std::move(update));
+  }
+
+  for (const auto& update : updates) {
+    const void* data = update.tensor.data_ptr();
+    if (update.external_path.empty()) {
+      update.tensor_proto->set_raw_data(data, update.num_bytes);
+      continue;
+    }
+    std::fstream file(
+        update.external_path, std::ios::in | std::ios::out | std::ios::binary);
+    file.seekp(update.offset);
+    file.write(static_cast<const char*>(data), update.num_bytes);
+    if (!file) {
+      throw std::runtime_error(
+          std::string("Could not write to external data file: ") +
+          update.external_path);
+    }
+  }
+  return model.SerializeAsString();
+}
+
 } // namespace jit
 } // namespace torch
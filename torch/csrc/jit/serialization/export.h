@@ -46,13 +46,27 @@ export_onnx(
     const std::map<std::string, int>& custom_opsets = {},
     bool add_node_names = true,
     bool use_external_data_format = false,
-    const std::string& onnx_file_path = std::string());
+    const std::string& onnx_file_path = std::string(),
+    size_t external_data_threshold = 1024,
+    size_t external_data_shard_size = 0,
+    const std::map<std::string, std::string>& metadata_props = {});
 
 TORCH_API std::string serialize_model_proto_to_string(
     const std::shared_ptr<::ONNX_NAMESPACE::ModelProto>& model_proto);
 
 TORCH_API void check_onnx_proto(const std::string& proto_string);
 
+// Replaces the data of each initializer of a serialized ONNX model with the
+// tensor of the same name in `initializers`, after checking that the model
+// metadata holds each entry of `expected_metadata_props`. Initializers
+// stored in external files, which are looked up next to `onnx_file_path`,
+// are overwritten in place one at a time. Returns the serialized model.
+TORCH_API std::string update_onnx_initializers(
+    const std::string& proto_string,
+    const std::map<std::string, at::Tensor>& initializers,
+    const std::map<std::string, std::string>& expected_metadata_props,
+    const std::string& onnx_file_path);
+
 // For testing purposes
 TORCH_API std::string pretty_print_onnx(
     const std::shared_ptr<Graph>& graph,
@@ -34,7 +34,9 @@ def export(model, args, f, export_params=True, verbose=False, training=TrainingM
            operator_export_type=None, opset_version=None, _retain_param_name=True,
            do_constant_folding=True, example_outputs=None, strip_doc_string=True,
            dynamic_axes=None, keep_initializers_as_inputs=None, custom_opsets=None,
-           enable_onnx_checker=True, use_external_data_format=False):
+           enable_onnx_checker=True, use_external_data_format=False, export_cache_dir=None,
+           external_data_threshold=1024, external_data_shard_size=0, parallel_constant_folding=False,
+           updatable_params=False):
     r"""
     Export a model into ONNX format.  This exporter runs your model
     once in order to get a trace of its execution to be exported;
@@ -133,6 +135,10 @@ def export(model, args, f, export_params=True, verbose=False, training=TrainingM
             optimization is applied to the model during export. Constant-folding
             optimization will replace some of the ops that have all constant
             inputs, with pre-computed constant nodes.
+        parallel_constant_folding (bool, default False): If True, constant-folding runs the
+            ops of independent constant subgraphs concurrently on torch's intra-op thread pool
+            (see torch.set_num_threads). The folded model is the same, but the folded
+            initializers may be named differently than with serial constant-folding.
         example_outputs (tuple of Tensors, default None): Model's example outputs being exported.
             example_outputs must be provided when exporting a ScriptModule or TorchScript Function.
         strip_doc_string (bool, default True): if True, strips the field
@@ -214,11 +220,33 @@ def export(model, args, f, export_params=True, verbose=False, training=TrainingM
             in external binary files and not in the ONNX model file itself. See link for format
             details:
             https://github.com/onnx/onnx/blob/8b3f7e2e7a0f2aba0e629e23d89f07c7fc0e6a5e/onnx/onnx.proto#L423
-            Also, in this case,  argument 'f' must be a string specifying the location of the model.
-            The external binary files will be stored in the same location specified by the model
-            location 'f'. If False, then the model is stored in regular format, i.e. model and
+            Also, in this case,  argument 'f' must be a string specifying the location of the model,
+            or a file opened from one. The external binary files will be stored in the same location
+            specified by the model location 'f'. Each parameter is written to them straight from its
+            storage as the model is encoded, so the model is never held in memory with its
+            parameters. If False, then the model is stored in regular format, i.e. model and
             parameters are all in one file. This argument is ignored for all export types other
             than ONNX.
+        external_data_threshold (int, default 1024): In external data format, the number of
+            elements beyond which a parameter is stored in an external file rather than in the
+            model file.
+        external_data_shard_size (int, default 0): In external data format, if 0, each parameter
+            is stored in a file of its own, named after it. Otherwise, parameters are packed into
+            files named '<model file name>.data.<index>' of up to this many bytes (a larger
+            parameter gets a file of its own), at 4096-byte aligned offsets so that runtimes can
+            memory-map them.
+        export_cache_dir (string, default None): If specified, a directory in which exported
+            models are cached. An export of a model whose module code, state_dict, input
+            signature (dtypes and shapes of the tensor inputs, values of the other inputs),
+            export options and torch version all match a cached export writes the cached
+            model to 'f' without tracing the model. The return value is the same as for
+            an uncached export, so a model that is not a ScriptModule or ScriptFunction
+            is still run once on args to compute its outputs. Exports in external data
+            format and export types other than PROTOBUF_FILE are not cached.
+        updatable_params (bool, default False): If True, records a hash of the structure of
+            the module in the metadata of the exported model, so that its parameters can later
+            be refreshed with torch.onnx.update_params. Requires an nn.Module exported with
+            _retain_param_name=True.
     """
 
     from torch.onnx import utils
@@ -227,7 +255,44 @@ def export(model, args, f, export_params=True, verbose=False, training=TrainingM
                         operator_export_type, opset_version, _retain_param_name,
                         do_constant_folding, example_outputs,
                         strip_doc_string, dynamic_axes, keep_initializers_as_inputs,
-                        custom_opsets, enable_onnx_checker, use_external_data_format)
+                        custom_opsets, enable_onnx_checker, use_external_data_format,
+                        export_cache_dir, external_data_threshold, external_data_shard_size,
+                        parallel_constant_folding, updatable_params)
+
+
+def update_params(model, f, state_dict=None, training=TrainingMode.EVAL):
+    r"""
+    Update the parameters of an ONNX model previously exported from model
+    with torch.onnx.export, e.g. after model is fine-tuned, without tracing
+    or exporting model again. Each initializer of the ONNX model is
+    overwritten with the parameter or buffer it is named after, which takes
+    the time to read and write the model rather than the time to export it.
+
+    The ONNX model must have been exported from an nn.Module with
+    updatable_params=True, _retain_param_name=True (the default) and
+    do_constant_folding=False, so that each of its initializers holds a
+    parameter of the module as is. The export then records a hash of the
+    code and attributes of the module and of the names, dtypes and shapes
+    of its parameters, which model must match. Parameter values that
+    forward reads as Python numbers, e.g. with item(), are part of the
+    exported graph and are not updated.
+
+    Arguments:
+        model (torch.nn.Module): the model the ONNX model was exported from,
+            or one of the same structure.
+        f: the ONNX model: a string containing a file name, or a file-like
+            object opened for reading and writing, which is updated in place.
+            In external data format, f must be a file name, or a file opened
+            from one, and the external data files are updated in place once
+            every parameter has been checked.
+        state_dict (dict<string, torch.Tensor>, default None): the parameters
+            to write, by name. If None, the parameters and buffers of model.
+        training (enum, default TrainingMode.EVAL): the training mode model
+            was exported in, as passed to torch.onnx.export.
+    """
+
+    from torch.onnx import utils
+    return utils.update_params(model, f, state_dict, training)
 
 
 def export_to_pretty_string(*args, **kwargs):
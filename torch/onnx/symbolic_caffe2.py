@@ -4,7 +4,13 @@ import torch.onnx.symbolic_registry as sym_registry
 import importlib
 from inspect import getmembers, isfunction
 
+# (domain, version) pairs the quantized ops have been registered for.
+_registered_versions = set()
+
 def register_quantized_ops(domain, version):
+    if (domain, version) in _registered_versions:
+        return
+    _registered_versions.add((domain, version))
     # Register all the non-quantized ops
     sym_registry.register_version('', version)
     # Register all quantized ops
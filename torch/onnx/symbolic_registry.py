@@ -8,38 +8,39 @@ from inspect import getmembers, isfunction
 # The keys are tuples (domain, version), (where domain is a string, and version is an int),
 # and the operator's name (string).
 # The map's entries are as follows : _registry[(domain, version)][op_name] = op_symbolic
+#
+# The builtin symbolic functions of a registered version are not copied into the
+# registry up front. Instead, each (domain, version) in "_builtin_versions" resolves an
+# opname from the symbolic_opset{version}.py modules the first time it is looked up,
+# and the result (None if there is no such symbolic) is kept in the registry, so the
+# registry ends up as a flat dispatch table of the ops a model actually uses.
 _registry = {}
+_builtin_versions = set()
 
+# The symbolic_opset{version}.py modules are imported on first use.
 _symbolic_versions = {}
 from torch.onnx.symbolic_helper import _onnx_stable_opsets
-for opset_version in _onnx_stable_opsets:
-    module = importlib.import_module('torch.onnx.symbolic_opset{}'.format(opset_version))
-    _symbolic_versions[opset_version] = module
+
+
+def _get_symbolic_module(version):
+    if version not in _symbolic_versions:
+        module = importlib.import_module('torch.onnx.symbolic_opset{}'.format(version))
+        _symbolic_versions[version] = module
+    return _symbolic_versions[version]
 
 
 def register_version(domain, version):
     if not is_registered_version(domain, version):
         global _registry
         _registry[(domain, version)] = {}
-    register_ops_in_version(domain, version)
-
+    _builtin_versions.add((domain, version))
 
-def register_ops_helper(domain, version, iter_version):
-    version_ops = get_ops_in_version(iter_version)
-    for op in version_ops:
-        if op[0] == '_len':
-            op = ('len', op[1])
-        if op[0] == '_list':
-            op = ('list', op[1])
-        if isfunction(op[1]) and not is_registered_op(op[0], domain, version):
-            register_op(op[0], op[1], domain, version)
 
-
-def register_ops_in_version(domain, version):
-    # iterates through the symbolic functions of
-    # the specified opset version, and the previous
-    # opset versions for operators supported in
-    # previous versions.
+def _iter_builtin_versions(version):
+    # yields the specified opset version, and then the
+    # previous opset versions, in the order their
+    # symbolic_opset{version}.py modules are searched
+    # for operators supported in previous versions.
 
     # Opset 9 is the base version. It is selected as the base version because
     #   1. It is the first opset version supported by PyTorch export.
@@ -55,17 +56,36 @@ def register_ops_in_version(domain, version):
     # Checkout topk in symbolic_opset10.py, and upsample_nearest2d in symbolic_opset8.py for example.
     iter_version = version
     while iter_version != 9:
-        register_ops_helper(domain, version, iter_version)
+        yield iter_version
         if iter_version > 9:
             iter_version = iter_version - 1
         else:
             iter_version = iter_version + 1
+    yield 9
 
-    register_ops_helper(domain, version, 9)
+
+def _find_builtin_op(opname, version):
+    if opname in ('_len', '_list'):
+        return None
+    attr = {'len': '_len', 'list': '_list'}.get(opname, opname)
+    for iter_version in _iter_builtin_versions(version):
+        op = getattr(_get_symbolic_module(iter_version), attr, None)
+        if isfunction(op):
+            return op
+    return None
+
+
+def _lookup_op(opname, domain, version):
+    ops = _registry.get((domain, version))
+    if ops is None:
+        return None
+    if opname not in ops and (domain, version) in _builtin_versions:
+        ops[opname] = _find_builtin_op(opname, version)
+    return ops.get(opname)
 
 
 def get_ops_in_version(version):
-    return getmembers(_symbolic_versions[version])
+    return getmembers(_get_symbolic_module(version))
 
 
 def is_registered_version(domain, version):
@@ -85,14 +105,12 @@ def register_op(opname, op, domain, version):
 def is_registered_op(opname, domain, version):
     if domain is None or version is None:
         warnings.warn("ONNX export failed. The ONNX domain and/or version are None.")
-    global _registry
-    return (domain, version) in _registry and opname in _registry[(domain, version)]
+    return _lookup_op(opname, domain, version) is not None
 
 def get_op_supported_version(opname, domain, version):
     iter_version = version
     while iter_version <= _onnx_stable_opsets[-1]:
-        ops = [op[0] for op in get_ops_in_version(iter_version)]
-        if opname in ops:
+        if hasattr(_get_symbolic_module(iter_version), opname):
             return iter_version
         iter_version += 1
     return None
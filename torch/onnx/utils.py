@@ -12,7 +12,10 @@ import torch.serialization
 import re
 from torch._six import container_abcs
 import contextlib
+import hashlib
+import marshal
 import numbers
+import os
 import warnings
 from torch._six import string_classes
 from torch.jit import _unique_state_dict
@@ -72,7 +75,9 @@ def export(model, args, f, export_params=True, verbose=False, training=None,
            operator_export_type=None, opset_version=None, _retain_param_name=True,
            do_constant_folding=True, example_outputs=None, strip_doc_string=True,
            dynamic_axes=None, keep_initializers_as_inputs=None, custom_opsets=None,
-           enable_onnx_checker=True, use_external_data_format=False):
+           enable_onnx_checker=True, use_external_data_format=False, export_cache_dir=None,
+           external_data_threshold=1024, external_data_shard_size=0, parallel_constant_folding=False,
+           updatable_params=False):
     if aten or export_raw_ir:
         assert operator_export_type is None
         assert aten ^ export_raw_ir
@@ -88,7 +93,11 @@ def export(model, args, f, export_params=True, verbose=False, training=None,
             example_outputs=example_outputs, strip_doc_string=strip_doc_string,
             dynamic_axes=dynamic_axes, keep_initializers_as_inputs=keep_initializers_as_inputs,
             custom_opsets=custom_opsets, enable_onnx_checker=enable_onnx_checker,
-            use_external_data_format=use_external_data_format)
+            use_external_data_format=use_external_data_format, export_cache_dir=export_cache_dir,
+            external_data_threshold=external_data_threshold,
+            external_data_shard_size=external_data_shard_size,
+            parallel_constant_folding=parallel_constant_folding,
+            updatable_params=updatable_params)
 
 
 def _is_constant_tensor_list(node):
@@ -310,13 +319,141 @@ def _decide_external_data_format(use_external_data_format, operator_export_type,
                                                                 use_external_data_format,
                                                                 operator_export_type)
     # f can be a non-string in regular-sized model export case, but for large model export, f must be a non-empty
-    # string specifying the location of the model. For large model cases, if f is not a non-empty string,
-    # then this method returns an empty string, which is an error condition for the large model export code
-    # path later (but not for regular model export code path).
-    model_file_location = f if val_use_external_data_format and isinstance(f, str) else str()
+    # string or a file opened from one, specifying the location of the model. For large model cases, if f is
+    # neither, then this method returns an empty string, which is an error condition for the large model export
+    # code path later (but not for regular model export code path).
+    model_file_location = str()
+    if val_use_external_data_format:
+        if isinstance(f, str):
+            model_file_location = f
+        elif isinstance(getattr(f, "name", None), str):
+            model_file_location = f.name
     return val_use_external_data_format, model_file_location
 
 
+def _update_tensor_digest(hasher, tensor):
+    tensor = tensor.detach().cpu().contiguous()
+    hasher.update(repr((tensor.dtype, tuple(tensor.shape))).encode())
+    try:
+        hasher.update(tensor.numpy())
+    except TypeError:
+        # e.g. bfloat16, which numpy has no dtype for; widening is exact
+        hasher.update(tensor.to(torch.float64).numpy())
+
+
+def _update_code_digest(hasher, cls):
+    # The bytecode of the methods of cls and of its bases up to nn.Module,
+    # which, unlike their source, can always be found
+    for base in cls.__mro__:
+        if base is torch.nn.Module or base is object:
+            break
+        for name, value in sorted(vars(base).items()):
+            value = getattr(value, "__func__", value)
+            code = getattr(value, "__code__", None)
+            if code is not None:
+                hasher.update(name.encode())
+                hasher.update(marshal.dumps(code))
+
+
+def _update_module_digest(hasher, model):
+    if isinstance(model, (torch.jit.ScriptModule, torch.jit.ScriptFunction)):
+        hasher.update(str(model.inlined_graph).encode())
+    else:
+        for name, module in model.named_modules():
+            attributes = sorted((k, repr(v)) for k, v in vars(module).items()
+                                if isinstance(v, (bool, int, float, str, tuple, type(None))))
+            hasher.update(repr((name, type(module).__qualname__, attributes)).encode())
+            # Tensors that are neither parameters nor buffers are traced as constants
+            for k, v in sorted(vars(module).items(), key=lambda item: item[0]):
+                if isinstance(v, torch.Tensor):
+                    hasher.update(k.encode())
+                    _update_tensor_digest(hasher, v)
+            _update_code_digest(hasher, type(module))
+
+
+# The model metadata entry update_params checks before updating a model
+_MODULE_STRUCTURE_HASH_KEY = "pytorch_module_structure_hash"
+
+
+def _module_structure_hash(model):
+    r"""
+    Returns a hash of the code of model (see _export_cache_key) and of the
+    name, dtype and shape of each of the parameters it exports, that is
+    everything the exported graph depends on but the parameter values and
+    the export inputs and options.
+    """
+    hasher = hashlib.sha256()
+    _update_module_digest(hasher, model)
+    for name, tensor in _unique_state_dict(model).items():
+        hasher.update(repr((name, tensor.dtype, tuple(tensor.shape))).encode())
+    return hasher.hexdigest()
+
+
+def _export_cache_key(model, args, example_outputs, options):
+    r"""
+    Returns the key an export of model is cached under. It hashes the model
+    code, the name, dtype, shape and data of each entry of its state_dict,
+    the dtype and shape of each tensor input and the value of every other
+    input, the export options, the custom symbolics and the torch version.
+
+    A ScriptModule or ScriptFunction carries its own code. For a module to
+    be traced, the code of each submodule class and the plain attributes of
+    each submodule (e.g. sizes, flags, tensors that are neither parameters
+    nor buffers and the training mode) decide what is traced; state read by
+    forward from elsewhere, e.g. globals, is not keyed.
+    """
+    hasher = hashlib.sha256()
+    _update_module_digest(hasher, model)
+    if not isinstance(model, torch.jit.ScriptFunction):
+        for name, tensor in model.state_dict().items():
+            hasher.update(name.encode())
+            _update_tensor_digest(hasher, tensor)
+
+    def signature(value):
+        if isinstance(value, torch.Tensor):
+            return ('Tensor', value.dtype, tuple(value.shape), value.requires_grad)
+        if isinstance(value, (list, tuple)):
+            return type(value)(signature(v) for v in value)
+        if isinstance(value, dict):
+            return sorted((k, signature(v)) for k, v in value.items())
+        return value
+
+    hasher.update(repr((signature(args), signature(example_outputs))).encode())
+    hasher.update(repr(sorted((k, repr(v)) for k, v in options.items())).encode())
+
+    # Symbolics registered with register_custom_op_symbolic
+    import torch.onnx.symbolic_registry as sym_registry
+    for (domain, version), ops in sorted(sym_registry._registry.items()):
+        if domain != '' and version == options["opset_version"]:
+            for op_name, symbolic_fn in sorted(ops.items()):
+                if symbolic_fn is None:
+                    continue
+                hasher.update("{}::{}".format(domain, op_name).encode())
+                code = getattr(symbolic_fn, "__code__", None)
+                hasher.update(marshal.dumps(code) if code is not None else repr(symbolic_fn).encode())
+    hasher.update(torch.__version__.encode())
+    return hasher.hexdigest()
+
+
+def _read_export_cache(export_cache_dir, key):
+    path = os.path.join(export_cache_dir, key + ".onnx")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_export_cache(export_cache_dir, key, proto):
+    os.makedirs(export_cache_dir, exist_ok=True)
+    path = os.path.join(export_cache_dir, key + ".onnx")
+    # Concurrent exports of the same model may race; each writes a whole
+    # file first so that a reader never sees a partial one.
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(proto)
+    os.replace(tmp_path, path)
+
+
 def _trace(func, args, operator_export_type, return_outs=False):
     # Special case for common case of passing a single Tensor
     if isinstance(args, torch.Tensor):
@@ -397,7 +534,7 @@ def _model_to_graph(model, args, verbose=False,
                     _retain_param_name=False, do_constant_folding=True,
                     _disable_torch_constant_prop=False, fixed_batch_size=False,
                     training=None, use_new_jit_passes=False,
-                    dynamic_axes=None):
+                    dynamic_axes=None, parallel_constant_folding=False):
     from torch.onnx.symbolic_helper import _export_onnx_opset_version
     # Special case for common case of passing a single Tensor
     if isinstance(args, torch.Tensor):
@@ -447,7 +584,8 @@ def _model_to_graph(model, args, verbose=False,
 
     if do_constant_folding and _export_onnx_opset_version in torch.onnx.constant_folding_opset_versions:
         params_dict = torch._C._jit_pass_onnx_constant_fold(graph, params_dict,
-                                                            _export_onnx_opset_version)
+                                                            _export_onnx_opset_version,
+                                                            parallel_constant_folding)
         torch._C._jit_pass_dce_allow_deleting_nodes_with_side_effects(graph)
 
     params_dict = torch._C._jit_pass_onnx_eliminate_unused_items(graph, params_dict)
@@ -583,13 +721,19 @@ def _export(model, args, f, export_params=True, verbose=False, training=None,
             strip_doc_string=True, dynamic_axes=None, keep_initializers_as_inputs=None,
             fixed_batch_size=False, custom_opsets=None, add_node_names=True,
             enable_onnx_checker=True, use_external_data_format=False,
-            onnx_shape_inference=False, use_new_jit_passes=False):
+            onnx_shape_inference=False, use_new_jit_passes=False, export_cache_dir=None,
+            external_data_threshold=1024, external_data_shard_size=0, parallel_constant_folding=False,
+            updatable_params=False):
 
     if isinstance(model, torch.nn.DataParallel):
         raise ValueError('torch.nn.DataParallel is not supported by ONNX '
                          'exporter, please use \'attribute\' module to '
                          'unwrap model from torch.nn.DataParallel. Try '
                          'torch.onnx.export(model.module, ...)')
+    if updatable_params and (not _retain_param_name or
+                             isinstance(model, (torch.jit.ScriptModule, torch.jit.ScriptFunction))):
+        raise ValueError('updatable_params requires an nn.Module exported with _retain_param_name=True, '
+                         'whose initializers are named after its parameters.')
     global __IN_ONNX_EXPORT
     assert __IN_ONNX_EXPORT is False
     __IN_ONNX_EXPORT = True
@@ -628,6 +772,33 @@ def _export(model, args, f, export_params=True, verbose=False, training=None,
                 dynamic_axes = {}
             _validate_dynamic_axes(dynamic_axes, model, input_names, output_names)
 
+            # Only a protobuf file holds the whole export, so only it is cached
+            cache_key = None
+            if export_cache_dir is not None and export_type == ExportTypes.PROTOBUF_FILE and \
+                    not val_use_external_data_format:
+                cache_key = _export_cache_key(
+                    model, args, example_outputs,
+                    dict(export_params=export_params, training=training, input_names=input_names, output_names=output_names,
+                         operator_export_type=operator_export_type, opset_version=opset_version,
+                         _retain_param_name=_retain_param_name, do_constant_folding=val_do_constant_folding,
+                         strip_doc_string=strip_doc_string, dynamic_axes=dynamic_axes,
+                         keep_initializers_as_inputs=val_keep_init_as_ip, fixed_batch_size=fixed_batch_size,
+                         custom_opsets=custom_opsets, add_node_names=val_add_node_names,
+                         enable_onnx_checker=enable_onnx_checker, onnx_shape_inference=onnx_shape_inference,
+                         use_new_jit_passes=use_new_jit_passes,
+                         parallel_constant_folding=parallel_constant_folding,
+                         updatable_params=updatable_params))
+            if cache_key is not None:
+                proto = _read_export_cache(export_cache_dir, cache_key)
+                if proto is not None:
+                    with torch.serialization._open_file_like(f, 'wb') as opened_file:
+                        opened_file.write(proto)
+                    # Return what an uncached export returns: the outputs of the
+                    # traced model on args, or None for a script model or function
+                    if isinstance(model, (torch.jit.ScriptModule, torch.jit.ScriptFunction)):
+                        return None
+                    return model(*(args if isinstance(args, tuple) else (args,)))
+
             graph, params_dict, torch_out = \
                 _model_to_graph(model, args, verbose, input_names,
                                 output_names, operator_export_type,
@@ -636,23 +807,32 @@ def _export(model, args, f, export_params=True, verbose=False, training=None,
                                 fixed_batch_size=fixed_batch_size,
                                 training=training,
                                 use_new_jit_passes=use_new_jit_passes,
-                                dynamic_axes=dynamic_axes)
+                                dynamic_axes=dynamic_axes,
+                                parallel_constant_folding=parallel_constant_folding)
 
             # TODO: Don't allocate a in-memory string for the protobuf
             defer_weight_export = export_type is not ExportTypes.PROTOBUF_FILE
             if custom_opsets is None:
                 custom_opsets = {}
 
+            # The hash update_params checks, only recorded on request as it walks
+            # the whole module and adds an entry to the model
+            metadata_props = {}
+            if updatable_params:
+                metadata_props[_MODULE_STRUCTURE_HASH_KEY] = _module_structure_hash(model)
+
             if export_params:
                 proto, export_map = graph._export_onnx(
                     params_dict, opset_version, dynamic_axes, defer_weight_export,
                     operator_export_type, strip_doc_string, val_keep_init_as_ip, custom_opsets,
-                    val_add_node_names, val_use_external_data_format, model_file_location)
+                    val_add_node_names, val_use_external_data_format, model_file_location,
+                    external_data_threshold, external_data_shard_size, metadata_props)
             else:
                 proto, export_map = graph._export_onnx(
                     {}, opset_version, dynamic_axes, False, operator_export_type,
                     strip_doc_string, val_keep_init_as_ip, custom_opsets, val_add_node_names,
-                    val_use_external_data_format, model_file_location)
+                    val_use_external_data_format, model_file_location,
+                    external_data_threshold, external_data_shard_size, metadata_props)
 
             if enable_onnx_checker and \
                 operator_export_type is OperatorExportTypes.ONNX and \
@@ -661,6 +841,9 @@ def _export(model, args, f, export_params=True, verbose=False, training=None,
                 # large model format export in not enabled.
                 _check_onnx_proto(proto)
 
+            if cache_key is not None:
+                _write_export_cache(export_cache_dir, cache_key, proto)
+
             if export_type == ExportTypes.PROTOBUF_FILE:
                 assert(len(export_map) == 0)
                 with torch.serialization._open_file_like(f, 'wb') as opened_file:
@@ -675,7 +858,6 @@ def _export(model, args, f, export_params=True, verbose=False, training=None,
                     for k, v in export_map.items():
                         z.writestr(k, v)
             elif export_type == ExportTypes.DIRECTORY:
-                import os
                 if os.path.exists(f):
                     assert(os.path.isdir(f))
                 else:
@@ -697,6 +879,39 @@ def _export(model, args, f, export_params=True, verbose=False, training=None,
     return torch_out
 
 
+def update_params(model, f, state_dict=None, training=TrainingMode.EVAL):
+    if isinstance(model, (torch.jit.ScriptModule, torch.jit.ScriptFunction)):
+        raise ValueError("update_params does not support ScriptModules and ScriptFunctions, "
+                         "whose exported initializers are not named after their parameters.")
+    with select_model_mode_for_export(model, training):
+        structure_hash = _module_structure_hash(model)
+    if state_dict is None:
+        state_dict = _unique_state_dict(model)
+
+    if isinstance(f, str):
+        model_file_location = f
+        with open(f, 'rb') as opened_file:
+            proto = opened_file.read()
+    else:
+        model_file_location = getattr(f, "name", None)
+        if not isinstance(model_file_location, str):
+            model_file_location = str()
+        f.seek(0)
+        proto = f.read()
+
+    proto = torch._C._update_onnx_initializers(proto, dict(state_dict),
+                                               {_MODULE_STRUCTURE_HASH_KEY: structure_hash},
+                                               model_file_location)
+
+    if isinstance(f, str):
+        with open(f, 'wb') as opened_file:
+            opened_file.write(proto)
+    else:
+        f.seek(0)
+        f.write(proto)
+        f.truncate()
+
+
 def _set_input_and_output_names(graph, input_names, output_names):
     def set_names(node_list, name_list, descriptor):
         if name_list is None:
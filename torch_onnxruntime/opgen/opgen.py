@@ -3,7 +3,8 @@
 from opgen.generator import \
   ORTGen as ORTGen, \
   ONNXOp as ONNXOp, \
-  SignatureOnly as SignatureOnly
+  SignatureOnly as SignatureOnly, \
+  AttrType as AttrType
 
 kMSDomain = 'onnxruntime::kMSDomain'
 
@@ -19,6 +20,7 @@ class Mul(ONNXOp):
 class Gemm(ONNXOp):
   def __init__(self, a, b, c, Alpha=None, Beta=None, TransA=None, TransB=None):
     super().__init__('Gemm', 1, a, b, c, Alpha=Alpha, Beta=Beta, TransA=TransA, TransB=TransB)
+    self.attribute_types = {'Alpha': AttrType.FLOAT, 'Beta': AttrType.FLOAT, 'TransA': AttrType.INT, 'TransB': AttrType.INT}
 
 class Transpose(ONNXOp):
   def __init__(self, data, perms=None): super().__init__('Transpose', 1, data, perms=perms)
@@ -35,12 +37,54 @@ class MatMul(ONNXOp):
 class ReduceSum(ONNXOp):
   def __init__(self, data, axes, KeepDims=None, noop_with_empty_axes=None):
     super().__init__('ReduceSum', 1, data, axes, KeepDims=KeepDims, noop_with_empty_axes=noop_with_empty_axes)
+    self.attribute_types = {'KeepDims': AttrType.INT, 'noop_with_empty_axes': AttrType.INT}
 
 class ReluGrad(ONNXOp):
     def __init__(self, dY, X):
       super().__init__('ReluGrad', 1, dY, X)
       self.domain = kMSDomain
 
+class Softmax(ONNXOp):
+  def __init__(self, input, Axis=None):
+    super().__init__('Softmax', 1, input, Axis=Axis)
+    self.attribute_types = {'Axis': AttrType.INT}
+
+class LogSoftmax(ONNXOp):
+  def __init__(self, input, Axis=None):
+    super().__init__('LogSoftmax', 1, input, Axis=Axis)
+    self.attribute_types = {'Axis': AttrType.INT}
+
+class Div(ONNXOp):
+  def __init__(self, a, b): super().__init__('Div', 1, a, b)
+
+class Gather(ONNXOp):
+  def __init__(self, data, indices): super().__init__('Gather', 1, data, indices)
+
+class Gelu(ONNXOp):
+  def __init__(self, X):
+    super().__init__('Gelu', 1, X)
+    self.domain = kMSDomain
+
+class GeluGrad(ONNXOp):
+  def __init__(self, dY, X):
+    super().__init__('GeluGrad', 1, dY, X)
+    self.domain = kMSDomain
+
+class TopK(ONNXOp):
+  def __init__(self, X, K, Axis=None, Largest=None, Sorted=None):
+    super().__init__('TopK', 2, X, K, Axis=Axis, Largest=Largest, Sorted=Sorted)
+    self.attribute_types = {'Axis': AttrType.INT, 'Largest': AttrType.INT, 'Sorted': AttrType.INT}
+
+class ReduceMax(ONNXOp):
+  def __init__(self, data, Axes=None, KeepDims=None):
+    super().__init__('ReduceMax', 1, data, Axes=Axes, KeepDims=KeepDims)
+    self.attribute_types = {'Axes': AttrType.INTS, 'KeepDims': AttrType.INT}
+
+class ArgMax(ONNXOp):
+  def __init__(self, data, Axis=None, KeepDims=None):
+    super().__init__('ArgMax', 1, data, Axis=Axis, KeepDims=KeepDims)
+    self.attribute_types = {'Axis': AttrType.INT, 'KeepDims': AttrType.INT}
+
 single_arg_op_names = ["data", "_shape_as_tensor", "abs", "absolute", "angle", "sgn",
 "_conj", "acos", "arccos", "acosh", "arccosh", "asinh", "arcsinh",
 "atanh", "arctanh", "asin", "arcsin", "atan", "arctan", "atleast_1d",
@@ -49,7 +93,7 @@ single_arg_op_names = ["data", "_shape_as_tensor", "abs", "absolute", "angle", "
 "frac", "inverse", "_inverse_helper", "isnan", "isreal", "log",
 "log10", "log1p", "log2", "logdet", "matrix_exp", "median",
 "nanmedian", "rad2deg", "deg2rad", "reciprocal", "neg", "negative",
-"round", "relu", "gelu", "rsqrt", "selu", "silu", "sigmoid", "sin",
+"round", "relu", "rsqrt", "selu", "silu", "sigmoid", "sin",
 "sinh", "sqrt", "square", "tan", "tanh", "fliplr", "flipud", "trunc",
 "fix", "_sparse_sum", "frobenius_norm", "to_dense", "coalesce",
 "to_sparse", "to_mkldnn",  "q_per_channel_scales",
@@ -68,8 +112,9 @@ single_arg_op_names_inplace = ["abs_", "absolute_",
 "cosh_", "erf_", "erfc_", "exp_", "exp2_", "expm1_", "floor_",
 "frac_", "log_", "log10_", "log1p_", "log2_", "rad2deg_", "deg2rad_",
 "reciprocal_", "neg_", "negative_", "round_", "relu_", "rsqrt_",
-"selu_", "silu_", "sigmoid_", "sin_", "sinh_", "detach_", "squeeze_",
-"sqrt_", "square_", "t_", "tan_", "tanh_", "trunc_", "fix_",
+"selu_", "silu_", "sigmoid_", "sin_", "sinh_", "detach_",
+# "squeeze_", "t_": metadata-only; ATen implements them via as_strided_
+"sqrt_", "square_", "tan_", "tanh_", "trunc_", "fix_",
 # "zero_", Odd, why is this done with SignatureOnly? above, discuss with abock
 "set_", "lgamma_", "digamma_", "erfinv_", "i0_", "sign_", "hardsigmoid_",
 "hardswish_"]
@@ -85,6 +130,25 @@ ops = {
   'aten::copy_': SignatureOnly(),
   'aten::reshape': SignatureOnly(),
   'aten::view': SignatureOnly(),
+  'aten::as_strided': SignatureOnly(),
+  'aten::t': SignatureOnly(),
+  # aten::squeeze shares its C++ name with aten::squeeze.dim; the default
+  # backend implements it on top of aten::as_strided.
+  'aten::squeeze.dim': SignatureOnly(),
+  'aten::unsqueeze': SignatureOnly(),
+  'aten::expand': SignatureOnly(),
+  'aten::fill_.Scalar': SignatureOnly(),
+  'aten::_local_scalar_dense': SignatureOnly(),
+  'aten::bernoulli_.float': SignatureOnly(),
+  'aten::_softmax_backward_data': SignatureOnly(),
+  'aten::_log_softmax_backward_data': SignatureOnly(),
+  'aten::nll_loss_forward': SignatureOnly(),
+  'aten::nll_loss_backward': SignatureOnly(),
+  'aten::native_layer_norm': SignatureOnly(),
+  'aten::native_layer_norm_backward': SignatureOnly(),
+  'aten::embedding_dense_backward': SignatureOnly(),
+  'aten::sort': SignatureOnly(),
+  'aten::_cat': SignatureOnly(),
 
   # Fully Generated Ops
   'aten::add.Tensor': Add('self', Mul('alpha', 'other')),
@@ -92,18 +156,45 @@ ops = {
   'aten::sub.Tensor': Sub('self', Mul('alpha', 'other')),
   'aten::sub_.Tensor': Sub('self', Mul('alpha', 'other')),
   'aten::mul.Tensor': Mul('self', 'other'),
+  'aten::mul_.Tensor': Mul('self', 'other'),
+  'aten::div.Tensor': Div('self', 'other'),
+  'aten::div_.Tensor': Div('self', 'other'),
+  'aten::div_.Scalar': Div('self', 'other'),
   'aten::addmm': Gemm('mat1', 'mat2', 'self', Alpha='alpha', Beta='beta'),
-  'aten::t': Transpose('self'),
   'aten::relu': Relu('self'),
   'aten::mm': MatMul('self', 'mat2'),
   
   'aten::sum.dim_IntList': ReduceSum('self', 'dim', KeepDims='keepdim'),
-  'aten::threshold_backward': ReluGrad('grad_output', 'self')  
+  'aten::threshold_backward': ReluGrad('grad_output', 'self'),
+
+  'aten::_softmax': Softmax('self', Axis='dim'),
+  'aten::_log_softmax': LogSoftmax('self', Axis='dim'),
+  'aten::gelu': Gelu('self'),
+  'aten::gelu_backward': GeluGrad('grad', 'self'),
+  'aten::embedding': Gather('weight', 'indices'),
+
+  # Multiple results, mapped to the outputs of one op or to a tuple of ops
+  'aten::topk': TopK('self', 'k', Axis='dim', Largest='largest', Sorted='sorted'),
+  'aten::max.dim': (
+    ReduceMax('self', Axes='dim', KeepDims='keepdim'),
+    ArgMax('self', Axis='dim', KeepDims='keepdim')),
+
+  # out= overloads write their results directly into the out tensors
+  'aten::add.out': Add('self', Mul('alpha', 'other')),
+  'aten::sub.out': Sub('self', Mul('alpha', 'other')),
+  'aten::mul.out': Mul('self', 'other'),
+  'aten::addmm.out': Gemm('mat1', 'mat2', 'self', Alpha='alpha', Beta='beta'),
+  'aten::mm.out': MatMul('self', 'mat2'),
+  'aten::topk.values': TopK('self', 'k', Axis='dim', Largest='largest', Sorted='sorted'),
+  'aten::max.dim_max': (
+    ReduceMax('self', Axes='dim', KeepDims='keepdim'),
+    ArgMax('self', Axis='dim', KeepDims='keepdim')),
 }
 ops.update (implicit_single_arg_ops)
 ops.update (explicit_single_arg_ops)
 ortgen = ORTGen(ops, function_name_prefix='ort_op_aten_')
 
+import io
 import os
 import sys
 
@@ -120,9 +211,22 @@ regdecs_path = os.path.realpath(os.path.join(
   'ATen',
   'RegistrationDeclarations.h'))
 print(regdecs_path)
-output = sys.stdout
-if len(sys.argv) >= 2:
-  output = open(sys.argv[1], 'wt')
+output_path = sys.argv[1] if len(sys.argv) >= 2 else None
+output = io.StringIO() if output_path else sys.stdout
 
 with CPPParser(regdecs_path) as parser, SourceWriter(output) as writer:
-  ortgen.run(parser, writer)
\ No newline at end of file
+  ortgen.run(parser, writer)
+  generated = output.getvalue() if output_path else None
+
+# Leave an identical file untouched so that its timestamp does not trigger a
+# recompile
+if output_path:
+  existing = None
+  if os.path.exists(output_path):
+    with open(output_path, 'rt') as f:
+      existing = f.read()
+  if generated != existing:
+    with open(output_path, 'wt') as f:
+      f.write(generated)
+  else:
+    print(f'{output_path} is unchanged')
@@ -197,7 +197,7 @@ class TupleMemberType(Type):
     self.element_type.write(writer)
 
   def _desugar_self(self) -> Type:
-    return self.element_name
+    return self.element_type
 
 class TupleType(Type):
   def __init__(self, elements: SyntaxList):
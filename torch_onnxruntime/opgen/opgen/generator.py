@@ -2,12 +2,41 @@ from typing import TextIO, Optional, Dict, List, Tuple
 
 import sys
 import json
+import re
 
 import opgen.lexer as lexer
 import opgen.parser as parser
 import opgen.ast as ast
 import opgen.writer as writer
 
+# ONNX ops whose single output has the shape of their (broadcast) inputs and
+# the element type of their first input. Such ops may write their result
+# directly into an input buffer.
+ELEMENTWISE_OPS = {
+  'Abs', 'Acos', 'Acosh', 'Add', 'And', 'Asin', 'Asinh', 'Atan', 'Atanh',
+  'Ceil', 'Clip', 'Cos', 'Cosh', 'Div', 'Elu', 'Erf', 'Exp', 'Floor',
+  'HardSigmoid', 'HardSwish', 'LeakyRelu', 'Log', 'Max', 'Min', 'Mod', 'Mul',
+  'Neg', 'Not', 'Or', 'Pow', 'PRelu', 'Reciprocal', 'Relu', 'Round', 'Selu',
+  'Sigmoid', 'Sign', 'Sin', 'Sinh', 'Softplus', 'Softsign', 'Sqrt', 'Sub',
+  'Sum', 'Tan', 'Tanh', 'ThresholdedRelu', 'Xor'
+}
+
+# ONNX ops whose inputs must share an element type, computed by ATen in the
+# type it promotes its operands to (at::result_type). Their operands are
+# cast to that type when it differs; ONNX broadcasts them as ATen does.
+PROMOTING_OPS = {'Add', 'Div', 'Max', 'Min', 'Mod', 'Mul', 'Sub', 'Sum'}
+
+# Promoting ops that are true divisions, promoting integers to floats
+TRUE_DIVISION_OPS = {'Div'}
+
+# ATen scalar types that ONNX attributes are declared with; scalars bound to
+# an attribute with a declared type are converted to it. INTS attributes are
+# built from int or int[] parameters.
+class AttrType:
+  FLOAT = 'at::ScalarType::Float'
+  INT = 'at::ScalarType::Long'
+  INTS = 'ints'
+
 class Outputs:
   def __init__(self, count: int):
     self.count = count
@@ -16,6 +45,15 @@ class Outputs:
   def __str__(self):
     return self.name if self.name else f'<unbound output>'
 
+class Output:
+  """A single output of an ONNX op with several, e.g. the indices of TopK."""
+  def __init__(self, outputs: Outputs, index: int):
+    self.outputs = outputs
+    self.index = index
+
+  def __str__(self):
+    return f'{self.outputs}[{self.index}]'
+
 class ONNXOpEvalContext:
   ops: ['ONNXOp']
 
@@ -25,24 +63,42 @@ class ONNXOpEvalContext:
   def prepare_outputs(self):
     for i, op in enumerate(self.ops):
       op.outputs.name = f'ort_outputs_{i}_{op.name}'
+      op.kernel_name = f'ort_kernel_{i}_{op.name}'
+      op.out_bound_name = f'ort_out_bound_{i}_{op.name}'
 
 class ONNXOp:
   def __init__(self,
     name: str,
     outputs: int,
-    *inputs: str or Outputs,
+    *inputs: str or Outputs or 'ONNXOpOutput',
     **attributes: Optional[str or Outputs]):
     self.name = name
     self.outputs = Outputs(outputs)
     self.inputs = inputs
     self.attributes = attributes
+    self.attribute_types = {}
     self.domain = None
+    self.kernel_name = None
+    self.out_bound_name = None
+
+  def __getitem__(self, index: int) -> 'ONNXOpOutput':
+    if index < 0 or index >= self.outputs.count:
+      raise IndexError(f'{self.name} has {self.outputs.count} output(s)')
+    return ONNXOpOutput(self, index)
+
+  @property
+  def is_elementwise(self) -> bool:
+    return not self.domain and self.name in ELEMENTWISE_OPS
 
   def eval(self, ctx: ONNXOpEvalContext):
+    # An op whose outputs are consumed more than once is invoked once
+    if self in ctx.ops:
+      return self.outputs
+
     evaluated_inputs = []
 
     for i in self.inputs:
-      if isinstance(i, ONNXOp):
+      if isinstance(i, (ONNXOp, ONNXOpOutput)):
         i = i.eval(ctx)
       evaluated_inputs.append(i)
 
@@ -52,6 +108,15 @@ class ONNXOp:
 
     return self.outputs
 
+class ONNXOpOutput:
+  """Selects one output of an ONNX op, e.g. TopK('self', 'k')[1]."""
+  def __init__(self, op: ONNXOp, index: int):
+    self.op = op
+    self.index = index
+
+  def eval(self, ctx: ONNXOpEvalContext) -> Output:
+    return Output(self.op.eval(ctx), self.index)
+
 class SignatureOnly(ONNXOp):
   def __init__(self): super().__init__(None, 0)
 
@@ -63,6 +128,9 @@ class ORTGen:
   _mapped_ops: Dict[str, ONNXOp] = {}
   function_name_prefix: str
 
+  # The Torch op name in the JSON comment that follows each C++ decl
+  _schema_name_pattern = re.compile(r'//\s*\{"schema":\s*"([^"(]+)\(')
+
   def __init__(
     self,
     ops: Optional[Dict[str, ONNXOp]] = None,
@@ -79,10 +147,18 @@ class ORTGen:
     for k, v in ops.items():
       self.register(k, v)
 
-  def run(self, cpp_parser: parser.CPPParser, writer: writer.SourceWriter):
+  def run(
+    self,
+    cpp_parser: parser.CPPParser,
+    writer: writer.SourceWriter,
+    lazy: bool = True):
     self._write_file_prelude(writer)
 
-    generated_funcs = []
+    # Declarations of unmapped ops are never tokenized nor parsed when lazy
+    if lazy:
+      cpp_parser.set_line_filter(self._is_mapped_decl_line)
+
+    mapped_funcs = []
     for cpp_func, torch_func in self._parse_function_decls(cpp_parser):
       if self.function_name_prefix:
         cpp_func.identifier.value = self.function_name_prefix + \
@@ -94,7 +170,20 @@ class ORTGen:
       onnx_op = self._mapped_ops[torch_op_name]
       if not onnx_op:
         continue
+      mapped_funcs.append((cpp_func, torch_func, onnx_op))
+
+    # Generated overloads sharing a C++ name (e.g. aten::max and aten::max.dim)
+    # could not be registered by name; they take their overload name instead
+    cpp_names = [f[0].identifier.value for f in mapped_funcs]
+    for cpp_func, torch_func, onnx_op in mapped_funcs:
+      overload_name = torch_func.identifier.value.partition('.')[2]
+      if overload_name and not isinstance(onnx_op, SignatureOnly) and \
+        cpp_names.count(cpp_func.identifier.value) > 1:
+        cpp_func.identifier.value += f'_{overload_name}'
 
+    generated_funcs = []
+    for cpp_func, torch_func, onnx_op in mapped_funcs:
+      torch_op_name = torch_func.identifier.value
       signature_only = isinstance(onnx_op, SignatureOnly)
 
       writer.writeline()
@@ -132,6 +221,7 @@ class ORTGen:
     writer.writeline('#include "ort_tensor.h"')
     writer.writeline('#include "ort_aten.h"')
     writer.writeline('#include "ort_log.h"')
+    writer.writeline('#include "ort_profiler.h"')
     writer.writeline()
     writer.push_namespace('torch_ort')
     writer.push_namespace('eager')
@@ -166,20 +256,49 @@ class ORTGen:
     cpp_func: ast.FunctionDecl):
     assert(len(cpp_func.parameters) > 0)
 
-    return_alias_info = self._get_alias_info(cpp_func.torch_func.return_type)
-    if return_alias_info and not return_alias_info.is_writable:
-      return_alias_info = None
-    in_place_param: ast.ParameterDecl = None
-
-    # Eval the outer ONNX op to produce a topologically ordered list of ops
+    # Eval the outer ONNX op(s) to produce a topologically ordered list of
+    # ops and the ONNX output returned for each Torch result
     ctx = ONNXOpEvalContext()
-    onnx_op.eval(ctx)
+    results = self._eval_results(cpp_func, onnx_op, ctx)
     ctx.prepare_outputs()
 
+    return_types = self._get_return_types(cpp_func.torch_func)
+    if len(results) != len(return_types):
+      raise FunctionGenerationError(
+        cpp_func,
+        f'{len(results)} ONNX output(s) mapped to {len(return_types)} result(s)')
+
+    # Find the parameter each writable result aliases: an input of the ops
+    # for an in-place op, otherwise an out= tensor
+    in_place_param: ast.ParameterDecl = None
+    out_params: Dict[int, ast.ParameterDecl] = {}
+    op_inputs = [i for op in ctx.ops for i in op.inputs if isinstance(i, str)]
+    for i, return_type in enumerate(return_types):
+      alias_info = self._get_alias_info(return_type)
+      if not alias_info or not alias_info.is_writable:
+        continue
+      alias_param = self._get_aliased_parameter(cpp_func, alias_info)
+      if not alias_param:
+        raise Exception(f'"{cpp_func.torch_func.torch_schema}" ' +
+          'has alias info on its return type but no associated parameter')
+      if alias_param.identifier.value not in op_inputs:
+        out_params[i] = alias_param
+      elif len(results) > 1:
+        raise FunctionGenerationError(
+          cpp_func,
+          'in-place ops with multiple results not supported')
+      else:
+        in_place_param = alias_param
+
+    # The last op may write straight into the in-place tensor
+    in_place_op = ctx.ops[-1] if in_place_param and \
+      ctx.ops[-1].is_elementwise and ctx.ops[-1].outputs.count == 1 else None
+
     # Debug Logging
     log_params = ', '.join([p.member.identifier.value for p \
       in cpp_func.parameters if p.member.identifier])
     writer.writeline(f'ORT_LOG_FN({log_params});')
+    writer.writeline(f'ORT_PROFILE_OP("{cpp_func.torch_func.identifier.value}");')
     writer.writeline()
 
     # Fetch the ORT invoker from an at::Tensor.device()
@@ -198,66 +317,252 @@ class ORTGen:
     writer.writeline('.device());')
     writer.writeline()
 
+    # Compute the result type up front, as ATen would, and check that it
+    # and the broadcast shape fit the tensors written to
+    promotion_operands = self._get_promotion_operands(cpp_func, ctx.ops)
+    if promotion_operands:
+      true_division = any(op.name in TRUE_DIVISION_OPS for op in ctx.ops)
+      writer.write('static ORTTypePromotion type_promotion')
+      writer.writeline('(true);' if true_division else ';')
+      writer.write('auto result_type = type_promotion.GetResultType({')
+      writer.writeline(f'{", ".join(promotion_operands)}}});')
+      for out_param in ([in_place_param] if in_place_param else []) + \
+        list(out_params.values()):
+        writer.write('check_result_castable(result_type, ')
+        writer.writeline(f'{out_param.identifier.value});')
+      if in_place_param:
+        other_tensors = [o for o in promotion_operands \
+          if o != in_place_param.identifier.value and \
+            self._is_tensor_parameter(cpp_func, o)]
+        if other_tensors:
+          writer.write('check_in_place_shape(')
+          writer.write(f'{in_place_param.identifier.value}, ')
+          writer.writeline(f'{{{", ".join(other_tensors)}}});')
+      for alpha in self._get_alpha_inputs(cpp_func, ctx.ops):
+        writer.writeline(f'check_alpha(result_type, {alpha});')
+      writer.writeline()
+
+    # Elementwise ops compute operands sharing a dense layout (e.g.
+    # channels_last) in that layout instead of gathering them
+    layout_operands = self._get_layout_operands(
+      cpp_func,
+      ctx.ops,
+      results,
+      out_params)
+    if layout_operands:
+      writer.write('auto layout = get_elementwise_layout({')
+      writer.writeline(f'{", ".join(layout_operands)}}});')
+      writer.writeline()
+
     # FIXME: warn if we have not consumed all torch parameters (either as
     # an ORT input or ORT attribute).
 
+    # out= tensors are bound as outputs of the ops producing their results
+    out_bindings: Dict[ONNXOp, List[Tuple[int, ast.ParameterDecl]]] = {}
+    for i, out_param in out_params.items():
+      result_op = [o for o in ctx.ops if o.outputs is results[i].outputs][0]
+      out_bindings.setdefault(result_op, []).append(
+        (results[i].index, out_param))
+
+    # Chains of elementwise ops run as one fused kernel, unless they write
+    # into out= tensors; other ops are invoked one at a time
+    if self._is_fusable(ctx.ops) and not out_bindings:
+      self._write_fused_invocation(
+        writer,
+        cpp_func,
+        ctx.ops,
+        in_place_param if in_place_op else None,
+        first_torch_param)
+    else:
+      self._write_invocations(
+        writer,
+        cpp_func,
+        ctx.ops,
+        in_place_param if in_place_op else None,
+        first_torch_param,
+        results,
+        out_bindings)
+
+    # Several results, results written into out= tensors and results picked
+    # from ops with several outputs (e.g. int64 indices) take the general path
+    if len(results) > 1 or out_bindings or results[0].outputs.count > 1:
+      self._write_results(
+        writer,
+        cpp_func,
+        results,
+        out_params,
+        out_bindings,
+        first_torch_param)
+      return
+
+    if not in_place_param:
+      writer.writeline('return aten_tensor_from_ort(')
+      writer.push_indent()
+      writer.writeline(f'std::move({results[0]}),')
+      writer.write(f'{first_torch_param.identifier.value}.options()')
+      if promotion_operands:
+        writer.write('.dtype(result_type)')
+      writer.writeline(',\nlayout);' if layout_operands else ');')
+      writer.pop_indent()
+      return
+
+    # Record which path the in-place op took; the result is only copied into
+    # the in-place tensor if the kernel could not write to it directly
+    writer.write('static auto& in_place_counter = get_in_place_counter(')
+    writer.writeline(f'"{cpp_func.torch_func.identifier.value}");')
+    if in_place_op:
+      writer.writeline('if (ort_in_place) {')
+      writer.push_indent()
+      writer.writeline('in_place_counter.in_place++;')
+      writer.pop_indent()
+      writer.writeline('} else {')
+      writer.push_indent()
+    writer.writeline('in_place_counter.copied++;')
+    writer.write(f'copy_into_tensor(invoker, {results[0]}, ')
+    writer.write(in_place_param.identifier.value)
+    writer.writeline(', layout);' if layout_operands else ');')
+    if in_place_op:
+      writer.pop_indent()
+      writer.writeline('}')
+    writer.writeline(f'return {in_place_param.identifier.value};')
+
+  def _write_invocations(
+    self,
+    writer: writer.SourceWriter,
+    cpp_func: ast.FunctionDecl,
+    ops: List[ONNXOp],
+    in_place_param: Optional[ast.ParameterDecl],
+    first_torch_param: ast.ParameterDecl,
+    results: List[Output],
+    out_bindings: Dict[ONNXOp, List[Tuple[int, ast.ParameterDecl]]]):
     # Perform kernel fission on the ATen op to yield a chain of ORT Invokes
     # e.g. aten::add(x, y, α) -> onnx::Add(x, onnx::Mul(α, y))
-    for onnx_op_index, onnx_op in enumerate(ctx.ops):
+    status_declared = False
+    attrs_declared = 0
+
+    # Values used by several ops (e.g. self in max.dim) are created once and
+    # only moved into their last use
+    last_uses = {}
+    for onnx_op in ops:
+      for op_input in onnx_op.inputs:
+        last_uses[self._get_ort_input_name(cpp_func, op_input)] = onnx_op
+    created_inputs = set()
+
+    for onnx_op in ops:
+      # Multiplying an intermediate by a scalar that is one at runtime (e.g.
+      # the α above) is folded away, saving a constant and a kernel launch
+      identity_scalar = None
+      if onnx_op.outputs not in [r.outputs for r in results]:
+        identity_scalar = self._get_identity_scalar_input(cpp_func, onnx_op)
+
       # Torch -> ORT inputs
+      created_any_input = False
       for op_input in onnx_op.inputs:
-        if isinstance(op_input, Outputs):
+        if isinstance(op_input, (Outputs, Output)) or \
+          op_input == identity_scalar or op_input in created_inputs:
           continue
-        # See if this input is aliased as an in-place tensor
-        cpp_param = cpp_func.get_parameter(op_input)
-        if return_alias_info and cpp_param and \
-          len(cpp_param.torch_param) == 1 and \
-          self._get_alias_info(cpp_param.torch_param[0]) == return_alias_info:
-          in_place_param = cpp_param
-
-        writer.write(f'auto ort_input_{op_input} = ')
-        writer.writeline(f'create_ort_value(invoker, {op_input});')
-
-      # Torch kwargs -> ORT attributes
-      attrs = { k:v for k, v in onnx_op.attributes.items() if v }
+        created_inputs.add(op_input)
+        created_any_input = True
+        self._write_create_ort_value(
+          writer,
+          cpp_func,
+          onnx_op,
+          op_input,
+          first_torch_param)
+
+      op_inputs = [self._get_ort_input_name(cpp_func, i) \
+        for i in onnx_op.inputs]
+      moved_inputs = [f'std::move({i})' if last_uses[i] is onnx_op else i \
+        for i in op_inputs]
+
+      # Outputs vector
+      if created_any_input or onnx_op is ops[0]:
+        writer.writeline()
+      writer.write(f'std::vector<OrtValue> {onnx_op.outputs}')
+      writer.writeline(f'({onnx_op.outputs.count});')
+
+      if identity_scalar:
+        identity_input = [i for i, n in zip(op_inputs, onnx_op.inputs) \
+          if n != identity_scalar][0]
+        writer.writeline()
+        writer.writeline(f'if ({identity_scalar}.toDouble() == 1) {{')
+        writer.push_indent()
+        writer.writeline(f'{onnx_op.outputs}[0] = ' +
+          [m for i, m in zip(op_inputs, moved_inputs) \
+            if i == identity_input][0] + ';')
+        writer.pop_indent()
+        writer.writeline('} else {')
+        writer.push_indent()
+        self._write_create_ort_value(
+          writer,
+          cpp_func,
+          onnx_op,
+          identity_scalar,
+          first_torch_param)
+
+      # Torch kwargs -> ORT attributes; attributes given as literals in the
+      # mapping are built once
+      attrs = { k:v for k, v in onnx_op.attributes.items() \
+        if v is not None and v != '' }
       if len(attrs) > 0:
-        attrs_arg = 'attrs'
+        attrs_arg = f'attrs_{attrs_declared}' if attrs_declared else 'attrs'
+        attrs_declared += 1
         writer.writeline()
-        writer.writeline(f'NodeAttributes {attrs_arg}({len(attrs)});')
-        for attr_name, attr in attrs.items():
-          writer.write(f'{attrs_arg}[AttrName::{attr_name}] = ')
-          writer.write('create_ort_attribute(')
-          writer.writeline(f'AttrName::{attr_name}, {attr});')
+        if all(not isinstance(v, str) for v in attrs.values()):
+          writer.writeline(f'static const NodeAttributes {attrs_arg} = []() {{')
+          writer.push_indent()
+          self._write_attributes(writer, onnx_op, attrs, attrs_arg)
+          writer.writeline(f'return {attrs_arg};')
+          writer.pop_indent()
+          writer.writeline('}();')
+        else:
+          self._write_attributes(writer, onnx_op, attrs, attrs_arg)
         attrs_arg = f'&{attrs_arg}'
       else:
         attrs_arg = 'nullptr'
 
-      # Outputs vector
-      writer.writeline()
-      writer.write(f'std::vector<OrtValue> {onnx_op.outputs}')
-      writer.writeline(f'({onnx_op.outputs.count});')
+      # Bind the in-place tensor as the kernel output when possible
+      if in_place_param and onnx_op is ops[-1]:
+        writer.write('auto ort_in_place = bind_in_place_output(invoker, ')
+        writer.writeline(f'{in_place_param.identifier.value}, {{')
+        writer.push_indent()
+        for op_input in op_inputs:
+          writer.writeline(f'&{op_input},')
+        writer.pop_indent()
+        writer.write(f'}}, {onnx_op.outputs}[0]')
+        writer.writeline(self._get_layout_arg(cpp_func) + ');')
 
-      # Perform the invocation
+      # Perform the invocation through a kernel handle resolved on first use
       writer.writeline()
-      if onnx_op_index == 0:
-        writer.write('auto ')
-      writer.writeline(f'status = invoker.Invoke("{onnx_op.name}", {{')
-      writer.push_indent()
-      for op_input in onnx_op.inputs:
-        if isinstance(op_input, Outputs):
-          if op_input.count != 1:
-            raise FunctionGenerationError(
-              cpp_func,
-              'multiple outputs not supported')
-          op_input = f'{op_input}[0]'
-        else:
-          op_input = f'ort_input_{op_input}'
-        writer.writeline(f'std::move({op_input}),')
-      writer.pop_indent()
-      writer.write(f'}}, {onnx_op.outputs}, {attrs_arg}')
+      writer.write(f'static const ORTKernel {onnx_op.kernel_name}("{onnx_op.name}"')
       if onnx_op.domain:
         writer.write(f', {onnx_op.domain}')
       writer.writeline(');')
+
+      # Bind out= tensors as the kernel outputs when possible
+      if onnx_op in out_bindings:
+        writer.write(f'auto {onnx_op.out_bound_name} = bind_out_outputs(')
+        writer.writeline(f'invoker, {onnx_op.kernel_name}, {{')
+        writer.push_indent()
+        for op_input in op_inputs:
+          writer.writeline(f'&{op_input},')
+        writer.pop_indent()
+        writer.writeline(f'}}, {attrs_arg}, {{')
+        writer.push_indent()
+        for index, out_param in out_bindings[onnx_op]:
+          writer.writeline(f'{{{index}, {out_param.identifier.value}}},')
+        writer.pop_indent()
+        writer.writeline(f'}}, {onnx_op.outputs});')
+
+      if not status_declared:
+        writer.write('auto ')
+        status_declared = not identity_scalar
+      writer.writeline(f'status = invoke(invoker, {onnx_op.kernel_name}, {{')
+      writer.push_indent()
+      for op_input in moved_inputs:
+        writer.writeline(f'{op_input},')
+      writer.pop_indent()
+      writer.writeline(f'}}, {onnx_op.outputs}, {attrs_arg});')
       writer.writeline()
 
       # Assert invocation
@@ -268,33 +573,241 @@ class ORTGen:
       writer.writeline('"ORT return failure status:" + status.ErrorMessage());')
       writer.pop_indent()
       writer.pop_indent()
-      writer.writeline()
 
-      # We'll potentially return back to Torch from this op
-      return_outputs = onnx_op.outputs
+      if identity_scalar:
+        writer.pop_indent()
+        writer.writeline('}')
 
-    # TODO: Pick the right "out" Torch parameter; do not assume the first one
-    # TODO: Handle mutliple results
-    # TODO: Assert return type
+      writer.writeline()
 
-    if not return_alias_info:
-      writer.writeline('return aten_tensor_from_ort(')
+  def _get_ort_input_name(
+    self,
+    cpp_func: ast.FunctionDecl,
+    op_input: str or Outputs or Output) -> str:
+    if isinstance(op_input, Output):
+      return str(op_input)
+    if isinstance(op_input, Outputs):
+      if op_input.count != 1:
+        raise FunctionGenerationError(
+          cpp_func,
+          'an input of several outputs must select one, e.g. op[0]')
+      return f'{op_input}[0]'
+    return f'ort_input_{op_input}'
+
+  def _write_results(
+    self,
+    writer: writer.SourceWriter,
+    cpp_func: ast.FunctionDecl,
+    results: List[Output],
+    out_params: Dict[int, ast.ParameterDecl],
+    out_bindings: Dict[ONNXOp, List[Tuple[int, ast.ParameterDecl]]],
+    first_torch_param: ast.ParameterDecl):
+    # Results are only written into out= tensors if the kernels could not
+    # write to them directly
+    if out_bindings:
+      writer.write('static auto& in_place_counter = get_in_place_counter(')
+      writer.writeline(f'"{cpp_func.torch_func.identifier.value}");')
+    for onnx_op, bindings in out_bindings.items():
+      writer.writeline(f'if ({onnx_op.out_bound_name}) {{')
+      writer.push_indent()
+      writer.writeline('in_place_counter.in_place++;')
+      writer.pop_indent()
+      writer.writeline('} else {')
       writer.push_indent()
-      writer.writeline(f'std::move({return_outputs}[0]),')
-      writer.writeline(f'{first_torch_param.identifier.value}.options());')
+      writer.writeline('in_place_counter.copied++;')
+      for index, out_param in bindings:
+        writer.write(f'set_out_tensor(invoker, {onnx_op.outputs}[{index}], ')
+        writer.writeline(f'{out_param.identifier.value});')
       writer.pop_indent()
+      writer.writeline('}')
+
+    # Other results take the element type of the ONNX output, e.g. int64
+    # indices
+    result_values = []
+    for i, result in enumerate(results):
+      if i in out_params:
+        result_values.append(out_params[i].identifier.value)
+      else:
+        result_values.append(f'aten_tensor_from_ort_typed(std::move({result}), ' +
+          f'{first_torch_param.identifier.value}.options())')
+
+    if len(result_values) == 1:
+      writer.writeline(f'return {result_values[0]};')
       return
 
-    if not in_place_param:
-      raise Exception(f'"{cpp_func.torch_func.torch_schema}" ' +
-        'has alias info on its return type but no associated parameter')
-
-    writer.writeline(f'auto& ort_result_tensor = {return_outputs}[0].Get<onnxruntime::Tensor>();')
-    writer.writeline('auto* ort_result_data = ort_result_tensor.DataRaw(ort_result_tensor.DataType());')
-    writer.writeline(f'auto* ort_self_tensor = ort_input_{in_place_param.identifier.value}.GetMutable<onnxruntime::Tensor>();')
-    writer.writeline('auto* ort_self_data = ort_self_tensor->MutableDataRaw(ort_self_tensor->DataType());')
-    writer.writeline('memcpy(ort_self_data, ort_result_data, ort_self_tensor->DataType()->Size() * ort_self_tensor->Shape().Size());')
-    writer.writeline(f'return {in_place_param.identifier.value};')
+    writer.write('return ')
+    cpp_func.return_type.write(writer)
+    writer.writeline('(')
+    writer.push_indent()
+    writer.writeline(',\n'.join(result_values) + ');')
+    writer.pop_indent()
+
+  def _write_attributes(
+    self,
+    writer: writer.SourceWriter,
+    onnx_op: ONNXOp,
+    attrs: Dict[str, str or int or float],
+    attrs_arg: str):
+    writer.writeline(f'NodeAttributes {attrs_arg}({len(attrs)});')
+    for attr_name, attr in attrs.items():
+      if isinstance(attr, bool):
+        attr = str(attr).lower()
+      writer.write(f'{attrs_arg}[AttrName::{attr_name}] = ')
+      attr_type = onnx_op.attribute_types.get(attr_name)
+      if attr_type == AttrType.INTS:
+        writer.writeline(
+          f'create_ort_ints_attribute(AttrName::{attr_name}, {attr});')
+        continue
+      writer.write('create_ort_attribute(')
+      writer.write(f'AttrName::{attr_name}, {attr}')
+      if attr_type:
+        writer.write(f', {attr_type}')
+      writer.writeline(');')
+
+  def _is_fusable(self, ops: List[ONNXOp]) -> bool:
+    return len(ops) > 1 and all(op.is_elementwise and \
+      op.outputs.count == 1 and \
+      not any(isinstance(i, Output) for i in op.inputs) and \
+      not any(op.attributes.values()) for op in ops)
+
+  def _write_fused_invocation(
+    self,
+    writer: writer.SourceWriter,
+    cpp_func: ast.FunctionDecl,
+    ops: List[ONNXOp],
+    in_place_param: Optional[ast.ParameterDecl],
+    first_torch_param: ast.ParameterDecl):
+    # Lower the chain to a single ORTFusedGraph invocation, e.g.
+    # aten::add(x, y, α) -> Fused(onnx::Add(x, onnx::Mul(α, y))), so that
+    # no intermediate is materialized
+    identity_ops = {}
+    for onnx_op in ops[:-1]:
+      identity_scalar = self._get_identity_scalar_input(cpp_func, onnx_op)
+      if identity_scalar:
+        identity_ops[onnx_op] = identity_scalar
+
+    # Torch -> ORT inputs; identity scalars are only created if not folded
+    input_ops = {}
+    for onnx_op in ops:
+      for op_input in onnx_op.inputs:
+        if not isinstance(op_input, Outputs):
+          input_ops.setdefault(op_input, onnx_op)
+    for op_input, onnx_op in input_ops.items():
+      if op_input not in identity_ops.values():
+        self._write_create_ort_value(
+          writer,
+          cpp_func,
+          onnx_op,
+          op_input,
+          first_torch_param)
+
+    # Outputs vector
+    writer.writeline()
+    writer.writeline(f'std::vector<OrtValue> {ops[-1].outputs}(1);')
+
+    # Bind the in-place tensor as the graph output when possible; the output
+    # takes the element type of the input at the root of the first operands
+    if in_place_param:
+      result_input = ops[-1].inputs[0]
+      while isinstance(result_input, Outputs):
+        result_input = [o for o in ops \
+          if o.outputs is result_input][0].inputs[0]
+      bound_inputs = [result_input] + [i for i in input_ops \
+        if i != result_input and i not in identity_ops.values()]
+      writer.write('auto ort_in_place = bind_in_place_output(invoker, ')
+      writer.writeline(f'{in_place_param.identifier.value}, {{')
+      writer.push_indent()
+      for op_input in bound_inputs:
+        writer.writeline(f'&ort_input_{op_input},')
+      writer.pop_indent()
+      writer.write(f'}}, {ops[-1].outputs}[0]')
+      writer.writeline(self._get_layout_arg(cpp_func) + ');')
+
+    writer.writeline()
+    if identity_ops:
+      # Multiplications by scalars that are one at runtime are folded away
+      condition = ' && '.join([f'{s}.toDouble() == 1' \
+        for s in identity_ops.values()])
+      writer.writeline('onnxruntime::common::Status status;')
+      writer.writeline(f'if ({condition}) {{')
+      writer.push_indent()
+      self._write_fused_graph_invocation(
+        writer,
+        [o for o in ops if o not in identity_ops],
+        identity_ops,
+        False)
+      writer.pop_indent()
+      writer.writeline('} else {')
+      writer.push_indent()
+      for onnx_op, identity_scalar in identity_ops.items():
+        self._write_create_ort_value(
+          writer,
+          cpp_func,
+          onnx_op,
+          identity_scalar,
+          first_torch_param)
+      writer.writeline()
+      self._write_fused_graph_invocation(writer, ops, identity_ops, False)
+      writer.pop_indent()
+      writer.writeline('}')
+    else:
+      self._write_fused_graph_invocation(writer, ops, identity_ops, True)
+    writer.writeline()
+
+    # Assert invocation
+    writer.writeline('if (!status.IsOK())')
+    writer.push_indent()
+    writer.writeline('throw std::runtime_error(')
+    writer.push_indent()
+    writer.writeline('"ORT return failure status:" + status.ErrorMessage());')
+    writer.pop_indent()
+    writer.pop_indent()
+    writer.writeline()
+
+  def _write_fused_graph_invocation(
+    self,
+    writer: writer.SourceWriter,
+    ops: List[ONNXOp],
+    identity_ops: Dict[ONNXOp, str],
+    declare_status: bool):
+    # Outputs of folded ops are the operand they would have been multiplied
+    # with; the last op is never folded
+    folded_outputs = {}
+    for onnx_op, identity_scalar in identity_ops.items():
+      folded_outputs[onnx_op.outputs] = [i for i in onnx_op.inputs \
+        if i != identity_scalar][0]
+
+    graph_inputs = []
+    nodes = []
+    for onnx_op in ops:
+      node_inputs = []
+      for op_input in onnx_op.inputs:
+        while op_input in folded_outputs and op_input not in \
+          [o.outputs for o in ops]:
+          op_input = folded_outputs[op_input]
+        if isinstance(op_input, Outputs):
+          node = [o.outputs for o in ops].index(op_input)
+          node_inputs.append(f'ORTFusedGraph::NodeOutput({node})')
+        else:
+          if op_input not in graph_inputs:
+            graph_inputs.append(op_input)
+          node_inputs.append(str(graph_inputs.index(op_input)))
+      nodes.append((onnx_op.name, node_inputs))
+
+    writer.writeline('static const ORTFusedGraph fused_graph({')
+    writer.push_indent()
+    for op_name, node_inputs in nodes:
+      writer.writeline(f'{{"{op_name}", {{{", ".join(node_inputs)}}}}},')
+    writer.pop_indent()
+    writer.writeline('});')
+    if declare_status:
+      writer.write('auto ')
+    writer.writeline('status = invoke_fused(invoker, fused_graph, {')
+    writer.push_indent()
+    for op_input in graph_inputs:
+      writer.writeline(f'std::move(ort_input_{op_input}),')
+    writer.pop_indent()
+    writer.writeline(f'}}, {ops[-1].outputs});')
 
   def _write_function_registrations(
     self,
@@ -316,6 +829,227 @@ class ORTGen:
     writer.writeline('}')
     writer.writeline()
 
+  def _write_create_ort_value(
+    self,
+    writer: writer.SourceWriter,
+    cpp_func: ast.FunctionDecl,
+    onnx_op: ONNXOp,
+    op_input: str,
+    first_torch_param: ast.ParameterDecl):
+    writer.write(f'auto ort_input_{op_input} = ')
+    # ONNX takes counts and axes as 1-D tensors, e.g. the k of TopK
+    if self._is_int_parameter(cpp_func, op_input):
+      writer.writeline(
+        f'create_ort_value(invoker, std::vector<int64_t>{{{op_input}}});')
+      return
+    layout_arg = self._get_layout_arg(cpp_func) \
+      if op_input in cpp_func.layout_inputs else ''
+    # Operands of promoting ops are created in the promoted type
+    if op_input in cpp_func.promoted_inputs:
+      writer.write(f'create_ort_value(invoker, {op_input}, result_type')
+      writer.writeline(f'{layout_arg});')
+      return
+    if layout_arg:
+      writer.writeline(f'create_ort_value(invoker, {op_input}{layout_arg});')
+      return
+    writer.write(f'create_ort_value(invoker, {op_input}')
+    # Scalars take the type of the tensor they are combined with, so that
+    # e.g. alpha in Mul('alpha', 'other') matches the type of other
+    if self._is_scalar_parameter(cpp_func, op_input):
+      tensor_inputs = [i for i in onnx_op.inputs \
+        if not isinstance(i, (Outputs, Output)) and \
+          self._is_tensor_parameter(cpp_func, i)]
+      type_source = tensor_inputs[0] if tensor_inputs \
+        else first_torch_param.identifier.value
+      writer.write(f', {type_source}.scalar_type()')
+    writer.writeline(');')
+
+  def _is_scalar_parameter(self, cpp_func: ast.FunctionDecl, name: str):
+    return self._is_parameter_of_type(cpp_func, name, ast.ScalarType)
+
+  def _is_tensor_parameter(self, cpp_func: ast.FunctionDecl, name: str):
+    return self._is_parameter_of_type(cpp_func, name, ast.TensorType)
+
+  def _is_int_parameter(self, cpp_func: ast.FunctionDecl, name: str):
+    # An int, not an int[] or int?, which desugar to int as well
+    cpp_param = cpp_func.get_parameter(name)
+    return cpp_param is not None and \
+      len(cpp_param.torch_param) == 1 and \
+      isinstance(cpp_param.torch_param[0].parameter_type, ast.IntType)
+
+  def _is_parameter_of_type(
+    self,
+    cpp_func: ast.FunctionDecl,
+    name: str,
+    torch_type: type):
+    cpp_param = cpp_func.get_parameter(name)
+    return cpp_param is not None and \
+      len(cpp_param.torch_param) == 1 and \
+      isinstance(cpp_param.torch_param[0].parameter_type.desugar(), torch_type)
+
+  def _get_promotion_operands(
+    self,
+    cpp_func: ast.FunctionDecl,
+    ops: List[ONNXOp]) -> List[str]:
+    """
+    Returns the Torch parameters that ATen promotes to a common type for
+    the promoting ops in ops (e.g. self and other, but not alpha, for
+    aten::add), or an empty list if the result type is not computed. The
+    inputs of the promoting ops are recorded in cpp_func.promoted_inputs.
+    """
+    cpp_func.promoted_inputs = set()
+    promoting_ops = [o for o in ops if not o.domain and o.name in PROMOTING_OPS]
+    promoting_outputs = [o.outputs for o in promoting_ops]
+    operands = []
+    for onnx_op in promoting_ops:
+      identity_scalar = self._get_identity_scalar_input(cpp_func, onnx_op)
+      for op_input in onnx_op.inputs:
+        if isinstance(op_input, Output):
+          op_input = op_input.outputs
+        if isinstance(op_input, Outputs):
+          # An input computed by another kind of op may have any type
+          if op_input not in promoting_outputs:
+            return []
+        elif not self._is_tensor_parameter(cpp_func, op_input) and \
+          not self._is_scalar_parameter(cpp_func, op_input):
+          return []
+        elif op_input != identity_scalar and op_input not in operands:
+          operands.append(op_input)
+
+    if len(operands) < 2 or \
+      not any(self._is_tensor_parameter(cpp_func, o) for o in operands):
+      return []
+
+    param_names = [p.member.identifier.value for p in cpp_func.parameters \
+      if p.member.identifier]
+    operands.sort(key=param_names.index)
+
+    for onnx_op in promoting_ops:
+      cpp_func.promoted_inputs.update([i for i in onnx_op.inputs \
+        if not isinstance(i, (Outputs, Output))])
+    return operands
+
+  def _get_alpha_inputs(
+    self,
+    cpp_func: ast.FunctionDecl,
+    ops: List[ONNXOp]) -> List[str]:
+    """
+    Returns the at::Scalar parameters scaling an operand of an Add or Sub
+    in ops (e.g. alpha for aten::add), which ATen checks against the result
+    type.
+    """
+    alphas = []
+    for onnx_op in ops:
+      if onnx_op.domain or onnx_op.name not in ('Add', 'Sub'):
+        continue
+      for op_input in onnx_op.inputs:
+        if isinstance(op_input, Output):
+          op_input = op_input.outputs
+        scaling_op = [o for o in ops if o.outputs is op_input]
+        if scaling_op:
+          alpha = self._get_identity_scalar_input(cpp_func, scaling_op[0])
+          if alpha and alpha not in alphas:
+            alphas.append(alpha)
+    return alphas
+
+  def _get_layout_operands(
+    self,
+    cpp_func: ast.FunctionDecl,
+    ops: List[ONNXOp],
+    results: List[Output],
+    out_params: Dict[int, ast.ParameterDecl]) -> List[str]:
+    """
+    Returns the tensor parameters whose shared layout the ops compute in if
+    they are all elementwise, or an empty list if they are computed in the
+    contiguous layout. They are recorded in cpp_func.layout_inputs.
+    """
+    cpp_func.layout_inputs = set()
+    if out_params or len(results) != 1 or not all(op.is_elementwise and \
+      op.outputs.count == 1 for op in ops):
+      return []
+
+    param_names = [p.member.identifier.value for p in cpp_func.parameters \
+      if p.member.identifier]
+    operands = sorted(set([i for op in ops for i in op.inputs \
+      if not isinstance(i, (Outputs, Output)) and \
+        self._is_tensor_parameter(cpp_func, i)]), key=param_names.index)
+    cpp_func.layout_inputs.update(operands)
+    return operands
+
+  def _get_layout_arg(self, cpp_func: ast.FunctionDecl) -> str:
+    return ', layout' if cpp_func.layout_inputs else ''
+
+  def _get_identity_scalar_input(
+    self,
+    cpp_func: ast.FunctionDecl,
+    onnx_op: ONNXOp) -> Optional[str]:
+    """
+    Returns the name of the at::Scalar parameter that onnx_op multiplies
+    its other input by, or None if onnx_op is not such a multiplication.
+    """
+    if onnx_op.name != 'Mul' or onnx_op.domain or len(onnx_op.inputs) != 2:
+      return None
+    scalar_inputs = [i for i in onnx_op.inputs \
+      if not isinstance(i, (Outputs, Output)) and \
+        self._is_scalar_parameter(cpp_func, i)]
+    return scalar_inputs[0] if len(scalar_inputs) == 1 else None
+
+  def _eval_results(
+    self,
+    cpp_func: ast.FunctionDecl,
+    onnx_op: ONNXOp or Tuple[ONNXOp or ONNXOpOutput, ...],
+    ctx: ONNXOpEvalContext) -> List[Output]:
+    # A single op returns all of its outputs; a tuple maps each Torch result
+    # to an op with a single output or to one output of an op
+    if not isinstance(onnx_op, tuple):
+      outputs = onnx_op.eval(ctx)
+      return [Output(outputs, i) for i in range(outputs.count)]
+
+    results = []
+    for result in onnx_op:
+      output = result.eval(ctx)
+      if isinstance(output, Outputs):
+        if output.count != 1:
+          raise FunctionGenerationError(
+            cpp_func,
+            'a result of several outputs must select one, e.g. op[0]')
+        output = Output(output, 0)
+      results.append(output)
+    return results
+
+  def _get_return_types(self, torch_func: ast.FunctionDecl) -> List[ast.Type]:
+    if isinstance(torch_func.return_type, ast.TupleType):
+      return [m.member.element_type for m in torch_func.return_type.elements]
+    return [torch_func.return_type]
+
+  def _get_aliased_parameter(
+    self,
+    cpp_func: ast.FunctionDecl,
+    alias_info: ast.AliasInfo) -> Optional[ast.ParameterDecl]:
+    for cpp_param in [p.member for p in cpp_func.parameters]:
+      if len(cpp_param.torch_param) == 1 and \
+        self._get_alias_info(cpp_param.torch_param[0]) == alias_info:
+        return cpp_param
+    return None
+
+  def _get_out_parameters(
+    self,
+    torch_func: ast.FunctionDecl) -> List[ast.ParameterDecl]:
+    """
+    Returns the out= tensors of torch_func: the writable keyword-only
+    parameters of e.g. aten::add.out.
+    """
+    out_params = []
+    kwargs = False
+    for torch_param in [p.member for p in torch_func.parameters]:
+      if isinstance(torch_param.parameter_type, ast.KWArgsSentinelType):
+        kwargs = True
+        continue
+      alias_info = self._get_alias_info(torch_param)
+      if kwargs and alias_info and alias_info.is_writable:
+        out_params.append(torch_param)
+    return out_params
+
   def _get_alias_info(self, torch_type_or_param: ast.Type or ast.ParameterDecl):
     if isinstance(torch_type_or_param, ast.ParameterDecl):
       torch_type = torch_type_or_param.parameter_type
@@ -326,6 +1060,10 @@ class ORTGen:
   def _torch_function_needs_unboxed_registration(
     self,
     torch_func: ast.FunctionDecl):
+    # out= overloads have legacy signatures, with the out tensors first
+    if self._get_out_parameters(torch_func):
+      return True
+
     if self._torch_type_needs_unboxed_registration(torch_func.return_type):
       return True
 
@@ -347,6 +1085,12 @@ class ORTGen:
       ast.IntType,
       ast.KWArgsSentinelType))
 
+  def _is_mapped_decl_line(self, line: str) -> bool:
+    # Keep lines that are not a declaration followed by a Torch schema so
+    # that they still reach the parser
+    match = ORTGen._schema_name_pattern.search(line)
+    return not match or match.group(1) in self._mapped_ops
+
   def _parse_function_decls(self, cpp_parser: parser.CPPParser):
     # Parse the C++ declarations
     tu = cpp_parser.parse_translation_unit()
@@ -380,8 +1124,19 @@ class ORTGen:
     if cpp_func.return_type:
       cpp_func.return_type.torch_type = torch_func.return_type
 
-    # Synthesize KWArgsSentinelType in the C++ declaration if we have one
-    for i, torch_param in enumerate([p.member for p in torch_func.parameters]):
+    # The C++ declarations of out= overloads take the out tensors first
+    torch_params = [p.member for p in torch_func.parameters]
+    out_params = self._get_out_parameters(torch_func)
+    first_cpp_param = cpp_func.parameters.members[0].member \
+      if len(cpp_func.parameters) > 0 else None
+    if out_params and first_cpp_param and first_cpp_param.identifier and \
+      first_cpp_param.identifier.value == out_params[0].identifier.value:
+      torch_params = out_params + \
+        [p for p in torch_params if p not in out_params]
+
+    # Synthesize KWArgsSentinelType in the C++ declaration if we have one,
+    # unless only out tensors, which come first, follow it
+    for i, torch_param in enumerate(torch_params[:-1]):
       if isinstance(torch_param.parameter_type, ast.KWArgsSentinelType):
         cpp_func.parameters.members.insert(i, ast.SyntaxListMember(
           torch_param,
@@ -399,7 +1154,7 @@ class ORTGen:
         torch_param_range = 4
 
       for j in range(torch_param_range):
-        torch_param = torch_func.parameters[i + j].member
+        torch_param = torch_params[i + j]
         cpp_param.torch_param.append(torch_param)
 
     return cpp_func, torch_func
\ No newline at end of file
@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import re
+
 from enum import Enum
 from abc import ABC
 
@@ -115,6 +117,13 @@ class Reader(ABC):
   def read_char(self) -> str:
     return None
 
+  def read_all(self) -> str:
+    """
+    Reads the rest of the source at once, or returns None if the reader
+    can only be read char by char.
+    """
+    return None
+
 class FileReader(Reader):
   def __init__(self, path: str):
     self.path = path
@@ -128,6 +137,9 @@ class FileReader(Reader):
   def read_char(self) -> str:
     return self.fp.read(1)
 
+  def read_all(self) -> str:
+    return self.fp.read()
+
 class StringReader(Reader):
   def __init__(self, buffer: str):
     self.buffer = buffer
@@ -140,6 +152,11 @@ class StringReader(Reader):
       return c
     return None
 
+  def read_all(self) -> str:
+    rest = self.buffer[self.position:]
+    self.position = len(self.buffer)
+    return rest
+
 class Lexer(object):
   _peek: str
   _next_token: Token
@@ -162,13 +179,41 @@ class Lexer(object):
     '*': TokenKind.MUL
   }
 
-  def __init__(self, reader: Reader):
+  # Matches a single token of the source when the whole source is available,
+  # which is much faster than lexing char by char. _lex_core remains the
+  # reference for the token kinds and values each alternative produces.
+  token_pattern = re.compile(r'''
+    (?P<WHITESPACE>\s+)
+    |(?P<SINGLE_LINE_COMMENT>//[^\n]*)
+    |(?P<MULTI_LINE_COMMENT>/\*)
+    |(?P<IDENTIFIER>[^\W\d][\w:.]*)
+    |(?P<ARROW>->)
+    |(?P<NUMBER>-?(?:\d+(?:\.\d*)?|\.\d*)(?:[eE]-?\d*)?)
+    |(?P<DOUBLECOLON>::)
+    |(?P<STRING>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<CHAR>.)
+    ''', re.VERBOSE | re.DOTALL)
+
+  string_escape_pattern = re.compile(r'\\(.)', re.DOTALL)
+
+  char_to_fast_token_kind = {
+    **char_to_token_kind,
+    ':': TokenKind.COLON,
+    '/': TokenKind.DIV,
+    '-': TokenKind.MINUS
+  }
+
+  def __init__(self, reader: Reader, use_fast_path: bool = True):
     self._reader = reader
     self._peek = None
     self._current_token_location = SourceLocation()
     self._next_token_location = SourceLocation()
     self._next_token = None
     self._first_token_leading_trivia = []
+    self._use_fast_path = use_fast_path
+    self._buffer = None
+    self._position = 0
+    self._line_filter = None
 
   def __enter__(self):
     self._reader.open()
@@ -202,6 +247,16 @@ class Lexer(object):
   def set_source_location(self, origin: SourceLocation):
     self._current_token_location = origin
 
+  def set_line_filter(self, line_filter):
+    """
+    Blanks out the source lines for which line_filter returns False before
+    they are lexed, so that e.g. declarations of no interest are never
+    tokenized. Lines are replaced with whitespace of the same length, so
+    the locations of the remaining tokens are unchanged. Must be set before
+    the first token is lexed, and only applies to the fast path.
+    """
+    self._line_filter = line_filter
+
   def lex(self) -> Token:
     """
     Lex a single semantic token from the source, gathering into it
@@ -246,6 +301,12 @@ class Lexer(object):
       self._next_token = None
       return token
 
+    if self._use_fast_path:
+      if self._buffer is None:
+        self._read_buffer()
+      if self._buffer is not None:
+        return self._lex_core_fast()
+
     self._next_token_location = self._current_token_location
 
     c = self._peek_char()
@@ -302,6 +363,48 @@ class Lexer(object):
 
     return self._make_token(TokenKind.UNKNOWN, c)
 
+  def _read_buffer(self):
+    self._buffer = self._reader.read_all()
+    if self._buffer is None:
+      # Only readable char by char
+      self._use_fast_path = False
+    elif self._line_filter:
+      self._buffer = '\n'.join([line if self._line_filter(line) \
+        else ' ' * len(line) for line in self._buffer.split('\n')])
+
+  def _lex_core_fast(self) -> Token:
+    self._next_token_location = self._current_token_location
+
+    if self._position >= len(self._buffer):
+      return self._make_token(TokenKind.EOF, None)
+
+    match = Lexer.token_pattern.match(self._buffer, self._position)
+    text = match.group()
+    self._position = match.end()
+
+    location = self._current_token_location
+    newlines = text.count('\n')
+    if newlines:
+      self._current_token_location = SourceLocation(
+        location.offset + len(text),
+        location.line + newlines,
+        len(text) - text.rindex('\n'))
+    else:
+      self._current_token_location = location.increment_column(len(text))
+
+    group = match.lastgroup
+    if group == 'CHAR':
+      return self._make_token(
+        Lexer.char_to_fast_token_kind.get(text, TokenKind.UNKNOWN),
+        text)
+    if group == 'STRING':
+      return self._make_token(
+        TokenKind.STRING,
+        Lexer.string_escape_pattern.sub(r'\1', text[1:-1]))
+    if group == 'MULTI_LINE_COMMENT':
+      raise NotImplementedError("Multi-line comments not supported")
+    return self._make_token(TokenKind[group], text)
+
   def _lex_number(self, s: str = "") -> Token:
     s += self._read_char()
 
@@ -40,6 +40,9 @@ class ParserBase(object):
   def set_source_location(self, origin: SourceLocation):
     self._lexer.set_source_location(origin)
 
+  def set_line_filter(self, line_filter):
+    self._lexer.set_line_filter(line_filter)
+
   def _peek_token(
     self,
     kind: TokenKind = None,
@@ -225,11 +228,9 @@ class TorchParser(ParserBase):
 
     if self._peek_token(TokenKind.OPEN_PAREN):
       def parse_tuple_element():
-        element_type, element_alias_info = self._parse_type_and_alias()
-        if alias_info and element_alias_info:
-          alias_info.add_contained_type(element_alias_info)
+        # Keep the alias info of each element, e.g. (Tensor(a!) values, ...)
         return TupleMemberType(
-          element_type,
+          self.parse_type(),
           self._read_token() \
             if self._peek_token(TokenKind.IDENTIFIER) \
               else None)
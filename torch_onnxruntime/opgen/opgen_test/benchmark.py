@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+## Measures the opgen lexer throughput and the end-to-end generation time.
+##
+## Run from the opgen directory:
+##
+##   python -m opgen_test.benchmark [--regdecs RegistrationDeclarations.h]
+##
+## "slow" lexes char by char, "fast" uses the regex scanner. "eager" parses
+## every declaration and its Torch schema, "lazy" blanks out the declarations
+## of unmapped ops before they are lexed. Without --regdecs a synthetic file
+## of --decls declarations is used, of which --mapped are mapped.
+
+import argparse
+import io
+import time
+
+from opgen.generator import ORTGen, ONNXOp
+from opgen.lexer import Lexer, StringReader, TokenKind
+from opgen.parser import CPPParser
+from opgen.writer import SourceWriter
+
+class Abs(ONNXOp):
+  def __init__(self, x): super().__init__('Abs', 1, x)
+
+def synthesize_decls(count: int) -> str:
+  return ''.join([
+    f'Tensor & op_{i}_(Tensor & self, const Tensor & other, Scalar alpha); '
+    f'// {{"schema": "aten::op_{i}_.Tensor(Tensor(a!) self, Tensor other, '
+    f'*, Scalar alpha=1) -> Tensor(a!)", "dispatch": "True", '
+    f'"default": "False"}}\n' for i in range(count)])
+
+def count_tokens(source: str, use_fast_path: bool) -> int:
+  lexer = Lexer(StringReader(source), use_fast_path)
+  count = 1
+  while lexer.lex().kind != TokenKind.EOF:
+    count += 1
+  return count
+
+def generate(source: str, op_names: [str], lazy: bool):
+  ortgen = ORTGen({name: Abs('self') for name in op_names})
+  with CPPParser(StringReader(source)) as parser:
+    ortgen.run(parser, SourceWriter(io.StringIO()), lazy)
+
+def time_best(fn, repeat: int) -> float:
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+def main():
+  parser = argparse.ArgumentParser(description='opgen lexer and generation benchmark')
+  parser.add_argument('--regdecs', help='path to RegistrationDeclarations.h')
+  parser.add_argument('--ops', nargs='+',
+                      default=['aten::abs', 'aten::abs_', 'aten::neg', 'aten::relu'],
+                      help='ops to map when --regdecs is given')
+  parser.add_argument('--decls', type=int, default=2000,
+                      help='number of synthetic declarations')
+  parser.add_argument('--mapped', type=int, default=20,
+                      help='number of synthetic declarations to map')
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  if args.regdecs:
+    with open(args.regdecs, 'rt') as f:
+      source = f.read()
+    op_names = args.ops
+  else:
+    source = synthesize_decls(args.decls)
+    op_names = [f'aten::op_{i}_.Tensor' for i in range(args.mapped)]
+
+  print(f'{"lexer":<10}{"tokens":>10}{"time (s)":>12}{"tokens/s":>14}')
+  for name, use_fast_path in [('slow', False), ('fast', True)]:
+    tokens = count_tokens(source, use_fast_path)
+    elapsed = time_best(lambda: count_tokens(source, use_fast_path), args.repeat)
+    print(f'{name:<10}{tokens:>10}{elapsed:>12.3f}{tokens / elapsed:>14.0f}')
+
+  print()
+  print(f'{"generate":<10}{"time (s)":>12}')
+  for name, lazy in [('eager', False), ('lazy', True)]:
+    elapsed = time_best(lambda: generate(source, op_names, lazy), args.repeat)
+    print(f'{name:<10}{elapsed:>12.3f}')
+
+if __name__ == '__main__':
+  main()
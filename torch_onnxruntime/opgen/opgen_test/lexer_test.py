@@ -84,4 +84,33 @@ class LexerTestCase(unittest.TestCase):
       lexer.lex())
     self.assertEqual(
       Token((11, 1, 12), TokenKind.EOF, None),
-      lexer.lex())
\ No newline at end of file
+      lexer.lex())
+
+  def lex_all(self, lexer: Lexer) -> [Token]:
+    tokens = [lexer.lex()]
+    while tokens[-1].kind != TokenKind.EOF:
+      tokens.append(lexer.lex())
+    return tokens
+
+  def test_fast_path(self):
+    source = \
+      "Tensor & add_(Tensor & self, const Tensor & other, Scalar alpha);" \
+      " // {\"schema\": \"aten::add_.Tensor(Tensor(a!) self, *, " \
+      "Scalar alpha=1) -> Tensor(a!)\", \"dispatch\": \"True\"}\r\n" \
+      "::std::tuple<Tensor,Tensor> f(int[1] x=-1.5e-3, str s='a\\'b'):"
+    self.assertEqual(
+      self.lex_all(Lexer(StringReader(source), use_fast_path=False)),
+      self.lex_all(Lexer(StringReader(source), use_fast_path=True)))
+
+  def test_line_filter(self):
+    lexer = self.create_lexer("a;\nskip b;\nc;")
+    lexer.set_line_filter(lambda line: not line.startswith("skip"))
+    self.assertEqual(
+      [
+        Token((0, 1, 1), TokenKind.IDENTIFIER, "a"),
+        Token((1, 1, 2), TokenKind.SEMICOLON, ";"),
+        Token((11, 3, 1), TokenKind.IDENTIFIER, "c"),
+        Token((12, 3, 2), TokenKind.SEMICOLON, ";"),
+        Token((13, 3, 3), TokenKind.EOF, None)
+      ],
+      [Token(t.location, t.kind, t.value) for t in self.lex_all(lexer)])
@@ -0,0 +1,145 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include "ort_allocator.h"
+#include "ort_log.h"
+
+namespace torch_ort {
+namespace eager {
+
+namespace {
+  // Small blocks are rounded to 512 bytes, large blocks to 1 MiB, which
+  // bounds the waste per block while letting similar sizes share buckets.
+  constexpr size_t kSmallSize = 1 << 20;
+  constexpr size_t kSmallRounding = 512;
+  constexpr size_t kLargeRounding = 1 << 20;
+
+  inline size_t round_up(size_t size, size_t multiple) {
+    return ((size + multiple - 1) / multiple) * multiple;
+  }
+}
+
+ORTCachingAllocator::ORTCachingAllocator(
+  onnxruntime::AllocatorPtr device_allocator)
+  : onnxruntime::IAllocator(device_allocator->Info()),
+    device_allocator_(std::move(device_allocator)) {
+}
+
+ORTCachingAllocator::~ORTCachingAllocator() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  EmptyCacheLocked();
+}
+
+size_t ORTCachingAllocator::RoundSize(size_t size) {
+  return size < kSmallSize
+    ? round_up(size, kSmallRounding)
+    : round_up(size, kLargeRounding);
+}
+
+void* ORTCachingAllocator::Alloc(size_t size) {
+  if (size == 0)
+    return nullptr;
+
+  auto block_size = RoundSize(size);
+  std::lock_guard<std::mutex> lock(mutex_);
+  stats_.num_allocs++;
+
+  void* p = nullptr;
+  auto& free_list = free_blocks_[block_size];
+  if (!free_list.empty()) {
+    p = free_list.back();
+    free_list.pop_back();
+    stats_.num_cache_hits++;
+  } else {
+    try {
+      p = device_allocator_->Alloc(block_size);
+    } catch (const std::exception&) {
+      // Release the cache and retry once before giving up
+      ORT_LOG_WARNING << "ORT allocation of " << block_size
+        << " bytes failed; emptying the cache and retrying";
+      EmptyCacheLocked();
+      p = device_allocator_->Alloc(block_size);
+    }
+    stats_.num_device_allocs++;
+    stats_.reserved_bytes += block_size;
+    stats_.max_reserved_bytes = std::max(
+      stats_.max_reserved_bytes,
+      stats_.reserved_bytes);
+  }
+
+  allocated_blocks_[p] = block_size;
+  stats_.allocated_bytes += block_size;
+  stats_.max_allocated_bytes = std::max(
+    stats_.max_allocated_bytes,
+    stats_.allocated_bytes);
+  return p;
+}
+
+void ORTCachingAllocator::Free(void* p) {
+  if (!p)
+    return;
+
+  std::lock_guard<std::mutex> lock(mutex_);
+  auto lookup = allocated_blocks_.find(p);
+  ORT_ENFORCE(
+    lookup != allocated_blocks_.end(),
+    "ORT caching allocator: freeing an unknown block");
+
+  auto block_size = lookup->second;
+  allocated_blocks_.erase(lookup);
+  stats_.allocated_bytes -= block_size;
+  free_blocks_[block_size].push_back(p);
+}
+
+ORTMemoryStats ORTCachingAllocator::GetStats() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return stats_;
+}
+
+void ORTCachingAllocator::ResetPeakStats() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  stats_.max_allocated_bytes = stats_.allocated_bytes;
+  stats_.max_reserved_bytes = stats_.reserved_bytes;
+}
+
+void ORTCachingAllocator::EmptyCache() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  EmptyCacheLocked();
+}
+
+void ORTCachingAllocator::EmptyCacheLocked() {
+  for (auto& free_list : free_blocks_) {
+    for (auto* p : free_list.second) {
+      device_allocator_->Free(p);
+      stats_.num_device_frees++;
+      stats_.reserved_bytes -= free_list.first;
+    }
+  }
+  free_blocks_.clear();
+}
+
+ORTCPUExecutionProvider::ORTCPUExecutionProvider(
+  const onnxruntime::CPUExecutionProviderInfo& info)
+  : onnxruntime::CPUExecutionProvider(info),
+    caching_allocator_(std::make_shared<ORTCachingAllocator>(
+      onnxruntime::CPUExecutionProvider::GetAllocator(0, OrtMemTypeDefault))) {
+}
+
+ORTCPUExecutionProvider::ORTCPUExecutionProvider(
+  const onnxruntime::CPUExecutionProviderInfo& info,
+  std::shared_ptr<ORTCachingAllocator> caching_allocator)
+  : onnxruntime::CPUExecutionProvider(info),
+    caching_allocator_(std::move(caching_allocator)) {
+}
+
+onnxruntime::AllocatorPtr ORTCPUExecutionProvider::GetAllocator(
+  int id,
+  OrtMemType mem_type) const {
+  if (mem_type == OrtMemTypeDefault) {
+    return caching_allocator_;
+  }
+  return onnxruntime::CPUExecutionProvider::GetAllocator(id, mem_type);
+}
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,86 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <mutex>
+#include <unordered_map>
+
+#include <core/framework/allocator.h>
+#include <core/providers/cpu/cpu_execution_provider.h>
+
+namespace torch_ort {
+namespace eager {
+
+struct ORTMemoryStats {
+  // Bytes held by live tensors, rounded up to their block size
+  uint64_t allocated_bytes = 0;
+  uint64_t max_allocated_bytes = 0;
+  // Bytes obtained from the underlying allocator, including cached blocks
+  uint64_t reserved_bytes = 0;
+  uint64_t max_reserved_bytes = 0;
+  uint64_t num_allocs = 0;
+  uint64_t num_cache_hits = 0;
+  uint64_t num_device_allocs = 0;
+  uint64_t num_device_frees = 0;
+};
+
+// A caching allocator in the spirit of the CUDA caching allocator: freed
+// blocks are kept in per-size free lists and handed out again for requests
+// of the same rounded size, so the activations of a training step reuse the
+// buffers of the previous step instead of going through malloc and free.
+class ORTCachingAllocator : public onnxruntime::IAllocator {
+ public:
+  explicit ORTCachingAllocator(onnxruntime::AllocatorPtr device_allocator);
+  ~ORTCachingAllocator() override;
+
+  void* Alloc(size_t size) override;
+  void Free(void* p) override;
+
+  ORTMemoryStats GetStats() const;
+
+  void ResetPeakStats();
+
+  // Returns all cached blocks to the underlying allocator.
+  void EmptyCache();
+
+ private:
+  static size_t RoundSize(size_t size);
+
+  void EmptyCacheLocked();
+
+  onnxruntime::AllocatorPtr device_allocator_;
+  mutable std::mutex mutex_;
+  ORTMemoryStats stats_;
+  std::unordered_map<void*, size_t> allocated_blocks_;
+  std::unordered_map<size_t, std::vector<void*>> free_blocks_;
+};
+
+// The CPU execution provider backing an ORT eager device; kernel outputs and
+// tensors created by the ATen ops are allocated from its caching allocator.
+class ORTCPUExecutionProvider : public onnxruntime::CPUExecutionProvider {
+ public:
+  explicit ORTCPUExecutionProvider(
+    const onnxruntime::CPUExecutionProviderInfo& info);
+
+  // Shares the caching allocator of another provider of the same device,
+  // such as the invoker's, so that the outputs of sessions run on this
+  // provider are accounted in the device's memory stats.
+  ORTCPUExecutionProvider(
+    const onnxruntime::CPUExecutionProviderInfo& info,
+    std::shared_ptr<ORTCachingAllocator> caching_allocator);
+
+  onnxruntime::AllocatorPtr GetAllocator(
+    int id,
+    OrtMemType mem_type) const override;
+
+  ORTCachingAllocator& GetCachingAllocator() const {
+    return *caching_allocator_;
+  }
+
+ private:
+  std::shared_ptr<ORTCachingAllocator> caching_allocator_;
+};
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,171 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include "ort_async.h"
+#include "ort_shape_inference.h"
+#include "ort_util.h"
+#include "ort_log.h"
+
+namespace torch_ort {
+namespace eager {
+
+using onnxruntime::common::Status;
+
+ORTAsyncQueue::ORTAsyncQueue(onnxruntime::ORTInvoker& invoker)
+  : invoker_(invoker),
+    worker_([this] { Run(); }) {
+}
+
+ORTAsyncQueue::~ORTAsyncQueue() {
+  {
+    std::lock_guard<std::mutex> lock(mutex_);
+    stop_ = true;
+  }
+  task_available_.notify_one();
+  worker_.join();
+}
+
+bool ORTAsyncQueue::TryEnqueue(
+  const std::string& op_name,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs,
+  const onnxruntime::NodeAttributes* attributes,
+  const std::string& domain) {
+  ORT_LOG_FN(op_name, domain);
+
+  onnx::NodeProto node;
+  node.set_op_type(op_name);
+  node.set_domain(domain);
+  if (attributes) {
+    for (const auto& attribute : *attributes) {
+      *node.add_attribute() = attribute.second;
+    }
+  }
+  for (size_t i = 0; i < inputs.size(); i++) {
+    node.add_input("input_" + std::to_string(i));
+  }
+  for (size_t i = 0; i < outputs.size(); i++) {
+    node.add_output("output_" + std::to_string(i));
+  }
+
+  // Constants may only be read from buffers no queued kernel still writes
+  std::vector<ORTInferredOutput> inferred_outputs;
+  if (!InferNodeOutputs(
+    node,
+    inputs,
+    [this](const onnxruntime::Tensor& tensor) {
+      std::lock_guard<std::mutex> lock(mutex_);
+      return pending_buffers_.count(tensor.DataRaw()) == 0;
+    },
+    inferred_outputs))
+    return false;
+
+  Task task;
+  for (size_t i = 0; i < outputs.size(); i++) {
+    // Outputs bound by the caller, e.g. an in-place tensor, are kept
+    if (!outputs[i].IsAllocated()) {
+      CreateMLValue(
+        invoker_.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
+        inferred_outputs[i].element_type,
+        inferred_outputs[i].dims,
+        &outputs[i]);
+    }
+    auto* buffer = outputs[i].Get<onnxruntime::Tensor>().DataRaw();
+    if (buffer) {
+      task.output_buffers.push_back(buffer);
+    }
+  }
+
+  // The task holds references to its inputs and outputs, which keeps their
+  // buffers alive, and out of the caching allocator, until it has run
+  onnxruntime::NodeAttributes task_attributes;
+  if (attributes) {
+    task_attributes = *attributes;
+  }
+  task.run = [
+    this,
+    op_name,
+    inputs,
+    outputs,
+    has_attributes = attributes != nullptr,
+    task_attributes,
+    domain]() mutable {
+    return invoker_.Invoke(
+      op_name,
+      inputs,
+      outputs,
+      has_attributes ? &task_attributes : nullptr,
+      domain);
+  };
+
+  {
+    std::lock_guard<std::mutex> lock(mutex_);
+    pending_buffers_.insert(
+      task.output_buffers.begin(),
+      task.output_buffers.end());
+    tasks_.push_back(std::move(task));
+  }
+  task_available_.notify_one();
+  return true;
+}
+
+void ORTAsyncQueue::Synchronize() {
+  std::unique_lock<std::mutex> lock(mutex_);
+  queue_drained_.wait(lock, [this] {
+    return tasks_.empty() && num_running_ == 0;
+  });
+
+  if (!error_.IsOK()) {
+    auto error = error_;
+    error_ = Status::OK();
+    throw std::runtime_error(
+      "ORT return failure status:" + error.ErrorMessage());
+  }
+}
+
+void ORTAsyncQueue::Run() {
+  while (true) {
+    Task task;
+    bool skip;
+    {
+      std::unique_lock<std::mutex> lock(mutex_);
+      task_available_.wait(lock, [this] {
+        return stop_ || !tasks_.empty();
+      });
+      if (tasks_.empty()) {
+        return;
+      }
+      task = std::move(tasks_.front());
+      tasks_.pop_front();
+      num_running_++;
+      // Kernels queued after a failure may consume its unwritten outputs
+      skip = !error_.IsOK();
+    }
+
+    auto status = Status::OK();
+    if (!skip) {
+      try {
+        status = task.run();
+      } catch (const std::exception& e) {
+        status = ORT_MAKE_STATUS(ONNXRUNTIME, FAIL, e.what());
+      }
+    }
+
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      if (!status.IsOK() && error_.IsOK()) {
+        error_ = status;
+      }
+      for (auto* buffer : task.output_buffers) {
+        pending_buffers_.erase(pending_buffers_.find(buffer));
+      }
+      num_running_--;
+      if (tasks_.empty() && num_running_ == 0) {
+        queue_drained_.notify_all();
+      }
+    }
+  }
+}
+
+} // namespace eager
+} // namespace torch_ort
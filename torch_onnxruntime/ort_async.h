@@ -0,0 +1,72 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <condition_variable>
+#include <deque>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <unordered_set>
+
+#include <core/framework/ml_value.h>
+#include <core/eager/ort_kernel_invoker.h>
+
+namespace torch_ort {
+namespace eager {
+
+// Runs the kernels of an invoker on a worker thread, in submission order,
+// so that the thread driving the model does not wait for them.
+//
+// Outputs of an enqueued kernel are allocated up front from their inferred
+// types and shapes and handed back immediately; the kernel fills them when
+// it runs. Their buffers must therefore not be read or written by the host
+// until Synchronize returns. A failing kernel does not throw at the point it
+// was enqueued: its error is reported by the next Synchronize, and kernels
+// queued after it are skipped.
+class ORTAsyncQueue {
+ public:
+  explicit ORTAsyncQueue(onnxruntime::ORTInvoker& invoker);
+
+  // Waits for the queue to drain; pending errors are dropped.
+  ~ORTAsyncQueue();
+
+  // Allocates the outputs that are not already bound and enqueues the
+  // kernel. Returns false without enqueuing anything if the output types and
+  // shapes cannot be inferred statically; the caller must then Synchronize
+  // and invoke the kernel itself.
+  bool TryEnqueue(
+    const std::string& op_name,
+    const std::vector<OrtValue>& inputs,
+    std::vector<OrtValue>& outputs,
+    const onnxruntime::NodeAttributes* attributes,
+    const std::string& domain);
+
+  // Waits until every enqueued kernel has run, then throws the error of the
+  // first kernel that failed since the last call, if any.
+  void Synchronize();
+
+ private:
+  struct Task {
+    std::function<onnxruntime::common::Status()> run;
+    std::vector<const void*> output_buffers;
+  };
+
+  void Run();
+
+  onnxruntime::ORTInvoker& invoker_;
+  std::mutex mutex_;
+  std::condition_variable task_available_;
+  std::condition_variable queue_drained_;
+  std::deque<Task> tasks_;
+  // Buffers written by queued kernels, which the host must not read yet
+  std::unordered_multiset<const void*> pending_buffers_;
+  size_t num_running_ = 0;
+  onnxruntime::common::Status error_;
+  bool stop_ = false;
+  std::thread worker_;
+};
+
+} // namespace eager
+} // namespace torch_ort
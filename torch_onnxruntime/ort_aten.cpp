@@ -1,7 +1,16 @@
 // Copyright (c) Microsoft Corporation. All rights reserved.
 // Licensed under the MIT License.
 
+#include <mutex>
+#include <numeric>
+
+#include <ATen/ExpandUtils.h>
+#include <ATen/TensorUtils.h>
+#include <ATen/core/Reduction.h>
+#include <ATen/native/TypeProperties.h>
+
 #include "ort_aten.h"
+#include "ort_shape_inference.h"
 #include "ort_tensor.h"
 
 namespace torch_ort {
@@ -27,6 +36,189 @@ namespace {
       throw std::runtime_error("ORT copy: device not supported");
     }
   }
+
+  // Returns a host pointer to the first element of an ORT or CPU tensor;
+  // ORT tensor buffers live in host memory on the CPU execution provider.
+  void* host_data_ptr(const at::Tensor& tensor) {
+    auto* impl = dynamic_cast<ORTTensorImpl*>(tensor.unsafeGetTensorImpl());
+    if (!impl) {
+      return tensor.data_ptr();
+    }
+    auto* ort_tensor = impl->storage_value().GetMutable<onnxruntime::Tensor>();
+    return static_cast<char*>(ort_tensor->MutableDataRaw()) +
+      impl->storage_offset() * tensor.element_size();
+  }
+
+  // Wraps a contiguous tensor's buffer without copying it. A CPU tensor's
+  // storage is kept alive by the returned value.
+  OrtValue wrap_ort_value(const at::Tensor& tensor) {
+    auto* impl = dynamic_cast<ORTTensorImpl*>(tensor.unsafeGetTensorImpl());
+    if (impl) {
+      return impl->tensor();
+    }
+
+    OrtValue ort_tensor;
+    CreateMLValue(
+      tensor.storage(),
+      ort_scalar_type_from_aten(tensor.scalar_type()),
+      tensor.sizes().vec(),
+      tensor.storage_offset() * tensor.element_size(),
+      &ort_tensor);
+    return ort_tensor;
+  }
+
+  // Returns a 0-d constant from the invoker's constant cache.
+  template<typename T>
+  OrtValue create_ort_scalar_value(
+    onnxruntime::ORTInvoker& invoker,
+    T value) {
+    auto element_type = onnxruntime::DataTypeImpl::GetType<T>();
+    return GetORTBackendsManager().GetConstantCache(invoker).GetOrCreate(
+      ORTConstantCache::MakeKey<T>(element_type, {}, {value}),
+      [&]() {
+        OrtValue ort_val;
+        CreateMLValue(
+          invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
+          element_type,
+          {},
+          &ort_val);
+        CopyVectorToTensor<T>({value}, *ort_val.GetMutable<onnxruntime::Tensor>());
+        return ort_val;
+      });
+  }
+
+  // Invokes a kernel on behalf of a hand-implemented op and returns its
+  // outputs, throwing if the kernel fails.
+  std::vector<OrtValue> invoke_kernel(
+    onnxruntime::ORTInvoker& invoker,
+    const std::string& op_name,
+    const std::vector<OrtValue>& inputs,
+    size_t num_outputs,
+    const onnxruntime::NodeAttributes* attributes = nullptr,
+    const std::string& domain = onnxruntime::kOnnxDomain) {
+    std::vector<OrtValue> outputs(num_outputs);
+    auto status = invoke(invoker, op_name, inputs, outputs, attributes, domain);
+    if (!status.IsOK())
+      throw std::runtime_error(
+        "ORT return failure status:" + status.ErrorMessage());
+    return outputs;
+  }
+
+  onnx::AttributeProto create_ort_string_attribute(
+    const char* name,
+    const std::string& value) {
+    onnx::AttributeProto attr;
+    attr.set_name(name);
+    attr.set_type(onnx::AttributeProto_AttributeType::AttributeProto_AttributeType_STRING);
+    attr.set_s(value);
+    return attr;
+  }
+
+  // The TensorProto element type, as used by e.g. the Cast "to" attribute.
+  int64_t onnx_element_type(at::ScalarType type) {
+    return ort_scalar_type_from_aten(type)->AsPrimitiveDataType()->GetDataType();
+  }
+
+  // Converts the elements of an ORT value to type with an ONNX Cast.
+  OrtValue cast_ort_value(
+    onnxruntime::ORTInvoker& invoker,
+    const OrtValue& value,
+    at::ScalarType type) {
+    onnxruntime::NodeAttributes attrs(1);
+    attrs["to"] = create_ort_attribute("to", onnx_element_type(type));
+    return invoke_kernel(invoker, "Cast", {value}, 1, &attrs)[0];
+  }
+
+  // Computes the order in which the dims of a tensor of the given geometry
+  // are laid out in memory, outermost first. Returns false if the tensor
+  // is not dense, i.e. it overlaps itself or skips elements.
+  bool get_dense_permutation(
+    at::IntArrayRef sizes,
+    at::IntArrayRef strides,
+    std::vector<int64_t>& permutation) {
+    permutation.resize(sizes.size());
+    std::iota(permutation.begin(), permutation.end(), 0);
+    std::stable_sort(
+      permutation.begin(),
+      permutation.end(),
+      [&](int64_t a, int64_t b) { return strides[a] > strides[b]; });
+
+    int64_t expected_stride = 1;
+    for (auto it = permutation.rbegin(); it != permutation.rend(); ++it) {
+      if (sizes[*it] != 1 && strides[*it] != expected_stride)
+        return false;
+      expected_stride *= sizes[*it];
+    }
+    return true;
+  }
+
+  // Allocates an uninitialized tensor with the given geometry. A dense
+  // tensor, e.g. channels_last, owns a buffer shaped in memory order, as
+  // the results of elementwise ops in its layout are; any other tensor owns
+  // a flat buffer spanning its elements.
+  at::Tensor empty_ort_tensor(
+    onnxruntime::ORTInvoker& invoker,
+    at::IntArrayRef size,
+    at::IntArrayRef stride,
+    const at::TensorOptions& options) {
+    TORCH_CHECK(
+      size.size() == stride.size(),
+      "ORT: mismatch in length of strides and shape");
+
+    int64_t numel = 1;
+    for (auto dim_size : size) {
+      numel *= dim_size;
+    }
+
+    std::vector<int64_t> shape;
+    std::vector<int64_t> permutation;
+    if (numel == 0) {
+      shape = size.vec();
+    } else if (get_dense_permutation(size, stride, permutation)) {
+      for (auto dim : permutation) {
+        shape.push_back(size[dim]);
+      }
+    } else {
+      int64_t storage_size = 1;
+      for (size_t i = 0; i < size.size(); i++) {
+        storage_size += (size[i] - 1) * stride[i];
+      }
+      shape.push_back(storage_size);
+    }
+
+    OrtValue ot;
+    CreateMLValue(
+      invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
+      ort_scalar_type_from_aten(c10::typeMetaToScalarType(options.dtype())),
+      shape,
+      &ot);
+    return at::Tensor(c10::make_intrusive<ORTTensorImpl>(
+      std::move(ot),
+      options,
+      size,
+      stride,
+      0));
+  }
+
+  // Gathers the tensor's elements into a new contiguous ORT value.
+  OrtValue contiguous_ort_value(
+    onnxruntime::ORTInvoker& invoker,
+    const at::Tensor& tensor) {
+    OrtValue ort_tensor;
+    CreateMLValue(
+      invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
+      ort_scalar_type_from_aten(tensor.scalar_type()),
+      tensor.sizes().vec(),
+      &ort_tensor);
+    CopyStrided(
+      host_data_ptr(tensor),
+      tensor.strides(),
+      ort_tensor.GetMutable<onnxruntime::Tensor>()->MutableDataRaw(),
+      GetStrides(tensor.sizes().vec(), 1),
+      tensor.sizes(),
+      tensor.element_size());
+    return ort_tensor;
+  }
 }
 
 const at::Tensor aten_tensor_from_ort(
@@ -37,6 +229,80 @@ const at::Tensor aten_tensor_from_ort(
     options));
 }
 
+const at::Tensor aten_tensor_from_ort(
+  OrtValue&& ot,
+  const at::TensorOptions& options,
+  const ORTDenseLayout& layout) {
+  if (layout.is_contiguous()) {
+    return aten_tensor_from_ort(std::move(ot), options);
+  }
+
+  const auto& dims = ot.Get<onnxruntime::Tensor>().Shape().GetDims();
+  TORCH_CHECK(
+    dims.size() == layout.permutation.size(),
+    "ORT: result of rank ", dims.size(), " computed in a layout of rank ",
+    layout.permutation.size());
+  std::vector<int64_t> sizes(dims.size());
+  for (size_t i = 0; i < dims.size(); i++) {
+    sizes[layout.permutation[i]] = dims[i];
+  }
+  auto strides = layout.strides(sizes);
+  return at::Tensor(c10::make_intrusive<ORTTensorImpl>(
+    std::move(ot),
+    options,
+    sizes,
+    strides,
+    0));
+}
+
+const at::Tensor aten_tensor_from_ort_typed(
+  OrtValue&& ot,
+  const at::TensorOptions& options) {
+  auto dtype = aten_scalar_type_from_ort(
+    ot.Get<onnxruntime::Tensor>().DataType());
+  return aten_tensor_from_ort(std::move(ot), options.dtype(dtype));
+}
+
+std::vector<int64_t> ORTDenseLayout::strides(at::IntArrayRef sizes) const {
+  if (is_contiguous()) {
+    return GetStrides(sizes.vec(), 1);
+  }
+
+  std::vector<int64_t> strides(sizes.size());
+  int64_t stride = 1;
+  for (auto it = permutation.rbegin(); it != permutation.rend(); ++it) {
+    strides[*it] = stride;
+    stride *= std::max<int64_t>(sizes[*it], 1);
+  }
+  return strides;
+}
+
+ORTDenseLayout get_elementwise_layout(at::TensorList tensors) {
+  // 0-d tensors and wrapped numbers broadcast to any layout
+  const at::Tensor* first = nullptr;
+  for (const auto& tensor : tensors) {
+    if (tensor.dim() == 0 || tensor.unsafeGetTensorImpl()->is_wrapped_number())
+      continue;
+    if (!first) {
+      if (tensor.is_contiguous() || tensor.numel() == 0)
+        return {};
+      first = &tensor;
+    } else if (tensor.sizes() != first->sizes() ||
+      tensor.strides() != first->strides()) {
+      return {};
+    }
+  }
+
+  ORTDenseLayout layout;
+  if (first && !get_dense_permutation(
+    first->sizes(),
+    first->strides(),
+    layout.permutation)) {
+    layout.permutation.clear();
+  }
+  return layout;
+}
+
 const onnxruntime::MLDataType ort_scalar_type_from_aten(
   at::ScalarType dtype) {
   switch (dtype){
@@ -54,26 +320,72 @@ const onnxruntime::MLDataType ort_scalar_type_from_aten(
       return onnxruntime::DataTypeImpl::GetType<int16_t>();
     case at::kLong:
       return onnxruntime::DataTypeImpl::GetType<int64_t>();
+    case at::kChar:
+      return onnxruntime::DataTypeImpl::GetType<int8_t>();
+    case at::kByte:
+      return onnxruntime::DataTypeImpl::GetType<uint8_t>();
+    case at::kBool:
+      return onnxruntime::DataTypeImpl::GetType<bool>();
     default:
       ORT_THROW("Unsupport aten scalar type: ", dtype);
   }
 }
 
+at::ScalarType aten_scalar_type_from_ort(onnxruntime::MLDataType type) {
+  for (auto dtype : {
+    at::kFloat, at::kDouble, at::kHalf, at::kBFloat16, at::kInt, at::kShort,
+    at::kLong, at::kChar, at::kByte, at::kBool}) {
+    if (ort_scalar_type_from_aten(dtype) == type)
+      return dtype;
+  }
+  ORT_THROW("Unsupport ORT element type: ",
+    onnxruntime::DataTypeImpl::ToString(type));
+}
+
 const OrtValue create_ort_value(
   onnxruntime::ORTInvoker& invoker,
   const at::Scalar& scalar) {
-  // TODO: support more types
-  float val = scalar.toFloat();
-  OrtValue ort_val;
-  CreateMLValue(
-    invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
-    ort_scalar_type_from_aten(at::kFloat),
-    {},
-    &ort_val);
-  // TODO: use EP's data transfer to copy the data into that tensor
-  auto* ort_tensor = ort_val.GetMutable<onnxruntime::Tensor>();
-  CopyVectorToTensor<float>({val}, *ort_tensor);
-  return ort_val;
+  // Like a Python number, a floating point scalar has the default dtype
+  auto type = scalar.type();
+  if (c10::isFloatingType(type)) {
+    type = c10::typeMetaToScalarType(c10::get_default_dtype());
+  }
+  return create_ort_value(invoker, scalar, type);
+}
+
+const OrtValue create_ort_value(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Scalar& scalar,
+  at::ScalarType type) {
+  // Half precision values are converted by ATen and copied bit for bit
+  switch (type) {
+    case at::kFloat:
+      return create_ort_scalar_value(invoker, scalar.to<float>());
+    case at::kDouble:
+      return create_ort_scalar_value(invoker, scalar.to<double>());
+    case at::kHalf:
+      return create_ort_scalar_value(
+        invoker,
+        onnxruntime::MLFloat16(scalar.to<at::Half>().x));
+    case at::kBFloat16:
+      return create_ort_scalar_value(
+        invoker,
+        onnxruntime::BFloat16(scalar.to<at::BFloat16>().x));
+    case at::kInt:
+      return create_ort_scalar_value(invoker, scalar.to<int32_t>());
+    case at::kShort:
+      return create_ort_scalar_value(invoker, scalar.to<int16_t>());
+    case at::kLong:
+      return create_ort_scalar_value(invoker, scalar.to<int64_t>());
+    case at::kChar:
+      return create_ort_scalar_value(invoker, scalar.to<int8_t>());
+    case at::kByte:
+      return create_ort_scalar_value(invoker, scalar.to<uint8_t>());
+    case at::kBool:
+      return create_ort_scalar_value(invoker, scalar.to<bool>());
+    default:
+      ORT_THROW("Unsupport aten scalar type: ", type);
+  }
 }
 
 const OrtValue create_ort_value(
@@ -82,51 +394,516 @@ const OrtValue create_ort_value(
   assert_tensor_supported(tensor);
 
   auto* impl = dynamic_cast<ORTTensorImpl*>(tensor.unsafeGetTensorImpl());
+  if (impl && impl->is_storage_equivalent()) {
+    return impl->storage_value();
+  }
+
   if (impl) {
-    return impl->tensor();
+    // Resolving a view reads its buffer, which may still be pending
+    synchronize(invoker);
+    if (impl->is_contiguous()) {
+      return impl->tensor();
+    }
+  } else if (tensor.is_contiguous() && !is_deferred(invoker)) {
+    return wrap_ort_value(tensor);
+  }
+
+  // ORT kernels only accept contiguous inputs, so strided views are gathered
+  // into a new buffer. CPU tensors are copied in lazy and async mode too,
+  // since the kernel may run after the host has written to the CPU tensor.
+  return contiguous_ort_value(invoker, tensor);
+}
+
+const OrtValue create_ort_value(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Tensor& tensor,
+  const ORTDenseLayout& layout) {
+  if (layout.is_contiguous() || tensor.dim() == 0) {
+    return create_ort_value(invoker, tensor);
+  }
+
+  assert_tensor_supported(tensor);
+  std::vector<int64_t> shape;
+  for (auto dim : layout.permutation) {
+    shape.push_back(tensor.size(dim));
+  }
+
+  auto* impl = dynamic_cast<ORTTensorImpl*>(tensor.unsafeGetTensorImpl());
+  if (impl) {
+    // The result of an elementwise op in this layout owns a buffer of
+    // exactly this shape; resolving other views reads a pending buffer
+    if (tensor.storage_offset() != 0 || impl->storage_value()
+      .Get<onnxruntime::Tensor>().Shape().GetDims() != shape) {
+      synchronize(invoker);
+    }
+    return impl->permuted_tensor(layout.permutation);
   }
 
   OrtValue ort_tensor;
+  if (!is_deferred(invoker)) {
+    CreateMLValue(
+      tensor.storage(),
+      ort_scalar_type_from_aten(tensor.scalar_type()),
+      shape,
+      tensor.storage_offset() * tensor.element_size(),
+      &ort_tensor);
+    return ort_tensor;
+  }
+
+  // The kernel may run after the host has written to the CPU tensor
   CreateMLValue(
-    tensor.data_ptr(),
+    invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
     ort_scalar_type_from_aten(tensor.scalar_type()),
-    tensor.sizes().vec(),
+    shape,
     &ort_tensor);
+  memcpy(
+    ort_tensor.GetMutable<onnxruntime::Tensor>()->MutableDataRaw(),
+    tensor.data_ptr(),
+    tensor.nbytes());
   return ort_tensor;
 }
 
+const OrtValue create_ort_value(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Tensor& tensor,
+  at::ScalarType type,
+  const ORTDenseLayout& layout) {
+  if (tensor.unsafeGetTensorImpl()->is_wrapped_number()) {
+    return create_ort_value(invoker, tensor.item(), type);
+  }
+
+  auto ort_value = create_ort_value(invoker, tensor, layout);
+  if (tensor.scalar_type() == type) {
+    return ort_value;
+  }
+  return cast_ort_value(invoker, ort_value, type);
+}
+
+ORTTypePromotion::Operand::Operand(const at::Tensor& tensor)
+  : tensor(&tensor),
+    scalar(nullptr),
+    type(tensor.scalar_type()),
+    category(tensor.unsafeGetTensorImpl()->is_wrapped_number() ? 2 :
+      tensor.dim() == 0 ? 1 : 0) {}
+
+ORTTypePromotion::Operand::Operand(const at::Scalar& scalar)
+  : tensor(nullptr),
+    scalar(&scalar),
+    type(scalar.type()),
+    category(2) {}
+
+at::ScalarType ORTTypePromotion::GetResultType(
+  std::initializer_list<Operand> operands) {
+  // Each operand takes 10 bits of the signature, above a leading one so
+  // that no signature is 0; the result type takes the low 8 bits
+  uint64_t signature = 1;
+  auto cacheable = operands.size() <= kMaxCachedOperands;
+  for (const auto& operand : operands) {
+    signature = (signature << 10) |
+      (static_cast<uint64_t>(operand.type) << 2) | operand.category;
+  }
+
+  at::ScalarType result_type;
+  auto last_decision = last_decision_.load(std::memory_order_relaxed);
+  if (cacheable && (last_decision >> 8) == signature) {
+    result_type = static_cast<at::ScalarType>(last_decision & 0xff);
+  } else {
+    at::native::ResultTypeState state = {};
+    for (const auto& operand : operands) {
+      state = operand.tensor ?
+        at::native::update_result_type_state(*operand.tensor, state) :
+        at::native::update_result_type_state(*operand.scalar, state);
+    }
+    result_type = at::native::result_type(state);
+    if (cacheable) {
+      last_decision_.store(
+        (signature << 8) | static_cast<uint64_t>(result_type),
+        std::memory_order_relaxed);
+    }
+  }
+
+  // Not cached, as the default dtype may change between calls
+  if (promote_integers_to_float_ &&
+    c10::isIntegralType(result_type, /*includeBool=*/true)) {
+    return c10::typeMetaToScalarType(c10::get_default_dtype());
+  }
+  return result_type;
+}
+
+void check_result_castable(at::ScalarType result_type, const at::Tensor& out) {
+  TORCH_CHECK(
+    c10::canCast(result_type, out.scalar_type()),
+    "result type ", result_type,
+    " can't be cast to the desired output type ", out.scalar_type());
+}
+
+void check_alpha(at::ScalarType result_type, const at::Scalar& alpha) {
+  TORCH_CHECK(
+    !alpha.isBoolean() || result_type == at::ScalarType::Bool,
+    "Boolean alpha only supported for Boolean results.");
+  TORCH_CHECK(
+    at::isFloatingType(result_type) ||
+      at::isComplexType(result_type) ||
+      alpha.isIntegral(true),
+    "For integral input tensors, argument alpha must not be a floating ",
+    "point number.");
+}
+
+void check_in_place_shape(const at::Tensor& self, at::TensorList others) {
+  for (const auto& other : others) {
+    if (other.sizes() == self.sizes())
+      continue;
+    auto shape = at::infer_size(self.sizes(), other.sizes());
+    TORCH_CHECK(
+      self.sizes() == at::IntArrayRef(shape),
+      "output with shape ", self.sizes(),
+      " doesn't match the broadcast shape ", shape);
+  }
+}
+
+void copy_into_tensor(
+  onnxruntime::ORTInvoker& invoker,
+  const OrtValue& src,
+  const at::Tensor& dst,
+  const ORTDenseLayout& layout) {
+  // A result computed in a promoted type is cast back, as by ATen's copy_
+  auto value = src;
+  if (src.Get<onnxruntime::Tensor>().DataType() !=
+    ort_scalar_type_from_aten(dst.scalar_type())) {
+    value = cast_ort_value(invoker, src, dst.scalar_type());
+  }
+
+  ORTProfileScope profile_scope(ORTProfileEventKind::COPY, "copy_into_tensor");
+  profile_scope.AddBytes(dst.nbytes());
+  synchronize(invoker);
+
+  const auto& src_tensor = value.Get<onnxruntime::Tensor>();
+  TORCH_CHECK(
+    src_tensor.Shape().Size() == dst.numel(),
+    "ORT: result has ", src_tensor.Shape().Size(),
+    " elements but the destination has ", dst.numel());
+
+  CopyStrided(
+    src_tensor.DataRaw(),
+    layout.strides(dst.sizes()),
+    host_data_ptr(dst),
+    dst.strides(),
+    dst.sizes(),
+    dst.element_size());
+}
+
+bool bind_in_place_output(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Tensor& self,
+  const std::vector<const OrtValue*>& inputs,
+  OrtValue& output,
+  const ORTDenseLayout& layout) {
+  // A pending graph assigns its own placeholder outputs
+  if (GetORTBackendsManager().GetLazyGraph(invoker))
+    return false;
+
+  auto* impl = dynamic_cast<ORTTensorImpl*>(self.unsafeGetTensorImpl());
+  if (!impl)
+    return false;
+  if (layout.is_contiguous() ? !impl->is_contiguous() :
+    self.strides() != at::IntArrayRef(layout.strides(self.sizes())))
+    return false;
+
+  auto self_value = layout.is_contiguous() ?
+    impl->tensor() :
+    impl->permuted_tensor(layout.permutation);
+  const auto& self_tensor = self_value.Get<onnxruntime::Tensor>();
+  auto self_begin = static_cast<const char*>(self_tensor.DataRaw());
+  auto self_end = self_begin + self_tensor.SizeInBytes();
+
+  for (size_t i = 0; i < inputs.size(); i++) {
+    const auto& input_tensor = inputs[i]->Get<onnxruntime::Tensor>();
+    if (i == 0 && input_tensor.DataType() != self_tensor.DataType())
+      return false;
+
+    // Reading and writing the exact same elements is safe for elementwise
+    // kernels; any other overlap is not.
+    auto input_begin = static_cast<const char*>(input_tensor.DataRaw());
+    auto input_end = input_begin + input_tensor.SizeInBytes();
+    if (input_begin < self_end && self_begin < input_end &&
+      (input_begin != self_begin ||
+        input_tensor.Shape() != self_tensor.Shape()))
+      return false;
+  }
+
+  output = std::move(self_value);
+  return true;
+}
+
+bool bind_out_outputs(
+  onnxruntime::ORTInvoker& invoker,
+  const ORTKernel& kernel,
+  const std::vector<const OrtValue*>& inputs,
+  const onnxruntime::NodeAttributes* attributes,
+  const std::vector<std::pair<size_t, at::Tensor>>& outs,
+  std::vector<OrtValue>& outputs) {
+  // Pending graphs and queued kernels allocate their own outputs
+  if (is_deferred(invoker))
+    return false;
+
+  onnx::NodeProto node;
+  node.set_op_type(kernel.GetOpName());
+  node.set_domain(kernel.GetDomain());
+  if (attributes) {
+    for (const auto& attribute : *attributes) {
+      *node.add_attribute() = attribute.second;
+    }
+  }
+  std::vector<OrtValue> input_values;
+  for (size_t i = 0; i < inputs.size(); i++) {
+    node.add_input(ORTKernelCache::GetInputName(i));
+    input_values.push_back(*inputs[i]);
+  }
+  for (size_t i = 0; i < outputs.size(); i++) {
+    node.add_output(ORTKernelCache::GetOutputName(i));
+  }
+
+  std::vector<ORTInferredOutput> inferred_outputs;
+  if (!InferNodeOutputs(
+    node,
+    input_values,
+    [](const onnxruntime::Tensor&) { return true; },
+    inferred_outputs))
+    return false;
+
+  // Check every out tensor before binding or resizing any of them
+  std::vector<bool> needs_resize;
+  for (const auto& out : outs) {
+    const auto& inferred = inferred_outputs[out.first];
+    auto* impl = dynamic_cast<ORTTensorImpl*>(out.second.unsafeGetTensorImpl());
+    if (!impl ||
+      inferred.element_type != ort_scalar_type_from_aten(out.second.scalar_type()))
+      return false;
+
+    if (out.second.sizes().vec() != inferred.dims) {
+      // A resized tensor gets a new buffer, which no input can overlap
+      if (!impl->is_storage_equivalent())
+        return false;
+      needs_resize.push_back(true);
+      continue;
+    }
+
+    if (!impl->is_contiguous())
+      return false;
+    auto out_value = impl->tensor();
+    const auto& out_tensor = out_value.Get<onnxruntime::Tensor>();
+    auto out_begin = static_cast<const char*>(out_tensor.DataRaw());
+    auto out_end = out_begin + out_tensor.SizeInBytes();
+    for (const auto* input : inputs) {
+      const auto& input_tensor = input->Get<onnxruntime::Tensor>();
+      auto input_begin = static_cast<const char*>(input_tensor.DataRaw());
+      auto input_end = input_begin + input_tensor.SizeInBytes();
+      if (input_begin < out_end && out_begin < input_end)
+        return false;
+    }
+    needs_resize.push_back(false);
+  }
+
+  for (size_t i = 0; i < outs.size(); i++) {
+    auto* impl = static_cast<ORTTensorImpl*>(outs[i].second.unsafeGetTensorImpl());
+    if (needs_resize[i]) {
+      const auto& inferred = inferred_outputs[outs[i].first];
+      OrtValue resized;
+      CreateMLValue(
+        invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
+        inferred.element_type,
+        inferred.dims,
+        &resized);
+      impl->set_tensor(resized);
+    }
+    outputs[outs[i].first] = impl->tensor();
+  }
+  return true;
+}
+
+void set_out_tensor(
+  onnxruntime::ORTInvoker& invoker,
+  OrtValue& result,
+  const at::Tensor& out) {
+  const auto& result_tensor = result.Get<onnxruntime::Tensor>();
+  if (result_tensor.Shape() == onnxruntime::TensorShape(out.sizes().vec())) {
+    check_result_castable(
+      aten_scalar_type_from_ort(result_tensor.DataType()),
+      out);
+    copy_into_tensor(invoker, result, out);
+    return;
+  }
+
+  auto* impl = dynamic_cast<ORTTensorImpl*>(out.unsafeGetTensorImpl());
+  TORCH_CHECK(
+    impl && impl->is_storage_equivalent(),
+    "ORT: cannot resize the out tensor of shape ", out.sizes(),
+    " to the result shape ", result_tensor.Shape().ToString(),
+    " as it is a view");
+  auto result_type = aten_scalar_type_from_ort(result_tensor.DataType());
+  if (result_type != out.scalar_type()) {
+    check_result_castable(result_type, out);
+    impl->set_tensor(cast_ort_value(invoker, result, out.scalar_type()));
+    return;
+  }
+  impl->set_tensor(result);
+}
+
+namespace {
+  std::mutex in_place_counters_mutex;
+  std::map<std::string, std::unique_ptr<ORTInPlaceCounter>> in_place_counters;
+}
+
+ORTInPlaceCounter& get_in_place_counter(const std::string& torch_op_name) {
+  std::lock_guard<std::mutex> lock(in_place_counters_mutex);
+  auto& counter = in_place_counters[torch_op_name];
+  if (!counter) {
+    counter = std::make_unique<ORTInPlaceCounter>();
+  }
+  return *counter;
+}
+
+std::map<std::string, std::pair<uint64_t, uint64_t>> get_in_place_stats() {
+  std::lock_guard<std::mutex> lock(in_place_counters_mutex);
+  std::map<std::string, std::pair<uint64_t, uint64_t>> stats;
+  for (const auto& entry : in_place_counters) {
+    stats[entry.first] = {
+      entry.second->in_place.load(),
+      entry.second->copied.load()
+    };
+  }
+  return stats;
+}
+
+void reset_in_place_stats() {
+  std::lock_guard<std::mutex> lock(in_place_counters_mutex);
+  for (auto& entry : in_place_counters) {
+    entry.second->in_place = 0;
+    entry.second->copied = 0;
+  }
+}
+
+at::Tensor aten_view_from_ort(
+  const at::Tensor& self,
+  at::IntArrayRef sizes,
+  at::IntArrayRef strides,
+  int64_t storage_offset) {
+  auto* impl = dynamic_cast<ORTTensorImpl*>(self.unsafeGetTensorImpl());
+  TORCH_CHECK(impl, "ORT: cannot create a view of a non-ORT tensor");
+
+  int64_t max_offset = storage_offset;
+  for (size_t i = 0; i < sizes.size(); i++) {
+    if (sizes[i] == 0) {
+      max_offset = storage_offset;
+      break;
+    }
+    max_offset += (sizes[i] - 1) * strides[i];
+  }
+  TORCH_CHECK(
+    storage_offset >= 0 &&
+      max_offset < impl->storage_value().Get<onnxruntime::Tensor>().Shape().Size(),
+    "ORT: view is out of bounds for its storage");
+
+  return at::Tensor(c10::make_intrusive<ORTTensorImpl>(
+    impl->storage_value(),
+    self.options(),
+    sizes,
+    strides,
+    storage_offset));
+}
+
+at::Tensor aten_ort_tensor_from_cpu(
+  const at::Tensor& cpu_tensor,
+  const at::Device& device) {
+  TORCH_CHECK(
+    cpu_tensor.device().type() == at::kCPU,
+    "ORT: expected a CPU tensor but got one on ", cpu_tensor.device());
+  TORCH_CHECK(device.type() == at::kORT, "ORT: expected an ORT device");
+
+  const auto& storage = cpu_tensor.storage();
+  OrtValue storage_value;
+  CreateMLValue(
+    storage,
+    ort_scalar_type_from_aten(cpu_tensor.scalar_type()),
+    {static_cast<int64_t>(storage.nbytes() / cpu_tensor.element_size())},
+    0,
+    &storage_value);
+
+  return at::Tensor(c10::make_intrusive<ORTTensorImpl>(
+    std::move(storage_value),
+    cpu_tensor.options().device(device),
+    cpu_tensor.sizes(),
+    cpu_tensor.strides(),
+    cpu_tensor.storage_offset()));
+}
+
+at::Tensor aten_cpu_tensor_from_ort(const at::Tensor& ort_tensor) {
+  auto* impl = dynamic_cast<ORTTensorImpl*>(ort_tensor.unsafeGetTensorImpl());
+  TORCH_CHECK(impl, "ORT: expected an ORT tensor");
+
+  // The CPU tensor may be read right away
+  synchronize(GetORTInvoker(ort_tensor.device()));
+
+  auto storage_value = impl->storage_value();
+  return at::from_blob(
+    host_data_ptr(ort_tensor),
+    ort_tensor.sizes(),
+    ort_tensor.strides(),
+    [storage_value](void*) {},
+    ort_tensor.options().device(at::kCPU));
+}
+
 const onnx::AttributeProto create_ort_attribute(
   const char* name,
   at::Scalar value) {
+  return create_ort_attribute(name, value, value.type());
+}
+
+const onnx::AttributeProto create_ort_attribute(
+  const char* name,
+  at::Scalar value,
+  at::ScalarType type) {
   onnx::AttributeProto attr;
   attr.set_name(name);
-  // FIXME: we may need to know the type of the target ORT attribute for
-  // conversion. So far, we don't, but there may come a time...
-  switch (value.type()) {
-    case at::ScalarType::Bool:
-      attr.set_type(onnx::AttributeProto_AttributeType::AttributeProto_AttributeType_INT);
-      attr.set_i(value.to<int32_t>());
-      break;
+  switch (type) {
+    case at::ScalarType::Float:
     case at::ScalarType::Double:
-    case at::ScalarType::Long:
+    case at::ScalarType::Half:
+    case at::ScalarType::BFloat16:
       attr.set_type(onnx::AttributeProto_AttributeType::AttributeProto_AttributeType_FLOAT);
-      attr.set_f(value.to<double>());
+      attr.set_f(value.to<float>());
+      break;
+    case at::ScalarType::Bool:
+    case at::ScalarType::Byte:
+    case at::ScalarType::Char:
+    case at::ScalarType::Short:
+    case at::ScalarType::Int:
+    case at::ScalarType::Long:
+      attr.set_type(onnx::AttributeProto_AttributeType::AttributeProto_AttributeType_INT);
+      attr.set_i(value.to<int64_t>());
       break;
-    // NB. see FIXME above
-    // case at::ScalarType::Long:
-    //   attr.set_type(onnx::AttributeProto_AttributeType::AttributeProto_AttributeType_INT);
-    //   attr.set_f(value.to<int64_t>());
-    //   break;
     default:
       // For most at::ScalarType, it should be safe to just call value.to<>
       // on it, but for now we want to explicitly know when we've encountered
       // a new scalar type while bringing up ORT eager mode.
-      ORT_THROW("Unsupported: at::ScalarType::", value.type());
+      ORT_THROW("Unsupported: at::ScalarType::", type);
   }
 
   return attr;
 }
 
+const onnx::AttributeProto create_ort_ints_attribute(
+  const char* name,
+  at::IntArrayRef values) {
+  onnx::AttributeProto attr;
+  attr.set_name(name);
+  attr.set_type(onnx::AttributeProto_AttributeType::AttributeProto_AttributeType_INTS);
+  for (auto value : values) {
+    attr.add_ints(value);
+  }
+  return attr;
+}
+
 #pragma endregion
 
 #pragma region Hand-Implemented ATen Ops
@@ -137,20 +914,39 @@ at::Tensor ort_op_aten_empty(
   const at::TensorOptions& options,
   c10::optional<at::MemoryFormat> memory_format) {
   ORT_LOG_FN(size, options, memory_format);
+  ORT_PROFILE_OP("aten::empty.memory_format");
 
-  // TODO: validate options and memory format
-  // TODO: figure out how to get the correct element type.
-  OrtValue ot;
+  // TODO: validate options
   auto& invoker = GetORTInvoker(options.device());
-  CreateMLValue(
-    invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
-    ort_scalar_type_from_aten(at::kFloat),
-    size.vec(),
-    &ot);
-
-  return aten_tensor_from_ort(
-    std::move(ot),
-    options);
+  auto format = memory_format.value_or(at::MemoryFormat::Contiguous);
+  switch (format) {
+    case at::MemoryFormat::Contiguous:
+      return empty_ort_tensor(
+        invoker,
+        size,
+        GetStrides(size.vec(), 1),
+        options);
+    case at::MemoryFormat::ChannelsLast:
+      TORCH_CHECK(
+        size.size() == 4,
+        "required rank 4 tensor to use channels_last format");
+      return empty_ort_tensor(
+        invoker,
+        size,
+        c10::get_channels_last_strides_2d(size),
+        options);
+    case at::MemoryFormat::ChannelsLast3d:
+      TORCH_CHECK(
+        size.size() == 5,
+        "required rank 5 tensor to use channels_last_3d format");
+      return empty_ort_tensor(
+        invoker,
+        size,
+        c10::get_channels_last_strides_3d(size),
+        options);
+    default:
+      TORCH_CHECK(false, "ORT: unsupported memory format ", format);
+  }
 }
 
 at::Tensor ort_op_aten_empty_strided(
@@ -162,49 +958,179 @@ at::Tensor ort_op_aten_empty_strided(
   c10::optional<at::Device> device_opt,
   c10::optional<bool> pin_memory_opt) {
   ORT_LOG_FN(stride, dtype_opt, layout_opt, device_opt, pin_memory_opt);
+  ORT_PROFILE_OP("aten::empty_strided");
 
-  // TODO: handle stride
   // TODO: how to handle type conversion
-  OrtValue ot;
   assert(device_opt.has_value());
   // TODO: how to support layout
   assert(!layout_opt.has_value());
   at::ScalarType dtype = c10::dtype_or_default(dtype_opt);
   auto& invoker = GetORTInvoker(*device_opt);
-  CreateMLValue(
-    invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
-    ort_scalar_type_from_aten(dtype),
-    size.vec(),
-    &ot);
-  return aten_tensor_from_ort(
-    std::move(ot),
+  return empty_ort_tensor(
+    invoker,
+    size,
+    stride,
     at::device(*device_opt).dtype(dtype));
 }
 
-at::Tensor ort_op_aten_reshape(at::Tensor const& self, at::IntArrayRef shape) {
-  ORT_LOG_FN(self, shape);
+at::Tensor ort_op_aten_as_strided(
+  const at::Tensor& self,
+  at::IntArrayRef size,
+  at::IntArrayRef stride,
+  c10::optional<int64_t> storage_offset) {
+  ORT_LOG_FN(self, size, stride, storage_offset);
+  ORT_PROFILE_OP("aten::as_strided");
 
-  auto& invoker = GetORTInvoker(self.device());
-  return aten_tensor_from_ort(
-    reshape_copy(
-      invoker,
-      create_ort_value(invoker, self),
-      shape.vec()),
-    self.options());
+  return aten_view_from_ort(
+    self,
+    size,
+    stride,
+    storage_offset.value_or(self.storage_offset()));
 }
 
 at::Tensor ort_op_aten_view(const at::Tensor& self, at::IntArrayRef size) {
   ORT_LOG_FN(self, size);
+  ORT_PROFILE_OP("aten::view");
+
+  auto inferred_size = at::infer_size(size, self.numel());
+  auto stride = at::detail::computeStride(
+    self.sizes(),
+    self.strides(),
+    inferred_size);
+  TORCH_CHECK(
+    stride.has_value(),
+    "view size is not compatible with input tensor's size and stride (at "
+    "least one dimension spans across two contiguous subspaces). Use "
+    ".reshape(...) instead.");
 
+  return aten_view_from_ort(
+    self,
+    inferred_size,
+    *stride,
+    self.storage_offset());
+}
+
+at::Tensor ort_op_aten_reshape(at::Tensor const& self, at::IntArrayRef shape) {
+  ORT_LOG_FN(self, shape);
+  ORT_PROFILE_OP("aten::reshape");
+
+  auto inferred_size = at::infer_size(shape, self.numel());
+  auto stride = at::detail::computeStride(
+    self.sizes(),
+    self.strides(),
+    inferred_size);
+  if (stride.has_value()) {
+    return aten_view_from_ort(
+      self,
+      inferred_size,
+      *stride,
+      self.storage_offset());
+  }
+
+  // Not expressible as a view of self; gather into a new contiguous buffer
+  // and view that with the requested shape.
   auto& invoker = GetORTInvoker(self.device());
-  return aten_tensor_from_ort(
-    reshape_copy(
-      invoker,
-      create_ort_value(invoker, self),
-      at::infer_size(
-        size,
-        self.numel())),
+  auto contiguous = aten_tensor_from_ort(
+    create_ort_value(invoker, self),
     self.options());
+  return aten_view_from_ort(
+    contiguous,
+    inferred_size,
+    GetStrides(inferred_size, 1),
+    0);
+}
+
+at::Tensor ort_op_aten_t(const at::Tensor& self) {
+  ORT_LOG_FN(self);
+  ORT_PROFILE_OP("aten::t");
+
+  TORCH_CHECK(
+    self.dim() <= 2,
+    "t() expects a tensor with <= 2 dimensions, but self is ",
+    self.dim(), "D");
+
+  if (self.dim() < 2) {
+    return aten_view_from_ort(
+      self,
+      self.sizes(),
+      self.strides(),
+      self.storage_offset());
+  }
+
+  return aten_view_from_ort(
+    self,
+    {self.size(1), self.size(0)},
+    {self.stride(1), self.stride(0)},
+    self.storage_offset());
+}
+
+at::Tensor ort_op_aten_squeeze(const at::Tensor& self, int64_t dim) {
+  ORT_LOG_FN(self, dim);
+  ORT_PROFILE_OP("aten::squeeze.dim");
+
+  auto sizes = self.sizes().vec();
+  auto strides = self.strides().vec();
+  if (self.dim() > 0) {
+    dim = at::maybe_wrap_dim(dim, self.dim());
+    if (sizes[dim] == 1) {
+      sizes.erase(sizes.begin() + dim);
+      strides.erase(strides.begin() + dim);
+    }
+  }
+
+  return aten_view_from_ort(
+    self,
+    sizes,
+    strides,
+    self.storage_offset());
+}
+
+at::Tensor ort_op_aten_unsqueeze(const at::Tensor& self, int64_t dim) {
+  ORT_LOG_FN(self, dim);
+  ORT_PROFILE_OP("aten::unsqueeze");
+
+  dim = at::maybe_wrap_dim(dim, self.dim() + 1);
+  auto sizes = self.sizes().vec();
+  auto strides = self.strides().vec();
+  int64_t new_stride = dim >= self.dim()
+    ? 1
+    : sizes[dim] * strides[dim];
+  sizes.insert(sizes.begin() + dim, 1);
+  strides.insert(strides.begin() + dim, new_stride);
+
+  return aten_view_from_ort(
+    self,
+    sizes,
+    strides,
+    self.storage_offset());
+}
+
+at::Tensor ort_op_aten_expand(
+  const at::Tensor& self,
+  at::IntArrayRef size,
+  bool implicit) {
+  ORT_LOG_FN(self, size, implicit);
+  ORT_PROFILE_OP("aten::expand");
+
+  TORCH_CHECK(
+    size.size() >= static_cast<size_t>(self.dim()),
+    "expand(", self.toString(), "{", self.sizes(), "}, size=", size,
+    "): the number of sizes provided (", size.size(), ") ",
+    "must be greater or equal to the number of dimensions in the tensor (",
+    self.dim(), ")");
+
+  std::vector<int64_t> expanded_sizes;
+  std::vector<int64_t> expanded_strides;
+  std::tie(expanded_sizes, expanded_strides) = at::inferExpandGeometry(
+    self.sizes(),
+    self.strides(),
+    size);
+
+  return aten_view_from_ort(
+    self,
+    expanded_sizes,
+    expanded_strides,
+    self.storage_offset());
 }
 
 at::Tensor& ort_op_aten_copy_(
@@ -212,6 +1138,7 @@ at::Tensor& ort_op_aten_copy_(
   const at::Tensor& src,
   bool non_blocking) {
   ORT_LOG_FN(self, src, non_blocking);
+  ORT_PROFILE_OP("aten::copy_");
 
   assert_tensor_supported(self);
   assert_tensor_supported(src);
@@ -219,10 +1146,50 @@ at::Tensor& ort_op_aten_copy_(
   auto& invoker = GetORTInvoker(self.device().type() == at::kORT
     ? self.device()
     : src.device());
-  const auto ort_src = create_ort_value(invoker, src);
-  auto ort_self = create_ort_value(invoker, self);
 
-  copy(invoker, ort_src, ort_self);
+  // Nothing to do if both sides are the same elements, e.g. an ORT tensor
+  // copied back into the CPU tensor it aliases; pending values have no
+  // buffer to compare until synchronized
+  synchronize(invoker);
+  if (host_data_ptr(self) == host_data_ptr(src) &&
+    self.sizes() == src.sizes() &&
+    self.strides() == src.strides() &&
+    self.scalar_type() == src.scalar_type()) {
+    return self;
+  }
+
+  ORTProfileScope profile_scope(
+    ORTProfileEventKind::COPY,
+    src.device().type() == at::kCPU
+      ? "copy_cpu_to_ort"
+      : self.device().type() == at::kCPU ? "copy_ort_to_cpu" : "copy_ort_to_ort");
+  profile_scope.AddBytes(self.nbytes());
+
+  if (self.is_contiguous() && src.is_contiguous()) {
+    const auto ort_src = wrap_ort_value(src);
+    auto ort_self = wrap_ort_value(self);
+    copy(invoker, ort_src, ort_self);
+    return self;
+  }
+
+  TORCH_CHECK(
+    self.sizes() == src.sizes() && self.scalar_type() == src.scalar_type(),
+    "ORT copy: strided copies require matching sizes and dtypes");
+
+  // Tensors sharing a dense layout, e.g. channels_last, are copied as flat
+  // buffers
+  if (self.strides() == src.strides() && self.is_non_overlapping_and_dense()) {
+    memcpy(host_data_ptr(self), host_data_ptr(src), self.nbytes());
+    return self;
+  }
+
+  CopyStrided(
+    host_data_ptr(src),
+    src.strides(),
+    host_data_ptr(self),
+    self.strides(),
+    self.sizes(),
+    self.element_size());
 
   return self;
 }
@@ -235,39 +1202,35 @@ at::Tensor ort_op_aten_zeros_like(
   c10::optional<at::Device> device,
   c10::optional<bool> pin_memory,
   c10::optional<at::MemoryFormat> memory_format){
+  ORT_PROFILE_OP("aten::zeros_like");
 
   auto& invoker = GetORTInvoker(self.device());
 
-  auto ort_in_self = create_ort_value(invoker, self);
-  auto& ort_in_self_tensor = ort_in_self.Get<onnxruntime::Tensor>();
-  auto& shape = ort_in_self_tensor.Shape();
-
   OrtValue output;
-  //todo: avoid the copy on this small shape vector;
-  auto element_type = ort_in_self_tensor.DataType();
+  auto element_type = ort_scalar_type_from_aten(self.scalar_type());
   CreateMLValue(invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
-                element_type, shape.GetDims(), &output);
+                element_type, self.sizes().vec(), &output);
   auto* output_tensor = output.GetMutable<onnxruntime::Tensor>();
-  memset(output_tensor->MutableDataRaw(element_type), 0, element_type->Size() * shape.Size());
+  memset(output_tensor->MutableDataRaw(element_type), 0, element_type->Size() * self.numel());
   return aten_tensor_from_ort(
     std::move(output),
     self.options());
 }
 
 at::Tensor& ort_op_aten_zero_(at::Tensor& self){
+  ORT_PROFILE_OP("aten::zero_");
   auto& invoker = GetORTInvoker(self.device());
   auto ort_in_self = create_ort_value(invoker, self);
-  OrtValue flag_val;
-  //construct a constant tensor
-  auto element_type = onnxruntime::DataTypeImpl::GetType<int64_t>();
-  CreateMLValue(invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
-                element_type, {}, &flag_val);
-  auto* ort_flag_tensor = flag_val.GetMutable<onnxruntime::Tensor>();
-  CopyVectorToTensor<int64_t>({1}, *ort_flag_tensor);
+  auto flag_val = create_ort_scalar_value<int64_t>(invoker, 1);
 
   std::vector<OrtValue> ort_out(1);
+  auto ort_in_place = bind_in_place_output(invoker, self, {
+    &ort_in_self,
+    &flag_val,
+  }, ort_out[0]);
 
-  auto status = invoker.Invoke(
+  auto status = invoke(
+    invoker,
     "ZeroGradient", {
       std::move(ort_in_self),
       std::move(flag_val)
@@ -277,16 +1240,554 @@ at::Tensor& ort_op_aten_zero_(at::Tensor& self){
     throw std::runtime_error(
       "ORT return failure status:" + status.ErrorMessage());
 
-  //TODO: fix the inplace
-  OrtValue ort_result = ort_out[0];
-  auto& ort_result_tensor = ort_result.Get<onnxruntime::Tensor>();
-  auto* ort_result_data = ort_result_tensor.DataRaw(ort_result_tensor.DataType());
-  auto* ort_self_tensor = ort_in_self.GetMutable<onnxruntime::Tensor>();
-  auto* ort_self_data = ort_self_tensor->MutableDataRaw(ort_self_tensor->DataType());
-  memcpy(ort_self_data, ort_result_data, ort_self_tensor->DataType()->Size() * ort_self_tensor->Shape().Size());
+  static auto& in_place_counter = get_in_place_counter("aten::zero_");
+  if (ort_in_place) {
+    in_place_counter.in_place++;
+  } else {
+    in_place_counter.copied++;
+    copy_into_tensor(invoker, ort_out[0], self);
+  }
+  return self;
+}
+
+at::Tensor& ort_op_aten_fill_(at::Tensor& self, at::Scalar value) {
+  ORT_LOG_FN(self, value);
+  ORT_PROFILE_OP("aten::fill_.Scalar");
+
+  auto& invoker = GetORTInvoker(self.device());
+  auto ort_value = create_ort_value(invoker, value, self.scalar_type());
+  auto ort_shape = create_ort_value(invoker, self.sizes());
+
+  std::vector<OrtValue> ort_out(1);
+  auto ort_in_place = bind_in_place_output(invoker, self, {
+    &ort_value,
+    &ort_shape,
+  }, ort_out[0]);
+
+  auto status = invoke(
+    invoker,
+    "Expand", {
+      std::move(ort_value),
+      std::move(ort_shape)
+    }, ort_out, nullptr);
+
+  if (!status.IsOK())
+    throw std::runtime_error(
+      "ORT return failure status:" + status.ErrorMessage());
+
+  static auto& in_place_counter = get_in_place_counter("aten::fill_");
+  if (ort_in_place) {
+    in_place_counter.in_place++;
+  } else {
+    in_place_counter.copied++;
+    copy_into_tensor(invoker, ort_out[0], self);
+  }
+  return self;
+}
+
+at::Scalar ort_op_aten__local_scalar_dense(const at::Tensor& self) {
+  ORT_LOG_FN(self);
+  ORT_PROFILE_OP("aten::_local_scalar_dense");
+
+  return aten_cpu_tensor_from_ort(self).item();
+}
+
+at::Tensor& ort_op_aten_bernoulli_(
+  at::Tensor& self,
+  double p,
+  // *
+  c10::optional<at::Generator> generator) {
+  ORT_LOG_FN(self, p, generator);
+  ORT_PROFILE_OP("aten::bernoulli_.float");
+
+  TORCH_CHECK(
+    0 <= p && p <= 1,
+    "bernoulli_ expects p to be in [0, 1], but got p=", p);
+
+  // Draw the noise from the torch generator, so that torch.manual_seed
+  // makes e.g. dropout masks reproducible, into a buffer the kernels read
+  // without a copy. Unlike a seeded RandomUniformLike node, this keeps the
+  // graph recorded in lazy mode the same on every call.
+  auto uniform_cpu = at::empty(self.sizes(), self.options()
+    .device(at::kCPU)
+    .dtype(at::kFloat));
+  uniform_cpu.uniform_(0, 1, generator);
+
+  auto& invoker = GetORTInvoker(self.device());
+  auto uniform = wrap_ort_value(uniform_cpu);
+
+  auto mask = invoke_kernel(invoker, "Less", {
+    uniform,
+    create_ort_value(invoker, p, at::kFloat)
+  }, 1)[0];
+
+  onnxruntime::NodeAttributes cast_attrs(1);
+  cast_attrs["to"] = create_ort_attribute(
+    "to",
+    onnx_element_type(self.scalar_type()));
+  auto noise = invoke_kernel(invoker, "Cast", {mask}, 1, &cast_attrs)[0];
+
+  copy_into_tensor(invoker, noise, self);
   return self;
 }
 
+at::Tensor ort_op_aten__softmax_backward_data(
+  const at::Tensor& grad_output,
+  const at::Tensor& output,
+  int64_t dim,
+  const at::Tensor& self) {
+  ORT_LOG_FN(grad_output, output, dim, self);
+  ORT_PROFILE_OP("aten::_softmax_backward_data");
+
+  auto& invoker = GetORTInvoker(grad_output.device());
+  auto ort_grad_output = create_ort_value(invoker, grad_output);
+  auto ort_output = create_ort_value(invoker, output);
+  auto ort_axes = create_ort_value(
+    invoker,
+    std::vector<int64_t>{at::maybe_wrap_dim(dim, output.dim())});
+
+  // grad_input = output * (grad_output - sum(grad_output * output, dim))
+  auto product = invoke_kernel(invoker, "Mul", {
+    ort_grad_output,
+    ort_output
+  }, 1)[0];
+  auto sum = invoke_kernel(invoker, "ReduceSum", {product, ort_axes}, 1)[0];
+  auto difference = invoke_kernel(invoker, "Sub", {
+    ort_grad_output,
+    sum
+  }, 1)[0];
+  auto grad_input = invoke_kernel(invoker, "Mul", {
+    ort_output,
+    difference
+  }, 1)[0];
+
+  return aten_tensor_from_ort(
+    std::move(grad_input),
+    grad_output.options());
+}
+
+at::Tensor ort_op_aten__log_softmax_backward_data(
+  const at::Tensor& grad_output,
+  const at::Tensor& output,
+  int64_t dim,
+  const at::Tensor& self) {
+  ORT_LOG_FN(grad_output, output, dim, self);
+  ORT_PROFILE_OP("aten::_log_softmax_backward_data");
+
+  auto& invoker = GetORTInvoker(grad_output.device());
+  auto ort_grad_output = create_ort_value(invoker, grad_output);
+  auto ort_axes = create_ort_value(
+    invoker,
+    std::vector<int64_t>{at::maybe_wrap_dim(dim, output.dim())});
+
+  // grad_input = grad_output - exp(output) * sum(grad_output, dim)
+  auto sum = invoke_kernel(invoker, "ReduceSum", {
+    ort_grad_output,
+    ort_axes
+  }, 1)[0];
+  auto softmax = invoke_kernel(invoker, "Exp", {
+    create_ort_value(invoker, output)
+  }, 1)[0];
+  auto product = invoke_kernel(invoker, "Mul", {softmax, sum}, 1)[0];
+  auto grad_input = invoke_kernel(invoker, "Sub", {
+    ort_grad_output,
+    product
+  }, 1)[0];
+
+  return aten_tensor_from_ort(
+    std::move(grad_input),
+    grad_output.options());
+}
+
+namespace {
+  const char* ort_reduction_name(int64_t reduction) {
+    switch (reduction) {
+      case at::Reduction::None:
+        return "none";
+      case at::Reduction::Mean:
+        return "mean";
+      case at::Reduction::Sum:
+        return "sum";
+      default:
+        ORT_THROW("Unsupported: reduction ", reduction);
+    }
+  }
+
+  // Returns the class weight of each target, zero where the target is
+  // ignore_index, and sets safe_target to the targets with ignored entries
+  // replaced by class 0 so that they may be used as indices.
+  OrtValue nll_loss_target_weights(
+    onnxruntime::ORTInvoker& invoker,
+    const OrtValue& target,
+    const c10::optional<at::Tensor>& weight,
+    int64_t ignore_index,
+    at::ScalarType type,
+    OrtValue& safe_target) {
+    auto ignored = invoke_kernel(invoker, "Equal", {
+      target,
+      create_ort_value(invoker, ignore_index, at::kLong)
+    }, 1)[0];
+    safe_target = invoke_kernel(invoker, "Where", {
+      ignored,
+      create_ort_value(invoker, 0, at::kLong),
+      target
+    }, 1)[0];
+
+    auto target_weights = weight && weight->defined()
+      ? invoke_kernel(invoker, "Gather", {
+          create_ort_value(invoker, *weight),
+          safe_target
+        }, 1)[0]
+      : create_ort_value(invoker, 1, type);
+    return invoke_kernel(invoker, "Where", {
+      ignored,
+      create_ort_value(invoker, 0, type),
+      target_weights
+    }, 1)[0];
+  }
+}
+
+std::tuple<at::Tensor, at::Tensor> ort_op_aten_nll_loss_forward(
+  const at::Tensor& self,
+  const at::Tensor& target,
+  const c10::optional<at::Tensor>& weight,
+  int64_t reduction,
+  int64_t ignore_index) {
+  ORT_LOG_FN(self, target, weight, reduction, ignore_index);
+  ORT_PROFILE_OP("aten::nll_loss_forward");
+
+  TORCH_CHECK(
+    self.dim() > 0 && self.dim() <= 2,
+    "input tensor should be 1D or 2D");
+  TORCH_CHECK(
+    target.dim() <= 1,
+    "0D or 1D target tensor expected, multi-target not supported");
+
+  auto& invoker = GetORTInvoker(self.device());
+
+  // NegativeLogLikelihoodLoss expects a batch dimension
+  auto ort_target = create_ort_value(invoker, target.reshape({-1}));
+  std::vector<OrtValue> loss_inputs = {
+    create_ort_value(invoker, self.dim() == 1 ? self.unsqueeze(0) : self),
+    ort_target,
+  };
+  if (weight && weight->defined()) {
+    loss_inputs.push_back(create_ort_value(invoker, *weight));
+  }
+
+  onnxruntime::NodeAttributes loss_attrs(2);
+  loss_attrs["reduction"] = create_ort_string_attribute(
+    "reduction",
+    ort_reduction_name(reduction));
+  loss_attrs["ignore_index"] = create_ort_attribute(
+    "ignore_index",
+    ignore_index);
+  auto output = aten_tensor_from_ort(
+    std::move(invoke_kernel(
+      invoker,
+      "NegativeLogLikelihoodLoss",
+      loss_inputs,
+      1,
+      &loss_attrs)[0]),
+    self.options());
+  if (reduction == at::Reduction::None && self.dim() == 1) {
+    output = output.squeeze(0);
+  }
+
+  OrtValue safe_target;
+  auto target_weights = nll_loss_target_weights(
+    invoker,
+    ort_target,
+    weight,
+    ignore_index,
+    self.scalar_type(),
+    safe_target);
+  onnxruntime::NodeAttributes sum_attrs(1);
+  sum_attrs["keepdims"] = create_ort_attribute("keepdims", 0);
+  auto total_weight = invoke_kernel(
+    invoker,
+    "ReduceSum",
+    {target_weights},
+    1,
+    &sum_attrs)[0];
+
+  return std::make_tuple(
+    output,
+    aten_tensor_from_ort(std::move(total_weight), self.options()));
+}
+
+at::Tensor ort_op_aten_nll_loss_backward(
+  const at::Tensor& grad_output,
+  const at::Tensor& self,
+  const at::Tensor& target,
+  const c10::optional<at::Tensor>& weight,
+  int64_t reduction,
+  int64_t ignore_index,
+  const at::Tensor& total_weight) {
+  ORT_LOG_FN(
+    grad_output, self, target, weight, reduction, ignore_index, total_weight);
+  ORT_PROFILE_OP("aten::nll_loss_backward");
+
+  auto& invoker = GetORTInvoker(self.device());
+  int64_t batch_size = self.dim() == 1 ? 1 : self.size(0);
+  int64_t num_classes = self.size(-1);
+
+  OrtValue safe_target;
+  auto target_weights = nll_loss_target_weights(
+    invoker,
+    create_ort_value(invoker, target.reshape({-1})),
+    weight,
+    ignore_index,
+    self.scalar_type(),
+    safe_target);
+
+  // Each loss term -weight[t] * self[t] contributes -weight[t] * grad_output
+  // to the gradient of self[t], and nothing to the other classes
+  auto scale = invoke_kernel(invoker, "Mul", {
+    target_weights,
+    create_ort_value(invoker, reduction == at::Reduction::None
+      ? grad_output.reshape({-1})
+      : grad_output)
+  }, 1)[0];
+  if (reduction == at::Reduction::Mean) {
+    scale = invoke_kernel(invoker, "Div", {
+      scale,
+      create_ort_value(invoker, total_weight)
+    }, 1)[0];
+  }
+  auto updates = invoke_kernel(invoker, "Neg", {scale}, 1)[0];
+
+  auto ort_axes = create_ort_value(invoker, std::vector<int64_t>{1});
+  auto zeros = invoke_kernel(invoker, "Expand", {
+    create_ort_value(invoker, 0, self.scalar_type()),
+    create_ort_value(invoker, std::vector<int64_t>{batch_size, num_classes})
+  }, 1)[0];
+
+  onnxruntime::NodeAttributes scatter_attrs(1);
+  scatter_attrs["axis"] = create_ort_attribute("axis", 1);
+  auto grad_input = invoke_kernel(invoker, "ScatterElements", {
+    zeros,
+    invoke_kernel(invoker, "Unsqueeze", {safe_target, ort_axes}, 1)[0],
+    invoke_kernel(invoker, "Unsqueeze", {updates, ort_axes}, 1)[0]
+  }, 1, &scatter_attrs)[0];
+
+  return aten_tensor_from_ort(
+    std::move(grad_input),
+    self.options()).view(self.sizes());
+}
+
+namespace {
+  // Returns the LayerNormalization scale as a vector of n elements, which
+  // is all ones when the layer has no weight.
+  OrtValue layer_norm_scale(
+    onnxruntime::ORTInvoker& invoker,
+    const c10::optional<at::Tensor>& weight,
+    int64_t n,
+    at::ScalarType type) {
+    if (weight && weight->defined()) {
+      return create_ort_value(invoker, weight->reshape({n}));
+    }
+    return invoke_kernel(invoker, "Expand", {
+      create_ort_value(invoker, 1, type),
+      create_ort_value(invoker, std::vector<int64_t>{n})
+    }, 1)[0];
+  }
+}
+
+std::tuple<at::Tensor, at::Tensor, at::Tensor> ort_op_aten_native_layer_norm(
+  const at::Tensor& input,
+  const c10::optional<at::Tensor>& weight,
+  const c10::optional<at::Tensor>& bias,
+  int64_t M,
+  int64_t N,
+  double eps) {
+  ORT_LOG_FN(input, weight, bias, M, N, eps);
+  ORT_PROFILE_OP("aten::native_layer_norm");
+
+  auto& invoker = GetORTInvoker(input.device());
+
+  // Normalize the input as M rows of N elements
+  std::vector<OrtValue> norm_inputs = {
+    create_ort_value(invoker, input.reshape({M, N})),
+    layer_norm_scale(invoker, weight, N, input.scalar_type()),
+  };
+  if (bias && bias->defined()) {
+    norm_inputs.push_back(create_ort_value(invoker, bias->reshape({N})));
+  }
+
+  onnxruntime::NodeAttributes attrs(2);
+  attrs["axis"] = create_ort_attribute("axis", -1);
+  attrs["epsilon"] = create_ort_attribute("epsilon", eps, at::kFloat);
+  auto outputs = invoke_kernel(
+    invoker,
+    "LayerNormalization",
+    norm_inputs,
+    3,
+    &attrs);
+
+  return std::make_tuple(
+    aten_tensor_from_ort(
+      std::move(outputs[0]),
+      input.options()).view(input.sizes()),
+    aten_tensor_from_ort(std::move(outputs[1]), input.options()).view({M}),
+    aten_tensor_from_ort(std::move(outputs[2]), input.options()).view({M}));
+}
+
+std::tuple<at::Tensor, at::Tensor, at::Tensor> ort_op_aten_native_layer_norm_backward(
+  const at::Tensor& grad_out,
+  const at::Tensor& input,
+  const at::Tensor& mean,
+  const at::Tensor& rstd,
+  const c10::optional<at::Tensor>& weight,
+  int64_t M,
+  int64_t N,
+  std::array<bool, 3> output_mask) {
+  ORT_LOG_FN(grad_out, input, mean, rstd, weight, M, N, output_mask);
+  ORT_PROFILE_OP("aten::native_layer_norm_backward");
+
+  auto& invoker = GetORTInvoker(input.device());
+
+  onnxruntime::NodeAttributes attrs(1);
+  attrs["axis"] = create_ort_attribute("axis", -1);
+  auto outputs = invoke_kernel(invoker, "LayerNormalizationGrad", {
+    create_ort_value(invoker, grad_out.reshape({M, N})),
+    create_ort_value(invoker, input.reshape({M, N})),
+    layer_norm_scale(invoker, weight, N, input.scalar_type()),
+    create_ort_value(invoker, mean.reshape({M, 1})),
+    create_ort_value(invoker, rstd.reshape({M, 1})),
+  }, 3, &attrs, onnxruntime::kMSDomain);
+
+  auto param_sizes = weight && weight->defined()
+    ? weight->sizes().vec()
+    : std::vector<int64_t>{N};
+  at::Tensor grad_input, grad_weight, grad_bias;
+  if (output_mask[0]) {
+    grad_input = aten_tensor_from_ort(
+      std::move(outputs[0]),
+      input.options()).view(input.sizes());
+  }
+  if (output_mask[1]) {
+    grad_weight = aten_tensor_from_ort(
+      std::move(outputs[1]),
+      input.options()).view(param_sizes);
+  }
+  if (output_mask[2]) {
+    grad_bias = aten_tensor_from_ort(
+      std::move(outputs[2]),
+      input.options()).view(param_sizes);
+  }
+  return std::make_tuple(grad_input, grad_weight, grad_bias);
+}
+
+at::Tensor ort_op_aten_embedding_dense_backward(
+  const at::Tensor& grad_output,
+  const at::Tensor& indices,
+  int64_t num_weights,
+  int64_t padding_idx,
+  bool scale_grad_by_freq) {
+  ORT_LOG_FN(grad_output, indices, num_weights, padding_idx, scale_grad_by_freq);
+  ORT_PROFILE_OP("aten::embedding_dense_backward");
+
+  TORCH_CHECK(
+    !scale_grad_by_freq,
+    "ORT embedding backward: scale_grad_by_freq is not supported");
+
+  auto& invoker = GetORTInvoker(grad_output.device());
+  auto ort_indices = create_ort_value(invoker, indices);
+  auto ort_grad_output = create_ort_value(invoker, grad_output);
+
+  // Lookups of the padding row do not contribute to its gradient
+  if (padding_idx >= 0) {
+    auto is_padding = invoke_kernel(invoker, "Equal", {
+      ort_indices,
+      create_ort_value(invoker, padding_idx, at::kLong)
+    }, 1)[0];
+    ort_grad_output = invoke_kernel(invoker, "Where", {
+      invoke_kernel(invoker, "Unsqueeze", {
+        is_padding,
+        create_ort_value(invoker, std::vector<int64_t>{-1})
+      }, 1)[0],
+      create_ort_value(invoker, 0, grad_output.scalar_type()),
+      ort_grad_output
+    }, 1)[0];
+  }
+
+  onnxruntime::NodeAttributes attrs(1);
+  attrs["axis"] = create_ort_attribute("axis", 0);
+  auto grad_weight = invoke_kernel(invoker, "GatherGrad", {
+    create_ort_value(
+      invoker,
+      std::vector<int64_t>{num_weights, grad_output.size(-1)}),
+    ort_indices,
+    ort_grad_output
+  }, 1, &attrs, onnxruntime::kMSDomain)[0];
+
+  return aten_tensor_from_ort(
+    std::move(grad_weight),
+    grad_output.options());
+}
+
+std::tuple<at::Tensor, at::Tensor> ort_op_aten_sort(
+  const at::Tensor& self,
+  int64_t dim,
+  bool descending) {
+  ORT_LOG_FN(self, dim, descending);
+  ORT_PROFILE_OP("aten::sort");
+
+  TORCH_CHECK(self.dim() > 0, "ORT: sort of a 0-d tensor is not supported");
+  dim = at::maybe_wrap_dim(dim, self.dim());
+
+  auto& invoker = GetORTInvoker(self.device());
+
+  // The top k of all k elements along dim are the sorted elements; their
+  // count is only known at runtime, so this cannot be generated
+  onnxruntime::NodeAttributes attrs(3);
+  attrs["axis"] = create_ort_attribute("axis", dim);
+  attrs["largest"] = create_ort_attribute("largest", descending);
+  attrs["sorted"] = create_ort_attribute("sorted", true);
+  auto outputs = invoke_kernel(invoker, "TopK", {
+    create_ort_value(invoker, self),
+    create_ort_value(invoker, std::vector<int64_t>{self.size(dim)})
+  }, 2, &attrs);
+
+  return std::make_tuple(
+    aten_tensor_from_ort(std::move(outputs[0]), self.options()),
+    aten_tensor_from_ort(std::move(outputs[1]), self.options().dtype(at::kLong)));
+}
+
+at::Tensor ort_op_aten__cat(at::TensorList tensors, int64_t dim) {
+  ORT_LOG_FN(tensors.size(), dim);
+  ORT_PROFILE_OP("aten::_cat");
+
+  TORCH_CHECK(tensors.size() > 0, "expected a non-empty list of Tensors");
+  auto result_type = at::native::result_type(tensors);
+  dim = at::legacy_cat_wrap_dim(dim, tensors);
+
+  // Concat takes a variadic input, so this cannot be generated. As in ATen,
+  // empty 1-d tensors are legacy placeholders and are skipped
+  std::vector<OrtValue> inputs;
+  const at::Tensor* first = nullptr;
+  for (const auto& tensor : tensors) {
+    if (tensor.dim() == 1 && tensor.numel() == 0)
+      continue;
+    if (!first)
+      first = &tensor;
+    inputs.push_back(create_ort_value(
+      GetORTInvoker(tensor.device()), tensor, result_type));
+  }
+  if (!first)
+    return at::empty({0}, tensors[0].options().dtype(result_type));
+
+  auto& invoker = GetORTInvoker(first->device());
+  onnxruntime::NodeAttributes attrs(1);
+  attrs["axis"] = create_ort_attribute("axis", dim);
+  auto outputs = invoke_kernel(invoker, "Concat", inputs, 1, &attrs);
+
+  return aten_tensor_from_ort(
+    std::move(outputs[0]),
+    first->options().dtype(result_type));
+}
+
 #pragma endregion
 
 } // namespace eager
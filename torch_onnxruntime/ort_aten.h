@@ -3,45 +3,138 @@
 
 #pragma once
 
+#include <atomic>
+
 #include <torch/extension.h>
 #include <core/framework/ml_value.h>
 
 #include "ort_util.h"
 #include "ort_ops.h"
 #include "ort_log.h"
+#include "ort_profiler.h"
 
 namespace torch_ort {
 namespace eager {
 
+// The order in which the dims of the operands of an elementwise op are laid
+// out in memory, outermost first, e.g. NHWC for channels_last operands. The
+// kernel computes such operands on their buffers in memory order and its
+// result takes the same strides, so that no layout conversion is copied.
+// The contiguous layout has no permutation.
+struct ORTDenseLayout {
+  std::vector<int64_t> permutation;
+
+  bool is_contiguous() const {
+    return permutation.empty();
+  }
+
+  // The strides of a dense tensor of the given sizes in this layout
+  std::vector<int64_t> strides(at::IntArrayRef sizes) const;
+};
+
+// Returns the layout of the first tensor with dims if it is dense but not
+// contiguous and every other tensor with dims has its sizes and strides;
+// otherwise, the contiguous layout, for which operands are gathered.
+ORTDenseLayout get_elementwise_layout(at::TensorList tensors);
+
 const at::Tensor aten_tensor_from_ort(
   OrtValue&& ot,
   const at::TensorOptions& options);
 
+// Creates a tensor from the result of an elementwise kernel computed in
+// layout, whose dims are in memory order.
+const at::Tensor aten_tensor_from_ort(
+  OrtValue&& ot,
+  const at::TensorOptions& options,
+  const ORTDenseLayout& layout);
+
+// Like aten_tensor_from_ort, but the tensor takes the element type of ot
+// instead of the dtype of options, e.g. int64 for the indices of TopK.
+const at::Tensor aten_tensor_from_ort_typed(
+  OrtValue&& ot,
+  const at::TensorOptions& options);
+
+// Creates an ORT tensor aliasing the buffer of the ORT tensor self with the
+// given geometry; no data is allocated or copied.
+at::Tensor aten_view_from_ort(
+  const at::Tensor& self,
+  at::IntArrayRef sizes,
+  at::IntArrayRef strides,
+  int64_t storage_offset);
+
+// Creates an ORT tensor aliasing the storage of a CPU tensor, which it keeps
+// alive; writes through either tensor are visible through the other.
+at::Tensor aten_ort_tensor_from_cpu(
+  const at::Tensor& cpu_tensor,
+  const at::Device& device);
+
+// Creates a CPU tensor aliasing the buffer of an ORT tensor, which it keeps
+// alive; writes through either tensor are visible through the other.
+at::Tensor aten_cpu_tensor_from_ort(const at::Tensor& ort_tensor);
+
 const onnxruntime::MLDataType ort_scalar_type_from_aten(
   at::ScalarType dtype);
 
+at::ScalarType aten_scalar_type_from_ort(onnxruntime::MLDataType type);
+
 const OrtValue create_ort_value(
   onnxruntime::ORTInvoker& invoker,
   const at::Scalar& scalar);
 
+// Creates a 0-d value of the given element type, e.g. the type of the tensor
+// the scalar is combined with, so that no Cast is needed.
+const OrtValue create_ort_value(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Scalar& scalar,
+  at::ScalarType type);
+
 const OrtValue create_ort_value(
   onnxruntime::ORTInvoker& invoker,
   const at::Tensor& tensor);
 
+// Creates the value of an operand of an elementwise op computed in layout;
+// a tensor with dims is in that layout and is not gathered.
+const OrtValue create_ort_value(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Tensor& tensor,
+  const ORTDenseLayout& layout);
+
+// Creates a value of the given element type, e.g. the type an op promotes
+// its operands to. The tensor is only cast if its dtype differs; a wrapped
+// number (a Python scalar) is created as a constant of that type instead.
+const OrtValue create_ort_value(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Tensor& tensor,
+  at::ScalarType type,
+  const ORTDenseLayout& layout = {});
+
 template<typename T>
 const OrtValue create_ort_value(
   onnxruntime::ORTInvoker& invoker, 
   const std::vector<T> values) {
-  OrtValue ort_value;
-  CreateMLValue(
-    invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
-    onnxruntime::DataTypeImpl::GetType<T>(),
-    {(int64_t)values.size(),},
-    &ort_value);
-  CopyVectorToTensor<T>(
-    values,
-    *ort_value.GetMutable<onnxruntime::Tensor>());
-  return ort_value;
+  auto create = [&]() {
+    OrtValue ort_value;
+    CreateMLValue(
+      invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
+      onnxruntime::DataTypeImpl::GetType<T>(),
+      {(int64_t)values.size(),},
+      &ort_value);
+    CopyVectorToTensor<T>(
+      values,
+      *ort_value.GetMutable<onnxruntime::Tensor>());
+    return ort_value;
+  };
+
+  // Small vectors (shapes, axes) are shared from the invoker's constant cache
+  if (values.size() > ORTConstantCache::kMaxElements)
+    return create();
+
+  return GetORTBackendsManager().GetConstantCache(invoker).GetOrCreate(
+    ORTConstantCache::MakeKey(
+      onnxruntime::DataTypeImpl::GetType<T>(),
+      {(int64_t)values.size(),},
+      values),
+    create);
 }
 
 template<typename T>
@@ -53,9 +146,132 @@ const OrtValue create_ort_value(
   return create_ort_value(invoker, values_vector);
 }
 
+// Computes the dtype an elementwise op computes its result in from the
+// dtypes of its operands, as at::result_type does. Each generated op keeps
+// one; its last decision is cached for the signature of the operands (their
+// dtypes and whether each is a tensor, a 0-d tensor or a scalar), so that
+// repeating a call costs a relaxed atomic load.
+class ORTTypePromotion {
+ public:
+  // An operand taking part in promotion; it must outlive the call.
+  struct Operand {
+    Operand(const at::Tensor& tensor);
+    Operand(const at::Scalar& scalar);
+
+    const at::Tensor* tensor;
+    const at::Scalar* scalar;
+    at::ScalarType type;
+    // 0 for a tensor, 1 for a 0-d tensor and 2 for a scalar or wrapped
+    // number, in increasing order of precedence
+    uint8_t category;
+  };
+
+  // Signatures of more operands are not cached
+  static constexpr size_t kMaxCachedOperands = 4;
+
+  // Integral results are promoted to the default dtype when
+  // promote_integers_to_float is set, as by true division.
+  explicit ORTTypePromotion(bool promote_integers_to_float = false)
+    : promote_integers_to_float_(promote_integers_to_float) {}
+
+  at::ScalarType GetResultType(std::initializer_list<Operand> operands);
+
+ private:
+  bool promote_integers_to_float_;
+  // The last signature and its result type, or 0
+  std::atomic<uint64_t> last_decision_{0};
+};
+
+// Checks that a result computed in result_type can be written to out, an
+// in-place or out= tensor, before any kernel runs.
+void check_result_castable(at::ScalarType result_type, const at::Tensor& out);
+
+// Checks the alpha of an addition or subtraction computed in result_type,
+// which must not be a floating point number for integral results, before
+// any kernel runs.
+void check_alpha(at::ScalarType result_type, const at::Scalar& alpha);
+
+// Checks that the tensor operands of an in-place op broadcast to the shape
+// of self, before any kernel runs; ONNX would broadcast self instead.
+void check_in_place_shape(const at::Tensor& self, at::TensorList others);
+
+// Writes a contiguous ORT value into an ORT tensor, which may be a strided
+// view, e.g. the result of an in-place op. The value is cast to the dtype of
+// the tensor if it was computed in another, and read in layout.
+void copy_into_tensor(
+  onnxruntime::ORTInvoker& invoker,
+  const OrtValue& src,
+  const at::Tensor& dst,
+  const ORTDenseLayout& layout = {});
+
+// Binds the buffer of the in-place tensor self as the pre-allocated output
+// of an elementwise kernel, so that the kernel writes its result directly
+// into self. Returns false if self cannot be bound (it is a strided view, it
+// is pending in a lazy graph, its element type differs from the kernel's, or
+// an input partially overlaps it); the caller must then copy the result. In
+// a permuted layout, self is bound in memory order if it has that layout.
+bool bind_in_place_output(
+  onnxruntime::ORTInvoker& invoker,
+  const at::Tensor& self,
+  const std::vector<const OrtValue*>& inputs,
+  OrtValue& output,
+  const ORTDenseLayout& layout = {});
+
+// Binds the buffers of the out= tensors of an op as the pre-allocated
+// outputs of kernel, so that the kernel writes its results directly into
+// them. outs pairs output indices with out tensors. An out tensor whose shape
+// differs from the inferred output shape is resized first, as
+// at::native::resize_output would. Returns false without binding anything if
+// any out tensor cannot be bound (the invoker is lazy or async, an output
+// cannot be inferred, an out tensor is a strided view, needs resizing but is
+// a view, has a different element type, or overlaps an input); the caller
+// must then write each result with set_out_tensor.
+bool bind_out_outputs(
+  onnxruntime::ORTInvoker& invoker,
+  const ORTKernel& kernel,
+  const std::vector<const OrtValue*>& inputs,
+  const onnxruntime::NodeAttributes* attributes,
+  const std::vector<std::pair<size_t, at::Tensor>>& outs,
+  std::vector<OrtValue>& outputs);
+
+// Writes the result of an op into its out= tensor, casting it to the dtype
+// of out if needed. If the shapes differ, out takes over the result's buffer
+// instead, as at::native::resize_output would reallocate it; otherwise the
+// result is copied.
+void set_out_tensor(
+  onnxruntime::ORTInvoker& invoker,
+  OrtValue& result,
+  const at::Tensor& out);
+
+// Counts how often an in-place or out= op wrote into its tensor directly
+// versus copying a result into it.
+struct ORTInPlaceCounter {
+  std::atomic<uint64_t> in_place{0};
+  std::atomic<uint64_t> copied{0};
+};
+
+ORTInPlaceCounter& get_in_place_counter(const std::string& torch_op_name);
+
+std::map<std::string, std::pair<uint64_t, uint64_t>> get_in_place_stats();
+
+void reset_in_place_stats();
+
+// Creates an INT or FLOAT attribute depending on the scalar's own type.
 const onnx::AttributeProto create_ort_attribute(
   const char* name,
   at::Scalar value);
 
+// Creates an attribute for an ONNX attribute declared with the given type,
+// e.g. a FLOAT Gemm alpha from an integral scalar.
+const onnx::AttributeProto create_ort_attribute(
+  const char* name,
+  at::Scalar value,
+  at::ScalarType type);
+
+// Creates an INTS attribute, e.g. the axes of ReduceMax from an int dim.
+const onnx::AttributeProto create_ort_ints_attribute(
+  const char* name,
+  at::IntArrayRef values);
+
 } // namespace eager
 } // namespace torch_ort
\ No newline at end of file
@@ -1,6 +1,9 @@
 // Copyright (c) Microsoft Corporation. All rights reserved.
 // Licensed under the MIT License.
 
+#include <algorithm>
+
+#include <core/common/logging/sinks/clog_sink.h>
 #include <core/providers/cpu/cpu_execution_provider.h>
 
 #include "ort_backends.h"
@@ -20,6 +23,18 @@ onnxruntime::ORTInvoker& GetORTInvoker(const at::Device device) {
   return GetORTBackendsManager().GetInvoker(device);
 }
 
+namespace {
+  OrtThreadPoolParams create_thread_pool_params(
+    int num_threads,
+    const ORTDeviceConfig& config) {
+    OrtThreadPoolParams params;
+    params.thread_pool_size = num_threads;
+    params.allow_spinning = config.allow_spinning;
+    params.auto_set_affinity = config.auto_set_affinity;
+    return params;
+  }
+}
+
 onnxruntime::ORTInvoker& ORTBackendsManager::GetInvoker(const at::Device device) {
   ORT_LOG_FN(device);
 
@@ -31,8 +46,11 @@ onnxruntime::ORTInvoker& ORTBackendsManager::GetInvoker(const at::Device device)
     return *lookup->second;
   }
 
-  auto ep = onnxruntime::make_unique<onnxruntime::CPUExecutionProvider>(
-    onnxruntime::CPUExecutionProviderInfo(false));
+  const auto& config = GetDeviceConfig(device);
+  auto ep = onnxruntime::make_unique<ORTCPUExecutionProvider>(
+    onnxruntime::CPUExecutionProviderInfo(config.use_arena));
+  allocators_[device.index()] = std::static_pointer_cast<ORTCachingAllocator>(
+    ep->GetAllocator(0, OrtMemTypeDefault));
 
   auto invoker = 
     onnxruntime::make_unique<onnxruntime::ORTInvoker>(
@@ -42,5 +60,184 @@ onnxruntime::ORTInvoker& ORTBackendsManager::GetInvoker(const at::Device device)
   return *backends_[device.index()];
 }
 
+ORTLazyGraph* ORTBackendsManager::GetLazyGraph(
+  const onnxruntime::ORTInvoker& invoker) {
+  if (lazy_graphs_.empty()) {
+    return nullptr;
+  }
+
+  auto lookup = lazy_graphs_.find(&invoker);
+  return lookup != lazy_graphs_.end()
+    ? lookup->second.get()
+    : nullptr;
+}
+
+void ORTBackendsManager::SetLazyModeEnabled(
+  const at::Device device,
+  bool enabled) {
+  ORT_LOG_FN(device, enabled);
+
+  auto& invoker = GetInvoker(device);
+  auto lookup = lazy_graphs_.find(&invoker);
+  if (enabled) {
+    TORCH_CHECK(
+      !GetAsyncQueue(invoker),
+      "ORT lazy mode cannot be enabled while async mode is enabled");
+    if (lookup == lazy_graphs_.end()) {
+      lazy_graphs_[&invoker] = onnxruntime::make_unique<ORTLazyGraph>(
+        GetEnvironment(device),
+        GetDeviceConfig(device),
+        allocators_[device.index()]);
+    }
+  } else if (lookup != lazy_graphs_.end()) {
+    lookup->second->Flush();
+    lazy_graphs_.erase(lookup);
+  }
+}
+
+ORTAsyncQueue* ORTBackendsManager::GetAsyncQueue(
+  const onnxruntime::ORTInvoker& invoker) {
+  if (async_queues_.empty()) {
+    return nullptr;
+  }
+
+  auto lookup = async_queues_.find(&invoker);
+  return lookup != async_queues_.end()
+    ? lookup->second.get()
+    : nullptr;
+}
+
+void ORTBackendsManager::SetAsyncModeEnabled(
+  const at::Device device,
+  bool enabled) {
+  ORT_LOG_FN(device, enabled);
+
+  auto& invoker = GetInvoker(device);
+  auto lookup = async_queues_.find(&invoker);
+  if (enabled) {
+    TORCH_CHECK(
+      !GetLazyGraph(invoker),
+      "ORT async mode cannot be enabled while lazy mode is enabled");
+    if (lookup == async_queues_.end()) {
+      async_queues_[&invoker] = onnxruntime::make_unique<ORTAsyncQueue>(invoker);
+    }
+  } else if (lookup != async_queues_.end()) {
+    // Drain the queue first so that errors are not lost
+    auto queue = std::move(lookup->second);
+    async_queues_.erase(lookup);
+    queue->Synchronize();
+  }
+}
+
+void ORTBackendsManager::SetDeviceConfig(
+  const at::Device device,
+  const ORTDeviceConfig& config) {
+  ORT_LOG_FN(device);
+
+  TORCH_CHECK(device.type() == at::DeviceType::ORT, "must be an ORT device");
+  TORCH_CHECK(device.index() >= 0, "must have a valid index");
+  TORCH_CHECK(
+    backends_.find(device.index()) == backends_.end(),
+    "ORT device ", device.index(), " is already in use; it must be ",
+    "configured before any tensor is created on it");
+  TORCH_CHECK(
+    config.intra_op_num_threads >= 0 && config.inter_op_num_threads >= 0,
+    "ORT thread counts must not be negative");
+
+  device_configs_[device.index()] = config;
+}
+
+const ORTDeviceConfig& ORTBackendsManager::GetDeviceConfig(
+  const at::Device device) {
+  return device_configs_[device.index()];
+}
+
+onnxruntime::Environment& ORTBackendsManager::GetEnvironment(
+  const at::Device device) {
+  auto lookup = environments_.find(device.index());
+  if (lookup != environments_.end()) {
+    return *lookup->second;
+  }
+
+  // Each device owns its thread pools, so that devices configured with
+  // disjoint thread counts and affinity do not compete for the same threads
+  const auto& config = GetDeviceConfig(device);
+  OrtThreadingOptions threading_options;
+  threading_options.intra_op_thread_pool_params =
+    create_thread_pool_params(config.intra_op_num_threads, config);
+  threading_options.inter_op_thread_pool_params =
+    create_thread_pool_params(config.inter_op_num_threads, config);
+
+  std::unique_ptr<onnxruntime::Environment> env;
+  auto logging_manager = onnxruntime::make_unique<logging::LoggingManager>(
+    std::unique_ptr<logging::ISink>{new logging::CLogSink{}},
+    logging::Severity::kWARNING,
+    false,
+    logging::LoggingManager::InstanceType::Temporal);
+  ORT_THROW_IF_ERROR(onnxruntime::Environment::Create(
+    std::move(logging_manager),
+    env,
+    &threading_options,
+    true));
+
+  auto& result = *env;
+  environments_[device.index()] = std::move(env);
+  return result;
+}
+
+ORTCachingAllocator& ORTBackendsManager::GetCachingAllocator(
+  const at::Device device) {
+  GetInvoker(device);
+  return *allocators_[device.index()];
+}
+
+void ORTBackendsManager::EmptyCache() {
+  for (auto& allocator : allocators_) {
+    allocator.second->EmptyCache();
+  }
+}
+
+ORTConstantCache& ORTBackendsManager::GetConstantCache(
+  const onnxruntime::ORTInvoker& invoker) {
+  auto& cache = constant_caches_[&invoker];
+  if (!cache) {
+    cache = onnxruntime::make_unique<ORTConstantCache>();
+  }
+  return *cache;
+}
+
+ORTKernelCache& ORTBackendsManager::GetKernelCache(
+  const onnxruntime::ORTInvoker& invoker) {
+  auto& cache = kernel_caches_[&invoker];
+  if (!cache) {
+    auto backend = std::find_if(
+      backends_.begin(),
+      backends_.end(),
+      [&](const auto& entry) { return entry.second.get() == &invoker; });
+    TORCH_CHECK(
+      backend != backends_.end(),
+      "invoker does not belong to an ORT device");
+    at::Device device(at::DeviceType::ORT, backend->first);
+    cache = onnxruntime::make_unique<ORTKernelCache>(
+      GetEnvironment(device),
+      GetDeviceConfig(device),
+      allocators_[device.index()]);
+  }
+  return *cache;
+}
+
+void ORTBackendsManager::SetKernelCacheEnabled(
+  const at::Device device,
+  bool enabled) {
+  ORT_LOG_FN(device, enabled);
+
+  auto& invoker = GetInvoker(device);
+  if (enabled) {
+    uncached_invokers_.erase(&invoker);
+  } else {
+    uncached_invokers_.insert(&invoker);
+  }
+}
+
 } // namespace eager
-} // namespace torch_ort
\ No newline at end of file
+} // namespace torch_ort
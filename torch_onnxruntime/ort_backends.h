@@ -3,10 +3,21 @@
 
 #pragma once
 
+#include <set>
+
 #include <torch/extension.h>
 #include <core/framework/ml_value.h>
 #include <core/eager/ort_kernel_invoker.h>
 #include <core/providers/cpu/cpu_execution_provider.h>
+#include <core/session/environment.h>
+#include <core/util/thread_utils.h>
+
+#include "ort_allocator.h"
+#include "ort_async.h"
+#include "ort_config.h"
+#include "ort_constants.h"
+#include "ort_kernels.h"
+#include "ort_lazy.h"
 
 namespace torch_ort {
 namespace eager {
@@ -31,9 +42,58 @@ public:
 
   onnxruntime::ORTInvoker& GetInvoker(const at::Device device);
 
+  // Returns the pending graph for the invoker if lazy mode is enabled on
+  // its device, otherwise nullptr.
+  ORTLazyGraph* GetLazyGraph(const onnxruntime::ORTInvoker& invoker);
+
+  void SetLazyModeEnabled(const at::Device device, bool enabled);
+
+  // Returns the kernel queue for the invoker if async mode is enabled on
+  // its device, otherwise nullptr.
+  ORTAsyncQueue* GetAsyncQueue(const onnxruntime::ORTInvoker& invoker);
+
+  void SetAsyncModeEnabled(const at::Device device, bool enabled);
+
+  void SetDeviceConfig(const at::Device device, const ORTDeviceConfig& config);
+
+  const ORTDeviceConfig& GetDeviceConfig(const at::Device device);
+
+  // Returns the environment owning the device's thread pools, which runs
+  // the sessions compiled for lazy mode.
+  onnxruntime::Environment& GetEnvironment(const at::Device device);
+
+  ORTConstantCache& GetConstantCache(const onnxruntime::ORTInvoker& invoker);
+
+  // Returns the sessions running kernel handles and fused graphs on the
+  // invoker's device, which share the device's environment.
+  ORTKernelCache& GetKernelCache(const onnxruntime::ORTInvoker& invoker);
+
+  // Generated ops run through the kernel cache unless it is disabled on
+  // their device, in which case every kernel is resolved by name.
+  bool IsKernelCacheEnabled(const onnxruntime::ORTInvoker& invoker) const {
+    return uncached_invokers_.empty() ||
+      uncached_invokers_.find(&invoker) == uncached_invokers_.end();
+  }
+
+  void SetKernelCacheEnabled(const at::Device device, bool enabled);
+
+  // Returns the allocator backing the device's tensors and kernel outputs.
+  ORTCachingAllocator& GetCachingAllocator(const at::Device device);
+
+  // Releases the cached blocks of every device's allocator.
+  void EmptyCache();
+
 private:
   std::map<ORTDeviceKind, std::string> backend_kinds_;
   std::map<at::DeviceIndex, std::unique_ptr<onnxruntime::ORTInvoker>> backends_;
+  std::map<at::DeviceIndex, std::shared_ptr<ORTCachingAllocator>> allocators_;
+  std::map<at::DeviceIndex, ORTDeviceConfig> device_configs_;
+  std::map<at::DeviceIndex, std::unique_ptr<onnxruntime::Environment>> environments_;
+  std::map<const onnxruntime::ORTInvoker*, std::unique_ptr<ORTLazyGraph>> lazy_graphs_;
+  std::map<const onnxruntime::ORTInvoker*, std::unique_ptr<ORTAsyncQueue>> async_queues_;
+  std::map<const onnxruntime::ORTInvoker*, std::unique_ptr<ORTConstantCache>> constant_caches_;
+  std::map<const onnxruntime::ORTInvoker*, std::unique_ptr<ORTKernelCache>> kernel_caches_;
+  std::set<const onnxruntime::ORTInvoker*> uncached_invokers_;
 };
 
 ORTBackendsManager& GetORTBackendsManager();
@@ -0,0 +1,26 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+namespace torch_ort {
+namespace eager {
+
+// Per-device execution settings. A device must be configured before its
+// invoker is created, i.e. before the first tensor is placed on it.
+struct ORTDeviceConfig {
+  // Threads used within a single kernel; 0 lets ORT pick one per core
+  int intra_op_num_threads = 0;
+  // Threads used to run independent nodes of a lazy graph concurrently;
+  // 0 or 1 runs the nodes sequentially
+  int inter_op_num_threads = 0;
+  // Whether idle pool threads spin before blocking
+  bool allow_spinning = true;
+  // Whether pool threads are pinned to cores
+  bool auto_set_affinity = false;
+  // Whether the execution provider allocates through ORT's BFC arena
+  bool use_arena = false;
+};
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,45 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include "ort_constants.h"
+
+namespace torch_ort {
+namespace eager {
+
+constexpr size_t ORTConstantCache::kMaxElements;
+constexpr size_t ORTConstantCache::kDefaultCapacity;
+
+OrtValue ORTConstantCache::GetOrCreate(
+  const std::string& key,
+  const std::function<OrtValue()>& create) {
+  std::lock_guard<std::mutex> lock(mutex_);
+
+  auto lookup = index_.find(key);
+  if (lookup != index_.end()) {
+    entries_.splice(entries_.begin(), entries_, lookup->second);
+    return lookup->second->second;
+  }
+
+  if (entries_.size() >= capacity_) {
+    index_.erase(entries_.back().first);
+    entries_.pop_back();
+  }
+
+  entries_.emplace_front(key, create());
+  index_[key] = entries_.begin();
+  return entries_.front().second;
+}
+
+size_t ORTConstantCache::GetSize() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return entries_.size();
+}
+
+void ORTConstantCache::Clear() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  entries_.clear();
+  index_.clear();
+}
+
+} // namespace eager
+} // namespace torch_ort
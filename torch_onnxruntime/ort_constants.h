@@ -0,0 +1,73 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <functional>
+#include <list>
+#include <mutex>
+#include <unordered_map>
+
+#include <core/framework/ml_value.h>
+
+namespace torch_ort {
+namespace eager {
+
+// A bounded LRU cache of small constant tensors (scalars, shapes and axes)
+// keyed by element type, shape and value. Ops share the cached OrtValue
+// instead of allocating and filling a new tensor on every call; this is safe
+// because kernels never write to their inputs, and an evicted value stays
+// alive for as long as an op still references it.
+class ORTConstantCache {
+ public:
+  // Larger constants are not worth hashing and are never cached
+  static constexpr size_t kMaxElements = 16;
+  static constexpr size_t kDefaultCapacity = 1024;
+
+  explicit ORTConstantCache(size_t capacity = kDefaultCapacity)
+    : capacity_(capacity) {}
+
+  template<typename T>
+  static std::string MakeKey(
+    onnxruntime::MLDataType element_type,
+    const std::vector<int64_t>& shape,
+    const std::vector<T>& values) {
+    std::string key;
+    key.reserve(
+      sizeof(element_type) +
+      (shape.size() + 1) * sizeof(int64_t) +
+      values.size() * sizeof(T));
+    key.append(reinterpret_cast<const char*>(&element_type), sizeof(element_type));
+    int64_t rank = shape.size();
+    key.append(reinterpret_cast<const char*>(&rank), sizeof(rank));
+    key.append(
+      reinterpret_cast<const char*>(shape.data()),
+      shape.size() * sizeof(int64_t));
+    for (T value : values) {
+      key.append(reinterpret_cast<const char*>(&value), sizeof(T));
+    }
+    return key;
+  }
+
+  // Returns the cached value for key, calling create to fill the entry on a
+  // miss; the least recently used entry is evicted if the cache is full.
+  OrtValue GetOrCreate(
+    const std::string& key,
+    const std::function<OrtValue()>& create);
+
+  size_t GetSize() const;
+
+  void Clear();
+
+ private:
+  using Entry = std::pair<std::string, OrtValue>;
+
+  size_t capacity_;
+  mutable std::mutex mutex_;
+  // Most recently used first
+  std::list<Entry> entries_;
+  std::unordered_map<std::string, std::list<Entry>::iterator> index_;
+};
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,245 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include "ort_distributed.h"
+#include "ort_aten.h"
+#include "ort_log.h"
+
+namespace torch_ort {
+namespace eager {
+
+namespace {
+
+  // Returns a CPU tensor aliasing the buffer of an ORT tensor, after its
+  // pending work completes, or the tensor itself if it is not an ORT tensor.
+  at::Tensor host_alias(const at::Tensor& tensor) {
+    if (tensor.device().type() != at::DeviceType::ORT)
+      return tensor;
+    return aten_cpu_tensor_from_ort(tensor);
+  }
+
+  std::vector<at::Tensor> host_aliases(const std::vector<at::Tensor>& tensors) {
+    std::vector<at::Tensor> aliases;
+    aliases.reserve(tensors.size());
+    for (const auto& tensor : tensors)
+      aliases.push_back(host_alias(tensor));
+    return aliases;
+  }
+
+  std::vector<std::vector<at::Tensor>> host_aliases(
+    const std::vector<std::vector<at::Tensor>>& tensor_lists) {
+    std::vector<std::vector<at::Tensor>> aliases;
+    aliases.reserve(tensor_lists.size());
+    for (const auto& tensors : tensor_lists)
+      aliases.push_back(host_aliases(tensors));
+    return aliases;
+  }
+
+  std::vector<at::Tensor> flatten(
+    const std::vector<std::vector<at::Tensor>>& tensor_lists) {
+    std::vector<at::Tensor> tensors;
+    for (const auto& list : tensor_lists)
+      tensors.insert(tensors.end(), list.begin(), list.end());
+    return tensors;
+  }
+
+} // namespace
+
+#pragma region ProcessGroupORT::WorkORT
+
+ProcessGroupORT::WorkORT::WorkORT(
+  std::shared_ptr<c10d::ProcessGroup::Work> work,
+  std::vector<at::Tensor> outputs) :
+  c10d::ProcessGroup::Work(-1, work->retrieveOpType()),
+  work_(std::move(work)),
+  outputs_(std::move(outputs)) {}
+
+bool ProcessGroupORT::WorkORT::isCompleted() {
+  return work_->isCompleted();
+}
+
+bool ProcessGroupORT::WorkORT::isSuccess() const {
+  return work_->isSuccess();
+}
+
+std::exception_ptr ProcessGroupORT::WorkORT::exception() const {
+  return work_->exception();
+}
+
+int ProcessGroupORT::WorkORT::sourceRank() const {
+  return work_->sourceRank();
+}
+
+std::vector<at::Tensor> ProcessGroupORT::WorkORT::result() {
+  return outputs_;
+}
+
+void ProcessGroupORT::WorkORT::synchronize() {
+  work_->synchronize();
+}
+
+bool ProcessGroupORT::WorkORT::wait(std::chrono::milliseconds timeout) {
+  return work_->wait(timeout);
+}
+
+void ProcessGroupORT::WorkORT::abort() {
+  work_->abort();
+}
+
+#pragma endregion
+
+#pragma region ProcessGroupORT
+
+ProcessGroupORT::ProcessGroupORT(std::shared_ptr<c10d::ProcessGroup> wrapped) :
+  c10d::ProcessGroup(wrapped->getRank(), wrapped->getSize()),
+  wrapped_(std::move(wrapped)) {
+  ORT_LOG_DEBUG << "ProcessGroupORT rank " << rank_ << " of " << size_;
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::broadcast(
+  std::vector<at::Tensor>& data,
+  const c10d::BroadcastOptions& opts) {
+  auto aliases = host_aliases(data);
+  return std::make_shared<WorkORT>(wrapped_->broadcast(aliases, opts), data);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::allreduce(
+  std::vector<at::Tensor>& data,
+  const c10d::AllreduceOptions& opts) {
+  auto aliases = host_aliases(data);
+  return std::make_shared<WorkORT>(wrapped_->allreduce(aliases, opts), data);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::allreduce_coalesced(
+  std::vector<at::Tensor>& tensors,
+  const c10d::AllreduceCoalescedOptions& opts) {
+  auto aliases = host_aliases(tensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->allreduce_coalesced(aliases, opts), tensors);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::reduce(
+  std::vector<at::Tensor>& tensors,
+  const c10d::ReduceOptions& opts) {
+  auto aliases = host_aliases(tensors);
+  return std::make_shared<WorkORT>(wrapped_->reduce(aliases, opts), tensors);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::allgather(
+  std::vector<std::vector<at::Tensor>>& outputTensors,
+  std::vector<at::Tensor>& inputTensors,
+  const c10d::AllgatherOptions& opts) {
+  auto output_aliases = host_aliases(outputTensors);
+  auto input_aliases = host_aliases(inputTensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->allgather(output_aliases, input_aliases, opts),
+    flatten(outputTensors));
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::allgather_base(
+  at::Tensor& outputBuffer,
+  at::Tensor& inputBuffer,
+  const c10d::AllgatherOptions& opts) {
+  auto output_alias = host_alias(outputBuffer);
+  auto input_alias = host_alias(inputBuffer);
+  return std::make_shared<WorkORT>(
+    wrapped_->allgather_base(output_alias, input_alias, opts),
+    std::vector<at::Tensor>{outputBuffer});
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::gather(
+  std::vector<std::vector<at::Tensor>>& outputTensors,
+  std::vector<at::Tensor>& inputTensors,
+  const c10d::GatherOptions& opts) {
+  auto output_aliases = host_aliases(outputTensors);
+  auto input_aliases = host_aliases(inputTensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->gather(output_aliases, input_aliases, opts),
+    flatten(outputTensors));
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::scatter(
+  std::vector<at::Tensor>& outputTensors,
+  std::vector<std::vector<at::Tensor>>& inputTensors,
+  const c10d::ScatterOptions& opts) {
+  auto output_aliases = host_aliases(outputTensors);
+  auto input_aliases = host_aliases(inputTensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->scatter(output_aliases, input_aliases, opts),
+    outputTensors);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::reduce_scatter(
+  std::vector<at::Tensor>& outputTensors,
+  std::vector<std::vector<at::Tensor>>& inputTensors,
+  const c10d::ReduceScatterOptions& opts) {
+  auto output_aliases = host_aliases(outputTensors);
+  auto input_aliases = host_aliases(inputTensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->reduce_scatter(output_aliases, input_aliases, opts),
+    outputTensors);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::alltoall_base(
+  at::Tensor& outputTensor,
+  at::Tensor& inputTensor,
+  std::vector<int64_t>& outputSplitSizes,
+  std::vector<int64_t>& inputSplitSizes,
+  const c10d::AllToAllOptions& opts) {
+  auto output_alias = host_alias(outputTensor);
+  auto input_alias = host_alias(inputTensor);
+  return std::make_shared<WorkORT>(
+    wrapped_->alltoall_base(
+      output_alias, input_alias, outputSplitSizes, inputSplitSizes, opts),
+    std::vector<at::Tensor>{outputTensor});
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::alltoall(
+  std::vector<at::Tensor>& outputTensors,
+  std::vector<at::Tensor>& inputTensors,
+  const c10d::AllToAllOptions& opts) {
+  auto output_aliases = host_aliases(outputTensors);
+  auto input_aliases = host_aliases(inputTensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->alltoall(output_aliases, input_aliases, opts),
+    outputTensors);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::send(
+  std::vector<at::Tensor>& tensors,
+  int dstRank,
+  int tag) {
+  auto aliases = host_aliases(tensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->send(aliases, dstRank, tag),
+    std::vector<at::Tensor>{});
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::recv(
+  std::vector<at::Tensor>& tensors,
+  int srcRank,
+  int tag) {
+  auto aliases = host_aliases(tensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->recv(aliases, srcRank, tag), tensors);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::recvAnysource(
+  std::vector<at::Tensor>& tensors,
+  int tag) {
+  auto aliases = host_aliases(tensors);
+  return std::make_shared<WorkORT>(
+    wrapped_->recvAnysource(aliases, tag), tensors);
+}
+
+std::shared_ptr<c10d::ProcessGroup::Work> ProcessGroupORT::barrier(
+  const c10d::BarrierOptions& opts) {
+  return std::make_shared<WorkORT>(
+    wrapped_->barrier(opts),
+    std::vector<at::Tensor>{});
+}
+
+#pragma endregion
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,131 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <memory>
+#include <vector>
+
+#include <torch/extension.h>
+#include <c10d/ProcessGroup.hpp>
+
+namespace torch_ort {
+namespace eager {
+
+// A process group that runs the collectives of a wrapped CPU process group,
+// normally gloo, on ORT tensors. ORT tensors live in host memory, so each
+// one is handed to the wrapped group as a CPU tensor aliasing its buffer,
+// which the collective reads and writes in place: no gradient is copied
+// on the way in or out. CPU tensors are passed through unchanged.
+//
+// DistributedDataParallel's reducer allreduces one flat bucket tensor per
+// bucket, so its bucketing carries over as is: each bucket is a single
+// collective on a single aliased buffer.
+class ProcessGroupORT : public c10d::ProcessGroup {
+ public:
+  // Completes when the wrapped work does; its result is the ORT tensors
+  // the collective wrote rather than their CPU aliases.
+  class WorkORT : public c10d::ProcessGroup::Work {
+   public:
+    WorkORT(
+      std::shared_ptr<c10d::ProcessGroup::Work> work,
+      std::vector<at::Tensor> outputs);
+
+    bool isCompleted() override;
+    bool isSuccess() const override;
+    std::exception_ptr exception() const override;
+    int sourceRank() const override;
+    std::vector<at::Tensor> result() override;
+    void synchronize() override;
+    bool wait(std::chrono::milliseconds timeout = c10d::kNoTimeout) override;
+    void abort() override;
+
+   private:
+    std::shared_ptr<c10d::ProcessGroup::Work> work_;
+    std::vector<at::Tensor> outputs_;
+  };
+
+  explicit ProcessGroupORT(std::shared_ptr<c10d::ProcessGroup> wrapped);
+
+  const std::shared_ptr<c10d::ProcessGroup>& wrapped() const {
+    return wrapped_;
+  }
+
+  std::shared_ptr<c10d::ProcessGroup::Work> broadcast(
+    std::vector<at::Tensor>& data,
+    const c10d::BroadcastOptions& opts = c10d::BroadcastOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> allreduce(
+    std::vector<at::Tensor>& data,
+    const c10d::AllreduceOptions& opts = c10d::AllreduceOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> allreduce_coalesced(
+    std::vector<at::Tensor>& tensors,
+    const c10d::AllreduceCoalescedOptions& opts =
+      c10d::AllreduceCoalescedOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> reduce(
+    std::vector<at::Tensor>& tensors,
+    const c10d::ReduceOptions& opts = c10d::ReduceOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> allgather(
+    std::vector<std::vector<at::Tensor>>& outputTensors,
+    std::vector<at::Tensor>& inputTensors,
+    const c10d::AllgatherOptions& opts = c10d::AllgatherOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> allgather_base(
+    at::Tensor& outputBuffer,
+    at::Tensor& inputBuffer,
+    const c10d::AllgatherOptions& opts = c10d::AllgatherOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> gather(
+    std::vector<std::vector<at::Tensor>>& outputTensors,
+    std::vector<at::Tensor>& inputTensors,
+    const c10d::GatherOptions& opts = c10d::GatherOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> scatter(
+    std::vector<at::Tensor>& outputTensors,
+    std::vector<std::vector<at::Tensor>>& inputTensors,
+    const c10d::ScatterOptions& opts = c10d::ScatterOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> reduce_scatter(
+    std::vector<at::Tensor>& outputTensors,
+    std::vector<std::vector<at::Tensor>>& inputTensors,
+    const c10d::ReduceScatterOptions& opts =
+      c10d::ReduceScatterOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> alltoall_base(
+    at::Tensor& outputTensor,
+    at::Tensor& inputTensor,
+    std::vector<int64_t>& outputSplitSizes,
+    std::vector<int64_t>& inputSplitSizes,
+    const c10d::AllToAllOptions& opts = c10d::AllToAllOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> alltoall(
+    std::vector<at::Tensor>& outputTensors,
+    std::vector<at::Tensor>& inputTensors,
+    const c10d::AllToAllOptions& opts = c10d::AllToAllOptions()) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> send(
+    std::vector<at::Tensor>& tensors,
+    int dstRank,
+    int tag) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> recv(
+    std::vector<at::Tensor>& tensors,
+    int srcRank,
+    int tag) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> recvAnysource(
+    std::vector<at::Tensor>& tensors,
+    int tag) override;
+
+  std::shared_ptr<c10d::ProcessGroup::Work> barrier(
+    const c10d::BarrierOptions& opts = c10d::BarrierOptions()) override;
+
+ private:
+  std::shared_ptr<c10d::ProcessGroup> wrapped_;
+};
+
+} // namespace eager
+} // namespace torch_ort
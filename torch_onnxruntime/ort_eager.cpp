@@ -1,10 +1,16 @@
 // Copyright (c) Microsoft Corporation. All rights reserved.
 // Licensed under the MIT License.
 
+#include <fstream>
+
 #include <torch/extension.h>
 
 #include "ort_backends.h"
+#include "ort_aten.h"
+#include "ort_distributed.h"
+#include "ort_ops.h"
 #include "ort_log.h"
+#include "ort_profiler.h"
 
 namespace torch_ort {
 namespace eager {
@@ -22,6 +28,289 @@ PYBIND11_MODULE(torch_ort, torch_ort_module) {
       },
       py::arg("device_index") = -1);
   }
+
+  torch_ort_module.def(
+    "from_cpu",
+    [](const at::Tensor& tensor, int device_index) {
+      return aten_ort_tensor_from_cpu(
+        tensor,
+        at::Device(at::DeviceType::ORT, device_index));
+    },
+    py::arg("tensor"),
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "to_cpu",
+    [](const at::Tensor& tensor) {
+      return aten_cpu_tensor_from_ort(tensor);
+    },
+    py::arg("tensor"));
+
+  torch_ort_module.def(
+    "set_lazy_mode",
+    [](bool enabled, int device_index) {
+      GetORTBackendsManager().SetLazyModeEnabled(
+        at::Device(at::DeviceType::ORT, device_index),
+        enabled);
+    },
+    py::arg("enabled"),
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "is_lazy_mode_enabled",
+    [](int device_index) {
+      auto& invoker = GetORTInvoker(
+        at::Device(at::DeviceType::ORT, device_index));
+      return GetORTBackendsManager().GetLazyGraph(invoker) != nullptr;
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "set_async_mode",
+    [](bool enabled, int device_index) {
+      GetORTBackendsManager().SetAsyncModeEnabled(
+        at::Device(at::DeviceType::ORT, device_index),
+        enabled);
+    },
+    py::arg("enabled"),
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "is_async_mode_enabled",
+    [](int device_index) {
+      auto& invoker = GetORTInvoker(
+        at::Device(at::DeviceType::ORT, device_index));
+      return GetORTBackendsManager().GetAsyncQueue(invoker) != nullptr;
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "set_kernel_cache_enabled",
+    [](bool enabled, int device_index) {
+      GetORTBackendsManager().SetKernelCacheEnabled(
+        at::Device(at::DeviceType::ORT, device_index),
+        enabled);
+    },
+    py::arg("enabled"),
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "is_kernel_cache_enabled",
+    [](int device_index) {
+      auto& invoker = GetORTInvoker(
+        at::Device(at::DeviceType::ORT, device_index));
+      return GetORTBackendsManager().IsKernelCacheEnabled(invoker);
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "set_device_config",
+    [](
+      int device_index,
+      int intra_op_num_threads,
+      int inter_op_num_threads,
+      bool allow_spinning,
+      bool auto_set_affinity,
+      bool use_arena) {
+      ORTDeviceConfig config;
+      config.intra_op_num_threads = intra_op_num_threads;
+      config.inter_op_num_threads = inter_op_num_threads;
+      config.allow_spinning = allow_spinning;
+      config.auto_set_affinity = auto_set_affinity;
+      config.use_arena = use_arena;
+      GetORTBackendsManager().SetDeviceConfig(
+        at::Device(at::DeviceType::ORT, device_index),
+        config);
+    },
+    py::arg("device_index") = 0,
+    py::arg("intra_op_num_threads") = 0,
+    py::arg("inter_op_num_threads") = 0,
+    py::arg("allow_spinning") = true,
+    py::arg("auto_set_affinity") = false,
+    py::arg("use_arena") = false);
+
+  torch_ort_module.def(
+    "get_device_config",
+    [](int device_index) {
+      const auto& config = GetORTBackendsManager().GetDeviceConfig(
+        at::Device(at::DeviceType::ORT, device_index));
+      py::dict result;
+      result["intra_op_num_threads"] = config.intra_op_num_threads;
+      result["inter_op_num_threads"] = config.inter_op_num_threads;
+      result["allow_spinning"] = config.allow_spinning;
+      result["auto_set_affinity"] = config.auto_set_affinity;
+      result["use_arena"] = config.use_arena;
+      return result;
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "synchronize",
+    [](int device_index) {
+      synchronize(GetORTInvoker(
+        at::Device(at::DeviceType::ORT, device_index)));
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "in_place_stats",
+    []() {
+      py::dict stats;
+      for (const auto& entry : get_in_place_stats()) {
+        py::dict op_stats;
+        op_stats["in_place"] = entry.second.first;
+        op_stats["copy"] = entry.second.second;
+        stats[entry.first.c_str()] = op_stats;
+      }
+      return stats;
+    });
+
+  torch_ort_module.def("reset_in_place_stats", &reset_in_place_stats);
+
+  torch_ort_module.def(
+    "memory_stats",
+    [](int device_index) {
+      auto stats = GetORTBackendsManager().GetCachingAllocator(
+        at::Device(at::DeviceType::ORT, device_index)).GetStats();
+      py::dict result;
+      result["allocated_bytes"] = stats.allocated_bytes;
+      result["max_allocated_bytes"] = stats.max_allocated_bytes;
+      result["reserved_bytes"] = stats.reserved_bytes;
+      result["max_reserved_bytes"] = stats.max_reserved_bytes;
+      result["num_allocs"] = stats.num_allocs;
+      result["num_cache_hits"] = stats.num_cache_hits;
+      result["num_device_allocs"] = stats.num_device_allocs;
+      result["num_device_frees"] = stats.num_device_frees;
+      return result;
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "memory_allocated",
+    [](int device_index) {
+      return GetORTBackendsManager().GetCachingAllocator(
+        at::Device(at::DeviceType::ORT, device_index)).GetStats().allocated_bytes;
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "max_memory_allocated",
+    [](int device_index) {
+      return GetORTBackendsManager().GetCachingAllocator(
+        at::Device(at::DeviceType::ORT, device_index)).GetStats().max_allocated_bytes;
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "reset_peak_memory_stats",
+    [](int device_index) {
+      GetORTBackendsManager().GetCachingAllocator(
+        at::Device(at::DeviceType::ORT, device_index)).ResetPeakStats();
+    },
+    py::arg("device_index") = 0);
+
+  torch_ort_module.def(
+    "empty_cache",
+    []() {
+      GetORTBackendsManager().EmptyCache();
+    });
+
+  torch_ort_module.def(
+    "set_log_level",
+    [](int level) {
+      SetORTLogLevel((ORTLogLevel)level);
+    },
+    py::arg("level"));
+
+  torch_ort_module.def(
+    "get_log_level",
+    []() {
+      return (int)GetORTLogLevel();
+    });
+
+  auto profiler_module = torch_ort_module.def_submodule("profiler");
+
+  profiler_module.def(
+    "set_enabled",
+    [](bool enabled) {
+      GetORTProfiler().SetEnabled(enabled);
+    },
+    py::arg("enabled"));
+
+  profiler_module.def(
+    "is_enabled",
+    []() {
+      return GetORTProfiler().IsEnabled();
+    });
+
+  profiler_module.def(
+    "reset",
+    []() {
+      GetORTProfiler().Reset();
+    });
+
+  profiler_module.def(
+    "stats",
+    []() {
+      py::list result;
+      for (const auto& entry : GetORTProfiler().GetStats()) {
+        py::dict row;
+        row["name"] = entry.first.second;
+        row["kind"] = ORTProfileEventKindName(entry.first.first);
+        row["count"] = entry.second.count;
+        row["total_us"] = entry.second.total_ns / 1e3;
+        row["max_us"] = entry.second.max_ns / 1e3;
+        row["bytes"] = entry.second.bytes;
+        result.append(row);
+      }
+      return result;
+    });
+
+  profiler_module.def(
+    "table",
+    [](size_t max_rows) {
+      return GetORTProfiler().GetTable(max_rows);
+    },
+    py::arg("max_rows") = 0);
+
+  profiler_module.def(
+    "export_chrome_trace",
+    [](const std::string& path) {
+      std::ofstream out(path);
+      TORCH_CHECK(out, "ORT profiler: cannot open ", path);
+      out << GetORTProfiler().GetChromeTrace();
+    },
+    py::arg("path"));
+
+  // The ORT process group needs c10d's Python bindings for its base class
+  auto torch_distributed = py::module::import("torch.distributed");
+  if (!torch_distributed.attr("is_available")().cast<bool>())
+    return;
+
+  auto distributed_module = torch_ort_module.def_submodule("distributed");
+
+  py::class_<
+    ProcessGroupORT,
+    c10d::ProcessGroup,
+    std::shared_ptr<ProcessGroupORT>>(distributed_module, "ProcessGroupORT")
+    .def_property_readonly("wrapped", &ProcessGroupORT::wrapped);
+
+  distributed_module.def(
+    "create_process_group",
+    [](py::object store, int rank, int size, py::object timeout) {
+      auto wrapped = py::module::import("torch.distributed")
+        .attr("ProcessGroupGloo")(store, rank, size, py::arg("timeout") = timeout);
+      return std::make_shared<ProcessGroupORT>(
+        wrapped.cast<std::shared_ptr<c10d::ProcessGroup>>());
+    },
+    py::arg("store"),
+    py::arg("rank"),
+    py::arg("size"),
+    py::arg("timeout"));
+
+  // dist.init_process_group("ort") creates an ORT process group over gloo
+  torch_distributed.attr("Backend").attr("register_backend")(
+    "ort", distributed_module.attr("create_process_group"));
 }
 
 } // namespace eager
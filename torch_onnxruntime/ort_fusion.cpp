@@ -0,0 +1,82 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include "ort_fusion.h"
+#include "ort_lazy.h"
+
+namespace torch_ort {
+namespace eager {
+
+namespace {
+  std::string get_value_name(int value, size_t num_nodes) {
+    if (value >= 0)
+      return ORTKernelCache::GetInputName(value);
+    // The last node produces the output of the graph
+    auto node = -value - 1;
+    return static_cast<size_t>(node) + 1 == num_nodes
+      ? ORTKernelCache::GetOutputName(0)
+      : "value_" + std::to_string(node);
+  }
+}
+
+ORTFusedGraph::ORTFusedGraph(std::vector<Node> nodes)
+  : nodes_(std::move(nodes)) {
+  ORT_ENFORCE(!nodes_.empty(), "A fused graph must have at least one node");
+  for (size_t i = 0; i < nodes_.size(); i++) {
+    for (auto input : nodes_[i].inputs) {
+      ORT_ENFORCE(
+        input >= NodeOutput(static_cast<int>(i) - 1),
+        "Node ", i, " of a fused graph reads a value produced after it");
+    }
+    kernels_.emplace_back(nodes_[i].op_name);
+    name_ += (i ? "+" : "") + nodes_[i].op_name;
+  }
+}
+
+onnx::ModelProto ORTFusedGraph::CreateModel(
+  const std::vector<OrtValue>& inputs) const {
+  onnx::ModelProto model;
+  model.set_ir_version(onnx::IR_VERSION);
+  auto* opset = model.add_opset_import();
+  opset->set_domain(onnxruntime::kOnnxDomain);
+  opset->set_version(get_domain_version(onnxruntime::kOnnxDomain));
+
+  auto* graph = model.mutable_graph();
+  graph->set_name("ort_fused_" + name_);
+
+  std::vector<int32_t> element_types;
+  for (size_t i = 0; i < inputs.size(); i++) {
+    element_types.push_back(
+      inputs[i].Get<onnxruntime::Tensor>().GetElementType());
+    auto* input = graph->add_input();
+    input->set_name(get_value_name(i, nodes_.size()));
+    input->mutable_type()->mutable_tensor_type()->set_elem_type(
+      element_types[i]);
+  }
+
+  // Elementwise ops produce the element type of their first input
+  std::vector<int32_t> node_element_types;
+  for (size_t i = 0; i < nodes_.size(); i++) {
+    auto* node = graph->add_node();
+    node->set_name("node_" + std::to_string(i));
+    node->set_op_type(nodes_[i].op_name);
+    for (auto input : nodes_[i].inputs) {
+      node->add_input(get_value_name(input, nodes_.size()));
+    }
+    node->add_output(get_value_name(NodeOutput(i), nodes_.size()));
+
+    auto first_input = nodes_[i].inputs.at(0);
+    node_element_types.push_back(first_input >= 0
+      ? element_types.at(first_input)
+      : node_element_types[-first_input - 1]);
+  }
+
+  auto* output = graph->add_output();
+  output->set_name(ORTKernelCache::GetOutputName(0));
+  output->mutable_type()->mutable_tensor_type()->set_elem_type(
+    node_element_types.back());
+  return model;
+}
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,59 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <core/framework/ml_value.h>
+#include <core/graph/onnx_protobuf.h>
+
+#include "ort_kernels.h"
+
+namespace torch_ort {
+namespace eager {
+
+// A chain of elementwise ONNX nodes implementing one ATen op, e.g.
+// Add(self, Mul(alpha, other)) for aten::add. Generated ops define their
+// graph as a function-local static and run it with invoke_fused, so the
+// values passed between its nodes are never handed back to Torch.
+class ORTFusedGraph {
+ public:
+  struct Node {
+    std::string op_name;
+    // Each input is the index of a fused graph input, or the output of an
+    // earlier node as encoded by NodeOutput
+    std::vector<int> inputs;
+  };
+
+  static constexpr int NodeOutput(int node) {
+    return -node - 1;
+  }
+
+  explicit ORTFusedGraph(std::vector<Node> nodes);
+
+  const std::vector<Node>& GetNodes() const {
+    return nodes_;
+  }
+
+  // The handle of the kernel of a node, for running the nodes one at a time
+  const ORTKernel& GetKernel(size_t node) const {
+    return kernels_[node];
+  }
+
+  // The op types of the nodes joined by '+', e.g. "Mul+Add"
+  const std::string& GetName() const {
+    return name_;
+  }
+
+  // Builds a model of the graph for inputs of the element types of the
+  // given values. Shapes are left symbolic, so the session compiled from it
+  // serves inputs of any shape.
+  onnx::ModelProto CreateModel(const std::vector<OrtValue>& inputs) const;
+
+ private:
+  std::vector<Node> nodes_;
+  std::vector<ORTKernel> kernels_;
+  std::string name_;
+};
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,246 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include <algorithm>
+
+#include "ort_kernels.h"
+#include "ort_fusion.h"
+#include "ort_lazy.h"
+#include "ort_log.h"
+
+namespace torch_ort {
+namespace eager {
+
+namespace {
+  // Appends the element type of every input to a cache key
+  void append_element_types(
+    const std::vector<OrtValue>& inputs,
+    std::string& key) {
+    for (const auto& input : inputs) {
+      auto element_type = input.Get<onnxruntime::Tensor>().GetElementType();
+      key.append(
+        reinterpret_cast<const char*>(&element_type),
+        sizeof(element_type));
+    }
+  }
+
+  void append_bytes(const void* data, size_t size, std::string& key) {
+    key.append(reinterpret_cast<const char*>(&size), sizeof(size));
+    key.append(reinterpret_cast<const char*>(data), size);
+  }
+
+  // Appends the attributes to a cache key in name order, as NodeAttributes
+  // is unordered. Scalars and lists are appended as raw bytes; only the
+  // attribute types generated ops do not pass are serialized.
+  void append_attributes(
+    const onnxruntime::NodeAttributes* attributes,
+    std::string& key) {
+    if (!attributes)
+      return;
+
+    std::vector<const onnxruntime::NodeAttributes::value_type*> sorted;
+    for (const auto& attribute : *attributes) {
+      sorted.push_back(&attribute);
+    }
+    std::sort(sorted.begin(), sorted.end(), [](auto a, auto b) {
+      return a->first < b->first;
+    });
+    for (const auto* attribute : sorted) {
+      const auto& value = attribute->second;
+      key.append(attribute->first);
+      key.push_back('\0');
+      key.push_back(static_cast<char>(value.type()));
+      switch (value.type()) {
+        case onnx::AttributeProto::FLOAT: {
+          auto f = value.f();
+          append_bytes(&f, sizeof(f), key);
+          break;
+        }
+        case onnx::AttributeProto::INT: {
+          auto i = value.i();
+          append_bytes(&i, sizeof(i), key);
+          break;
+        }
+        case onnx::AttributeProto::STRING:
+          append_bytes(value.s().data(), value.s().size(), key);
+          break;
+        case onnx::AttributeProto::FLOATS:
+          append_bytes(
+            value.floats().data(),
+            value.floats_size() * sizeof(float),
+            key);
+          break;
+        case onnx::AttributeProto::INTS:
+          append_bytes(
+            value.ints().data(),
+            value.ints_size() * sizeof(int64_t),
+            key);
+          break;
+        default: {
+          auto serialized = value.SerializeAsString();
+          append_bytes(serialized.data(), serialized.size(), key);
+          break;
+        }
+      }
+    }
+  }
+
+  std::vector<std::string> create_names(
+    size_t count,
+    std::string (*get_name)(size_t)) {
+    std::vector<std::string> names;
+    names.reserve(count);
+    for (size_t i = 0; i < count; i++) {
+      names.push_back(get_name(i));
+    }
+    return names;
+  }
+
+  const onnxruntime::RunOptions& get_run_options() {
+    static const onnxruntime::RunOptions run_options;
+    return run_options;
+  }
+}
+
+onnx::ModelProto ORTKernel::CreateModel(
+  const std::vector<OrtValue>& inputs,
+  size_t num_outputs,
+  const onnxruntime::NodeAttributes* attributes) const {
+  onnx::ModelProto model;
+  model.set_ir_version(onnx::IR_VERSION);
+  auto* opset = model.add_opset_import();
+  opset->set_domain(domain_);
+  opset->set_version(get_domain_version(domain_));
+
+  auto* graph = model.mutable_graph();
+  graph->set_name("ort_kernel_" + op_name_);
+
+  auto* node = graph->add_node();
+  node->set_name(op_name_);
+  node->set_op_type(op_name_);
+  node->set_domain(domain_);
+  if (attributes) {
+    for (const auto& attribute : *attributes) {
+      *node->add_attribute() = attribute.second;
+    }
+  }
+
+  for (size_t i = 0; i < inputs.size(); i++) {
+    auto* input = graph->add_input();
+    input->set_name(ORTKernelCache::GetInputName(i));
+    input->mutable_type()->mutable_tensor_type()->set_elem_type(
+      inputs[i].Get<onnxruntime::Tensor>().GetElementType());
+    node->add_input(input->name());
+  }
+
+  // Output types are inferred when the session resolves the graph
+  for (size_t i = 0; i < num_outputs; i++) {
+    auto* output = graph->add_output();
+    output->set_name(ORTKernelCache::GetOutputName(i));
+    node->add_output(output->name());
+  }
+  return model;
+}
+
+onnxruntime::common::Status ORTKernelCache::Run(
+  const ORTKernel& kernel,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs,
+  const onnxruntime::NodeAttributes* attributes) {
+  std::string signature;
+  append_element_types(inputs, signature);
+  signature.push_back(static_cast<char>(outputs.size()));
+  append_attributes(attributes, signature);
+
+  auto cached = GetOrCreateSession(
+    {&kernel, std::move(signature)},
+    inputs.size(),
+    outputs.size(),
+    [&]() {
+      return kernel.CreateModel(inputs, outputs.size(), attributes);
+    });
+  return cached->session->Run(
+    get_run_options(),
+    cached->feed_names,
+    inputs,
+    cached->fetch_names,
+    &outputs);
+}
+
+onnxruntime::common::Status ORTKernelCache::Run(
+  const ORTFusedGraph& graph,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs) {
+  ORT_ENFORCE(outputs.size() == 1, "A fused graph has a single output");
+
+  std::string signature;
+  append_element_types(inputs, signature);
+
+  auto cached = GetOrCreateSession(
+    {&graph, std::move(signature)},
+    inputs.size(),
+    outputs.size(),
+    [&]() {
+      return graph.CreateModel(inputs);
+    });
+  return cached->session->Run(
+    get_run_options(),
+    cached->feed_names,
+    inputs,
+    cached->fetch_names,
+    &outputs);
+}
+
+size_t ORTKernelCache::GetCachedSessionCount() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return sessions_.size();
+}
+
+std::string ORTKernelCache::GetInputName(size_t index) {
+  return "input_" + std::to_string(index);
+}
+
+std::string ORTKernelCache::GetOutputName(size_t index) {
+  return "output_" + std::to_string(index);
+}
+
+std::shared_ptr<const ORTKernelCache::CachedSession>
+ORTKernelCache::GetOrCreateSession(
+  Key key,
+  size_t num_inputs,
+  size_t num_outputs,
+  const std::function<onnx::ModelProto()>& create_model) {
+  // A session is safe to run concurrently once created
+  std::lock_guard<std::mutex> lock(mutex_);
+  auto lookup = sessions_.find(key);
+  if (lookup != sessions_.end()) {
+    lru_.splice(lru_.begin(), lru_, lookup->second->lru_position);
+    return lookup->second;
+  }
+
+  auto model = create_model();
+  ORT_LOG_DEBUG << "Compiling kernel session: " << model.graph().name();
+
+  auto cached = std::make_shared<CachedSession>();
+  cached->session = create_inference_session(
+    environment_,
+    config_,
+    allocator_,
+    model);
+  cached->feed_names = create_names(num_inputs, &GetInputName);
+  cached->fetch_names = create_names(num_outputs, &GetOutputName);
+
+  if (sessions_.size() >= kMaxCachedSessions) {
+    auto evicted = sessions_.find(*lru_.back());
+    lru_.pop_back();
+    sessions_.erase(evicted);
+  }
+
+  auto inserted = sessions_.emplace(std::move(key), cached).first;
+  lru_.push_front(&inserted->first);
+  cached->lru_position = lru_.begin();
+  return cached;
+}
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,121 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <functional>
+#include <list>
+#include <map>
+#include <mutex>
+
+#include <core/framework/ml_value.h>
+#include <core/graph/basic_types.h>
+#include <core/graph/onnx_protobuf.h>
+#include <core/session/inference_session.h>
+
+#include "ort_allocator.h"
+#include "ort_config.h"
+
+namespace torch_ort {
+namespace eager {
+
+class ORTFusedGraph;
+
+// A handle to an ONNX kernel that is resolved once and then reused.
+// Generated ops keep one as a function-local static and invoke it instead of
+// looking the kernel up by name on every call, which rebuilds a single-node
+// model and kernel each time.
+class ORTKernel {
+ public:
+  explicit ORTKernel(
+    std::string op_name,
+    std::string domain = onnxruntime::kOnnxDomain)
+    : op_name_(std::move(op_name)),
+      domain_(std::move(domain)) {}
+
+  const std::string& GetOpName() const {
+    return op_name_;
+  }
+
+  const std::string& GetDomain() const {
+    return domain_;
+  }
+
+  // Builds a single-node model of the kernel for inputs of the element types
+  // of the given values. Shapes are left symbolic.
+  onnx::ModelProto CreateModel(
+    const std::vector<OrtValue>& inputs,
+    size_t num_outputs,
+    const onnxruntime::NodeAttributes* attributes) const;
+
+ private:
+  std::string op_name_;
+  std::string domain_;
+};
+
+// The sessions compiled for kernel handles and fused graphs on one device,
+// keyed by handle or graph, input element types and attribute values. A hit
+// costs one map lookup before the session runs with feed and fetch names
+// built when it was compiled. The least recently used session is evicted
+// once kMaxCachedSessions are cached.
+class ORTKernelCache {
+ public:
+  static constexpr size_t kMaxCachedSessions = 256;
+
+  ORTKernelCache(
+    onnxruntime::Environment& environment,
+    const ORTDeviceConfig& config,
+    std::shared_ptr<ORTCachingAllocator> allocator)
+    : environment_(environment),
+      config_(config),
+      allocator_(std::move(allocator)) {}
+
+  // Runs kernel; outputs that are already allocated are written in place.
+  onnxruntime::common::Status Run(
+    const ORTKernel& kernel,
+    const std::vector<OrtValue>& inputs,
+    std::vector<OrtValue>& outputs,
+    const onnxruntime::NodeAttributes* attributes);
+
+  // Runs graph as a single session. outputs holds the output of the last
+  // node, which is written in place if it is already allocated.
+  onnxruntime::common::Status Run(
+    const ORTFusedGraph& graph,
+    const std::vector<OrtValue>& inputs,
+    std::vector<OrtValue>& outputs);
+
+  size_t GetCachedSessionCount() const;
+
+  // Names of the inputs and outputs of the models run by the cache.
+  static std::string GetInputName(size_t index);
+  static std::string GetOutputName(size_t index);
+
+ private:
+  using Key = std::pair<const void*, std::string>;
+
+  struct CachedSession {
+    std::unique_ptr<onnxruntime::InferenceSession> session;
+    std::vector<std::string> feed_names;
+    std::vector<std::string> fetch_names;
+    std::list<const Key*>::iterator lru_position;
+  };
+
+  // Returns a shared reference, so that a session evicted by another thread
+  // stays alive until the caller's run completes.
+  std::shared_ptr<const CachedSession> GetOrCreateSession(
+    Key key,
+    size_t num_inputs,
+    size_t num_outputs,
+    const std::function<onnx::ModelProto()>& create_model);
+
+  onnxruntime::Environment& environment_;
+  const ORTDeviceConfig config_;
+  std::shared_ptr<ORTCachingAllocator> allocator_;
+  mutable std::mutex mutex_;
+  std::map<Key, std::shared_ptr<CachedSession>> sessions_;
+  // Keys of sessions_, most recently used first
+  std::list<const Key*> lru_;
+};
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,283 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include <algorithm>
+#include <unordered_set>
+
+#include <core/graph/onnx_protobuf.h>
+#include <onnx/defs/schema.h>
+
+#include "ort_lazy.h"
+#include "ort_backends.h"
+#include "ort_shape_inference.h"
+#include "ort_util.h"
+#include "ort_log.h"
+
+namespace torch_ort {
+namespace eager {
+
+int get_domain_version(const std::string& domain) {
+  const auto& versions =
+    onnx::OpSchemaRegistry::DomainToVersionRange::Instance().Map();
+  auto lookup = versions.find(domain);
+  ORT_ENFORCE(lookup != versions.end(), "Unknown ONNX domain: ", domain);
+  return lookup->second.second;
+}
+
+std::unique_ptr<onnxruntime::InferenceSession> create_inference_session(
+  onnxruntime::Environment& environment,
+  const ORTDeviceConfig& config,
+  const std::shared_ptr<ORTCachingAllocator>& allocator,
+  const onnx::ModelProto& model) {
+  onnxruntime::SessionOptions session_options;
+  session_options.graph_optimization_level =
+    onnxruntime::TransformerLevel::Level2;
+  // Sessions share the thread pools of the device's environment
+  session_options.use_per_session_threads = false;
+  if (config.inter_op_num_threads > 1) {
+    session_options.execution_mode = ExecutionMode::ORT_PARALLEL;
+  }
+
+  auto session = onnxruntime::make_unique<onnxruntime::InferenceSession>(
+    session_options,
+    environment);
+
+  // The eager invoker is always backed by the CPU execution provider; the
+  // session's provider allocates its outputs from the invoker's allocator
+  ORT_THROW_IF_ERROR(session->RegisterExecutionProvider(
+    onnxruntime::make_unique<ORTCPUExecutionProvider>(
+      onnxruntime::CPUExecutionProviderInfo(config.use_arena),
+      allocator)));
+
+  auto serialized_model = model.SerializeAsString();
+  ORT_THROW_IF_ERROR(session->Load(
+    serialized_model.data(),
+    static_cast<int>(serialized_model.size())));
+  ORT_THROW_IF_ERROR(session->Initialize());
+  return session;
+}
+
+bool ORTLazyGraph::TryRecord(
+  const std::string& op_name,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs,
+  const onnxruntime::NodeAttributes* attributes,
+  const std::string& domain) {
+  ORT_LOG_FN(op_name, domain);
+
+  onnx::NodeProto node;
+  node.set_name("node_" + std::to_string(graph_.node_size()));
+  node.set_op_type(op_name);
+  node.set_domain(domain);
+  if (attributes) {
+    for (const auto& attribute : *attributes) {
+      *node.add_attribute() = attribute.second;
+    }
+  }
+
+  // Resolve inputs to graph values; values not produced by this graph become
+  // new graph inputs, but are only registered once the node is accepted.
+  std::vector<std::pair<std::string, OrtValue>> new_inputs;
+  for (const auto& input : inputs) {
+    auto lookup = value_names_.find(&input.Get<onnxruntime::Tensor>());
+    if (lookup != value_names_.end()) {
+      node.add_input(lookup->second);
+    } else {
+      auto name = "input_" + std::to_string(graph_inputs_.size() + new_inputs.size());
+      new_inputs.emplace_back(name, input);
+      node.add_input(name);
+    }
+  }
+
+  for (size_t i = 0; i < outputs.size(); i++) {
+    node.add_output("value_" + std::to_string(pending_values_.size() + i));
+  }
+
+  // Placeholders of pending values have no buffer to read constants from
+  std::vector<ORTInferredOutput> inferred_outputs;
+  if (!InferNodeOutputs(
+    node,
+    inputs,
+    [](const onnxruntime::Tensor& tensor) {
+      return tensor.DataRaw() != nullptr;
+    },
+    inferred_outputs))
+    return false;
+
+  // The node is accepted: commit its inputs, outputs and placeholders
+  for (auto& input : new_inputs) {
+    value_names_[&input.second.Get<onnxruntime::Tensor>()] = input.first;
+    SetTypeFromTensor(
+      input.second.Get<onnxruntime::Tensor>(),
+      *graph_.add_input()->mutable_type());
+    graph_.mutable_input(graph_.input_size() - 1)->set_name(input.first);
+    graph_inputs_.push_back(std::move(input));
+  }
+
+  for (size_t i = 0; i < outputs.size(); i++) {
+    auto placeholder = std::make_shared<OrtValue>();
+    CreateMLValue(
+      nullptr,
+      inferred_outputs[i].element_type,
+      inferred_outputs[i].dims,
+      placeholder.get());
+
+    // Torch gets a value aliasing the placeholder tensor that owns a
+    // reference to the placeholder. The graph keeps its own reference, so
+    // the tensor's address is not reused while the graph names it.
+    auto* tensor = placeholder->GetMutable<onnxruntime::Tensor>();
+    std::function<void(void*)> release_placeholder =
+      [placeholder](void*) mutable {
+        placeholder.reset();
+      };
+    outputs[i].Init(
+      tensor,
+      onnxruntime::DataTypeImpl::GetType<onnxruntime::Tensor>(),
+      release_placeholder);
+
+    value_names_[tensor] = node.output(i);
+    pending_values_.emplace_back(node.output(i), std::move(placeholder));
+  }
+
+  opset_imports_[domain] = get_domain_version(domain);
+  *graph_.add_node() = std::move(node);
+  return true;
+}
+
+void ORTLazyGraph::Flush() {
+  if (!HasPendingNodes())
+    return;
+
+  ORT_LOG_FN(graph_.node_size());
+
+  onnx::ModelProto model;
+  model.set_ir_version(onnx::IR_VERSION);
+  for (const auto& opset_import : opset_imports_) {
+    auto* opset = model.add_opset_import();
+    opset->set_domain(opset_import.first);
+    opset->set_version(opset_import.second);
+  }
+
+  // Only the pending values Torch still references are graph outputs
+  auto* graph = model.mutable_graph();
+  graph->set_name("ort_lazy_graph");
+  *graph->mutable_input() = graph_.input();
+  std::unordered_set<std::string> live_values;
+  std::vector<onnxruntime::Tensor*> output_tensors;
+  for (const auto& pending : pending_values_) {
+    if (pending.second.use_count() == 1)
+      continue;
+    auto* output = graph->add_output();
+    output->set_name(pending.first);
+    SetTypeFromTensor(
+      pending.second->Get<onnxruntime::Tensor>(),
+      *output->mutable_type());
+    live_values.insert(pending.first);
+    output_tensors.push_back(
+      pending.second->GetMutable<onnxruntime::Tensor>());
+  }
+
+  if (output_tensors.empty()) {
+    Reset();
+    return;
+  }
+
+  // Drop the nodes no graph output depends on, walking back from the last
+  std::vector<bool> is_live(graph_.node_size());
+  for (int i = graph_.node_size() - 1; i >= 0; i--) {
+    const auto& node = graph_.node(i);
+    is_live[i] = std::any_of(
+      node.output().begin(),
+      node.output().end(),
+      [&](const std::string& output) { return live_values.count(output); });
+    if (is_live[i]) {
+      live_values.insert(node.input().begin(), node.input().end());
+    }
+  }
+  for (int i = 0; i < graph_.node_size(); i++) {
+    if (is_live[i]) {
+      *graph->add_node() = graph_.node(i);
+    }
+  }
+
+  std::vector<std::string> output_names;
+  for (const auto& output : graph->output()) {
+    output_names.push_back(output.name());
+  }
+
+  auto& session = GetOrCreateSession(model, model.SerializeAsString());
+
+  std::vector<std::string> feed_names;
+  std::vector<OrtValue> feeds;
+  for (const auto& input : graph_inputs_) {
+    feed_names.push_back(input.first);
+    feeds.push_back(input.second);
+  }
+
+  std::vector<OrtValue> fetches;
+  auto status = session.Run(
+    onnxruntime::RunOptions(),
+    feed_names,
+    feeds,
+    output_names,
+    &fetches);
+
+  if (!status.IsOK()) {
+    Reset();
+    throw std::runtime_error(
+      "ORT return failure status:" + status.ErrorMessage());
+  }
+
+  // Resolve placeholders in place so every alias observes the result
+  for (size_t i = 0; i < output_tensors.size(); i++) {
+    *output_tensors[i] =
+      std::move(*fetches[i].GetMutable<onnxruntime::Tensor>());
+  }
+
+  Reset();
+}
+
+void ORTLazyGraph::Reset() {
+  graph_.Clear();
+  opset_imports_.clear();
+  value_names_.clear();
+  graph_inputs_.clear();
+  pending_values_.clear();
+}
+
+onnxruntime::InferenceSession& ORTLazyGraph::GetOrCreateSession(
+  const onnx::ModelProto& model,
+  std::string key) {
+  auto lookup = sessions_.find(key);
+  if (lookup != sessions_.end()) {
+    lru_.splice(lru_.begin(), lru_, lookup->second.lru_position);
+    return *lookup->second.session;
+  }
+
+  ORT_LOG_DEBUG << "Compiling lazy graph session: "
+    << model.graph().node_size() << " nodes";
+
+  // Bound the cache so that a training loop with dynamic shapes cannot grow
+  // it without limit
+  if (sessions_.size() >= kMaxCachedSessions) {
+    auto evicted = sessions_.find(*lru_.back());
+    lru_.pop_back();
+    sessions_.erase(evicted);
+  }
+
+  auto session = create_inference_session(
+    environment_,
+    config_,
+    allocator_,
+    model);
+  auto& result = *session;
+  auto inserted = sessions_.emplace(
+    std::move(key),
+    CachedSession{std::move(session)}).first;
+  lru_.push_front(&inserted->first);
+  inserted->second.lru_position = lru_.begin();
+  return result;
+}
+
+} // namespace eager
+} // namespace torch_ort
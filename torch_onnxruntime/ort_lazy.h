@@ -0,0 +1,108 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <list>
+
+#include <core/framework/ml_value.h>
+#include <core/graph/onnx_protobuf.h>
+#include <core/eager/ort_kernel_invoker.h>
+#include <core/session/inference_session.h>
+
+#include "ort_allocator.h"
+#include "ort_config.h"
+
+namespace torch_ort {
+namespace eager {
+
+// Returns the latest opset version of an ONNX domain.
+int get_domain_version(const std::string& domain);
+
+// Loads and initializes a session for model on a CPU execution provider
+// allocating from the device's caching allocator, sharing the thread pools
+// of the device's environment.
+std::unique_ptr<onnxruntime::InferenceSession> create_inference_session(
+  onnxruntime::Environment& environment,
+  const ORTDeviceConfig& config,
+  const std::shared_ptr<ORTCachingAllocator>& allocator,
+  const onnx::ModelProto& model);
+
+// Records ONNX nodes into a pending graph instead of invoking kernels one at
+// a time. The graph is materialized (Flush) as a single InferenceSession only
+// when a value produced by it is observed on the host. Compiled sessions are
+// cached by the serialized graph, which covers the graph inputs' element
+// types and shapes, so steady-state loops reuse the same session; the least
+// recently used session is evicted once kMaxCachedSessions are cached.
+//
+// Values produced by a recorded node are placeholder OrtValues: tensors with
+// an inferred type and shape but no buffer. Flush moves the session outputs
+// into those placeholders, so every alias of a pending value observes the
+// result. Only placeholders still referenced from Torch are graph outputs.
+class ORTLazyGraph {
+ public:
+  static constexpr size_t kMaxCachedSessions = 64;
+
+  ORTLazyGraph(
+    onnxruntime::Environment& environment,
+    const ORTDeviceConfig& config,
+    std::shared_ptr<ORTCachingAllocator> allocator)
+    : environment_(environment),
+      config_(config),
+      allocator_(std::move(allocator)) {}
+
+  // Records a node, filling outputs with placeholder values. Returns false
+  // without recording anything if the node's output types and shapes cannot
+  // be inferred statically; the caller must then invoke it eagerly.
+  bool TryRecord(
+    const std::string& op_name,
+    const std::vector<OrtValue>& inputs,
+    std::vector<OrtValue>& outputs,
+    const onnxruntime::NodeAttributes* attributes,
+    const std::string& domain);
+
+  bool HasPendingNodes() const {
+    return graph_.node_size() > 0;
+  }
+
+  // Runs all recorded nodes as one session and resolves their placeholders.
+  void Flush();
+
+  size_t GetCachedSessionCount() const {
+    return sessions_.size();
+  }
+
+  void ClearSessionCache() {
+    sessions_.clear();
+    lru_.clear();
+  }
+
+ private:
+  struct CachedSession {
+    std::unique_ptr<onnxruntime::InferenceSession> session;
+    std::list<const std::string*>::iterator lru_position;
+  };
+
+  void Reset();
+
+  onnxruntime::InferenceSession& GetOrCreateSession(
+    const onnx::ModelProto& model,
+    std::string key);
+
+  onnxruntime::Environment& environment_;
+  const ORTDeviceConfig config_;
+  std::shared_ptr<ORTCachingAllocator> allocator_;
+  onnx::GraphProto graph_;
+  std::map<std::string, int> opset_imports_;
+  std::unordered_map<const onnxruntime::Tensor*, std::string> value_names_;
+  std::vector<std::pair<std::string, OrtValue>> graph_inputs_;
+  // Placeholders are shared with the values handed to Torch, whose release
+  // drops their reference; one only held here is no longer observable
+  std::vector<std::pair<std::string, std::shared_ptr<OrtValue>>> pending_values_;
+  std::unordered_map<std::string, CachedSession> sessions_;
+  // Keys of sessions_, most recently used first
+  std::list<const std::string*> lru_;
+};
+
+} // namespace eager
+} // namespace torch_ort
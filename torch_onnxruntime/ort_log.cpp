@@ -1,7 +1,10 @@
 // Copyright (c) Microsoft Corporation. All rights reserved.
 // Licensed under the MIT License.
 
+#include <algorithm>
+#include <cstdlib>
 #include <iostream>
+#include <mutex>
 #include <thread>
 
 #include <c10/util/StringUtil.h>
@@ -11,6 +14,32 @@
 namespace torch_ort {
 namespace eager {
 
+// Constant-initialized, so that messages logged during static
+// initialization, e.g. by op registration, see the default level
+std::atomic<int> ort_log_level{(int)ORTLogLevel::WARNING};
+
+namespace {
+  struct ORTLogLevelFromEnvironment {
+    ORTLogLevelFromEnvironment() {
+      const char* level = std::getenv("ORT_EAGER_LOG_LEVEL");
+      if (level && *level) {
+        SetORTLogLevel((ORTLogLevel)std::atoi(level));
+      }
+    }
+  } ort_log_level_from_environment;
+}
+
+ORTLogLevel GetORTLogLevel() {
+  return (ORTLogLevel)ort_log_level.load(std::memory_order_relaxed);
+}
+
+void SetORTLogLevel(ORTLogLevel level) {
+  auto clamped = std::min(
+    std::max((int)level, (int)ORTLogLevel::MIN),
+    (int)ORTLogLevel::MAX);
+  ort_log_level.store(clamped, std::memory_order_relaxed);
+}
+
 ORTLog::ORTLog(const char* file, int line, ORTLogLevel log_level) {
   file_ = c10::detail::StripBasename(std::string(file));
   line_ = line;
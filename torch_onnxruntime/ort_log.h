@@ -3,6 +3,7 @@
 
 #pragma once
 
+#include <atomic>
 #include <sstream>
 
 #include <c10/core/Scalar.h>
@@ -25,6 +26,25 @@ enum class ORTLogLevel : int {
   MAX = TRACE 
 };
 
+// Messages more verbose than ORT_LOG_MAX_LEVEL are compiled out; release
+// builds define it to keep only warnings and errors.
+#ifndef ORT_LOG_MAX_LEVEL
+#define ORT_LOG_MAX_LEVEL 6
+#endif
+
+// The most verbose level logged at runtime; initialized from the
+// ORT_EAGER_LOG_LEVEL environment variable, WARNING by default.
+extern std::atomic<int> ort_log_level;
+
+ORTLogLevel GetORTLogLevel();
+
+void SetORTLogLevel(ORTLogLevel level);
+
+inline bool IsORTLogEnabled(ORTLogLevel level) {
+  return (int)level <= ORT_LOG_MAX_LEVEL &&
+    (int)level <= ort_log_level.load(std::memory_order_relaxed);
+}
+
 class ORTLog {
  public:
   ORTLog(const char* file, int line, ORTLogLevel log_level);
@@ -108,7 +128,20 @@ class ORTLog {
   std::stringstream buffer_;
 };
 
-#define ORT_LOG(LEVEL) ORTLog(__FILE__, __LINE__, LEVEL)
+// Turns a streamed ORTLog expression into void so that it can be the
+// branch of a conditional; & binds more loosely than << and .func().
+struct ORTLogVoidify {
+  void operator&(const ORTLog&) {}
+};
+
+// The message, and every argument streamed into it, is only evaluated if
+// its level is enabled: ORT_LOG_DEBUG << expensive() costs one relaxed
+// atomic load otherwise, and nothing if the level is compiled out.
+#define ORT_LOG_IF_ENABLED(LEVEL) \
+  !IsORTLogEnabled(LEVEL) ? (void)0 : ORTLogVoidify() &
+
+#define ORT_LOG(LEVEL) \
+  ORT_LOG_IF_ENABLED(LEVEL) ORTLog(__FILE__, __LINE__, LEVEL)
 
 #define ORT_LOG_FATAL ORT_LOG(ORTLogLevel::FATAL)
 #define ORT_LOG_ERROR ORT_LOG(ORTLogLevel::ERROR)
@@ -118,7 +151,14 @@ class ORTLog {
 #define ORT_LOG_VERBOSE ORT_LOG(ORTLogLevel::VERBOSE)
 #define ORT_LOG_TRACE ORT_LOG(ORTLogLevel::TRACE)
 
-#define ORT_LOG_FN(...) ORT_LOG_VERBOSE.func(__PRETTY_FUNCTION__, ##__VA_ARGS__)
+#if ORT_LOG_MAX_LEVEL >= 5
+#define ORT_LOG_FN(...) \
+  ORT_LOG_IF_ENABLED(ORTLogLevel::VERBOSE) \
+  ORTLog(__FILE__, __LINE__, ORTLogLevel::VERBOSE).func( \
+    __PRETTY_FUNCTION__, ##__VA_ARGS__)
+#else
+#define ORT_LOG_FN(...) ((void)0)
+#endif
 
 } // namespace eager
 } // namespace torch_ort
\ No newline at end of file
@@ -1,37 +1,208 @@
 // Copyright (c) Microsoft Corporation. All rights reserved.
 // Licensed under the MIT License.
 
+#include <ATen/record_function.h>
+
 #include "ort_ops.h"
 #include "ort_util.h"
 #include "ort_log.h"
+#include "ort_backends.h"
+#include "ort_profiler.h"
 
 namespace torch_ort {
 namespace eager {
 
-OrtValue reshape_copy(
+namespace {
+  onnxruntime::common::Status dispatch_kernel(
+    onnxruntime::ORTInvoker& invoker,
+    const ORTKernel* kernel,
+    const std::string& op_name,
+    const std::vector<OrtValue>& inputs,
+    std::vector<OrtValue>& outputs,
+    const onnxruntime::NodeAttributes* attributes,
+    const std::string& domain) {
+    auto* lazy_graph = GetORTBackendsManager().GetLazyGraph(invoker);
+    if (lazy_graph) {
+      if (lazy_graph->TryRecord(op_name, inputs, outputs, attributes, domain))
+        return onnxruntime::common::Status::OK();
+      // Not recordable; run everything pending first to preserve ordering
+      RecordORTProfileInstant(ORTProfileEventKind::FALLBACK, op_name.c_str());
+      lazy_graph->Flush();
+    }
+
+    auto* async_queue = GetORTBackendsManager().GetAsyncQueue(invoker);
+    if (async_queue) {
+      if (async_queue->TryEnqueue(op_name, inputs, outputs, attributes, domain))
+        return onnxruntime::common::Status::OK();
+      // Not inferable; run it inline once everything queued has completed
+      RecordORTProfileInstant(ORTProfileEventKind::FALLBACK, op_name.c_str());
+      async_queue->Synchronize();
+    }
+
+    // A handle reuses its compiled session; an op invoked by name is
+    // resolved again on every call
+    if (kernel && GetORTBackendsManager().IsKernelCacheEnabled(invoker)) {
+      return GetORTBackendsManager().GetKernelCache(invoker).Run(
+        *kernel,
+        inputs,
+        outputs,
+        attributes);
+    }
+    return invoker.Invoke(op_name, inputs, outputs, attributes, domain);
+  }
+
+  void add_output_bytes(
+    ORTProfileScope& profile_scope,
+    const std::vector<OrtValue>& outputs) {
+    for (const auto& output : outputs) {
+      if (output.IsAllocated() && output.IsTensor()) {
+        profile_scope.AddBytes(output.Get<onnxruntime::Tensor>().SizeInBytes());
+      }
+    }
+  }
+
+  onnxruntime::common::Status profile_and_dispatch_kernel(
+    onnxruntime::ORTInvoker& invoker,
+    const ORTKernel* kernel,
+    const std::string& op_name,
+    const std::vector<OrtValue>& inputs,
+    std::vector<OrtValue>& outputs,
+    const onnxruntime::NodeAttributes* attributes,
+    const std::string& domain) {
+    // Show kernels in torch.autograd.profiler traces, nested under their op
+    at::RecordFunction record_function(at::RecordScope::USER_SCOPE);
+    if (record_function.active) {
+      record_function.before("ort::" + op_name);
+    }
+
+    ORTProfileScope profile_scope(ORTProfileEventKind::KERNEL, op_name.c_str());
+    auto status = dispatch_kernel(
+      invoker,
+      kernel,
+      op_name,
+      inputs,
+      outputs,
+      attributes,
+      domain);
+
+    if (profile_scope.IsEnabled() && status.IsOK()) {
+      add_output_bytes(profile_scope, outputs);
+    }
+    return status;
+  }
+
+  onnxruntime::common::Status invoke_unfused(
+    onnxruntime::ORTInvoker& invoker,
+    const ORTFusedGraph& graph,
+    const std::vector<OrtValue>& inputs,
+    std::vector<OrtValue>& outputs) {
+    const auto& nodes = graph.GetNodes();
+    std::vector<std::vector<OrtValue>> node_outputs(nodes.size() - 1);
+    for (size_t i = 0; i < nodes.size(); i++) {
+      std::vector<OrtValue> node_inputs;
+      for (auto input : nodes[i].inputs) {
+        node_inputs.push_back(input >= 0
+          ? inputs[input]
+          : node_outputs[-input - 1][0]);
+      }
+
+      // The last node writes the graph output
+      auto& outputs_i = i + 1 < nodes.size() ? node_outputs[i] : outputs;
+      outputs_i.resize(1);
+      auto status = invoke(
+        invoker,
+        graph.GetKernel(i),
+        node_inputs,
+        outputs_i,
+        nullptr);
+      if (!status.IsOK())
+        return status;
+    }
+    return onnxruntime::common::Status::OK();
+  }
+}
+
+onnxruntime::common::Status invoke(
   onnxruntime::ORTInvoker& invoker,
-  const OrtValue& input,
-  std::vector<int64_t> shape) {
-  
-  // TODO: actual reshape on buffer
-  const onnxruntime::Tensor& input_tensor = input.Get<onnxruntime::Tensor>();
-  auto new_shape = at::infer_size(shape, input_tensor.Shape().Size());
-  OrtValue shape_tensor;
-  //todo: avoid the copy on this small shape vector;
-  auto element_type = onnxruntime::DataTypeImpl::GetType<int64_t>();
-  CreateMLValue(invoker.GetCurrentExecutionProvider().GetAllocator(0, OrtMemTypeDefault),
-                element_type, {(int64_t)new_shape.size(),}, &shape_tensor);
-  auto* ort_shape_tensor = shape_tensor.GetMutable<onnxruntime::Tensor>();
-  CopyVectorToTensor<int64_t>(new_shape, *ort_shape_tensor);
-  std::vector<OrtValue> result(1);
-  auto status = invoker.Invoke("Reshape", {input, shape_tensor}, result, nullptr);
-  if (!status.IsOK())
-    throw std::runtime_error("ORT return failure status: " + status.ErrorMessage());
-  return result[0];
+  const std::string& op_name,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs,
+  const onnxruntime::NodeAttributes* attributes,
+  const std::string& domain) {
+  return profile_and_dispatch_kernel(
+    invoker,
+    nullptr,
+    op_name,
+    inputs,
+    outputs,
+    attributes,
+    domain);
+}
+
+onnxruntime::common::Status invoke(
+  onnxruntime::ORTInvoker& invoker,
+  const ORTKernel& kernel,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs,
+  const onnxruntime::NodeAttributes* attributes) {
+  return profile_and_dispatch_kernel(
+    invoker,
+    &kernel,
+    kernel.GetOpName(),
+    inputs,
+    outputs,
+    attributes,
+    kernel.GetDomain());
+}
+
+onnxruntime::common::Status invoke_fused(
+  onnxruntime::ORTInvoker& invoker,
+  const ORTFusedGraph& graph,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs) {
+  if (graph.GetNodes().size() == 1 ||
+    is_deferred(invoker) ||
+    !GetORTBackendsManager().IsKernelCacheEnabled(invoker))
+    return invoke_unfused(invoker, graph, inputs, outputs);
+
+  at::RecordFunction record_function(at::RecordScope::USER_SCOPE);
+  if (record_function.active) {
+    record_function.before("ort::" + graph.GetName());
+  }
+
+  ORTProfileScope profile_scope(
+    ORTProfileEventKind::KERNEL,
+    graph.GetName().c_str());
+  auto status = GetORTBackendsManager().GetKernelCache(invoker).Run(
+    graph,
+    inputs,
+    outputs);
+
+  if (profile_scope.IsEnabled() && status.IsOK()) {
+    add_output_bytes(profile_scope, outputs);
+  }
+  return status;
+}
+
+void synchronize(onnxruntime::ORTInvoker& invoker) {
+  auto* lazy_graph = GetORTBackendsManager().GetLazyGraph(invoker);
+  if (lazy_graph)
+    lazy_graph->Flush();
+
+  auto* async_queue = GetORTBackendsManager().GetAsyncQueue(invoker);
+  if (async_queue)
+    async_queue->Synchronize();
+}
+
+bool is_deferred(onnxruntime::ORTInvoker& invoker) {
+  auto& manager = GetORTBackendsManager();
+  return manager.GetLazyGraph(invoker) || manager.GetAsyncQueue(invoker);
 }
 
 void copy(onnxruntime::ORTInvoker& invoker, 
           const OrtValue& src, OrtValue& dst){
+  synchronize(invoker);
+
   auto& ort_ep = invoker.GetCurrentExecutionProvider();
   
   const auto& src_tensor = src.Get<onnxruntime::Tensor>();
@@ -6,13 +6,51 @@
 #include <core/framework/ml_value.h>
 #include <core/eager/ort_kernel_invoker.h>
 
+#include "ort_fusion.h"
+#include "ort_kernels.h"
+
 namespace torch_ort {
 namespace eager {
 
-OrtValue reshape_copy(
+// Invokes an ONNX kernel on the invoker's execution provider, or records it
+// into the device's pending graph when lazy mode is enabled, or queues it on
+// the device's worker thread when async mode is enabled.
+onnxruntime::common::Status invoke(
+  onnxruntime::ORTInvoker& invoker,
+  const std::string& op_name,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs,
+  const onnxruntime::NodeAttributes* attributes,
+  const std::string& domain = onnxruntime::kOnnxDomain);
+
+// Invokes a kernel handle like invoke above. Run inline, the handle reuses
+// the session compiled for its input types and attribute values instead of
+// resolving the kernel again.
+onnxruntime::common::Status invoke(
   onnxruntime::ORTInvoker& invoker,
-  const OrtValue& input,
-  std::vector<int64_t> shape);
+  const ORTKernel& kernel,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs,
+  const onnxruntime::NodeAttributes* attributes);
+
+// Runs a chain of elementwise nodes as a single session, writing the output
+// of the last node into outputs. In lazy or async mode, and for a single
+// node, the nodes are dispatched one at a time with invoke instead: a pending
+// graph fuses them anyway, and the async queue can only run kernels.
+onnxruntime::common::Status invoke_fused(
+  onnxruntime::ORTInvoker& invoker,
+  const ORTFusedGraph& graph,
+  const std::vector<OrtValue>& inputs,
+  std::vector<OrtValue>& outputs);
+
+// Waits for all work recorded on the invoker to complete so that host code
+// may read or write the underlying buffers. Errors of queued kernels are
+// thrown here.
+void synchronize(onnxruntime::ORTInvoker& invoker);
+
+// True if kernels dispatched on the invoker may run after invoke returns,
+// i.e. lazy or async mode is enabled.
+bool is_deferred(onnxruntime::ORTInvoker& invoker);
 
 OrtValue add(onnxruntime::ORTInvoker& invoker,
              const OrtValue& A,
@@ -0,0 +1,220 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include <algorithm>
+#include <iomanip>
+#include <sstream>
+#include <thread>
+
+#include "ort_profiler.h"
+
+namespace torch_ort {
+namespace eager {
+
+namespace {
+  // The innermost ATen op scope of the calling thread
+  thread_local ORTProfileScope* current_op_scope = nullptr;
+
+  uint64_t current_thread_id() {
+    return std::hash<std::thread::id>()(std::this_thread::get_id());
+  }
+
+  void write_json_string(std::ostream& out, const std::string& value) {
+    out << '"';
+    for (auto c : value) {
+      if (c == '"' || c == '\\') {
+        out << '\\';
+      }
+      out << c;
+    }
+    out << '"';
+  }
+}
+
+const char* ORTProfileEventKindName(ORTProfileEventKind kind) {
+  switch (kind) {
+    case ORTProfileEventKind::ATEN_OP:
+      return "aten";
+    case ORTProfileEventKind::KERNEL:
+      return "kernel";
+    case ORTProfileEventKind::COPY:
+      return "copy";
+    case ORTProfileEventKind::FALLBACK:
+      return "fallback";
+  }
+  return "unknown";
+}
+
+void ORTProfiler::SetEnabled(bool enabled) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  if (enabled && !IsEnabled() && stats_.empty()) {
+    epoch_ = Clock::now();
+  }
+  enabled_.store(enabled, std::memory_order_relaxed);
+}
+
+void ORTProfiler::Reset() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  stats_.clear();
+  events_.clear();
+  dropped_events_ = 0;
+  epoch_ = Clock::now();
+}
+
+void ORTProfiler::Record(
+  ORTProfileEventKind kind,
+  const char* name,
+  Clock::time_point start,
+  Clock::time_point end,
+  uint64_t bytes) {
+  auto duration_ns = std::chrono::duration_cast<std::chrono::nanoseconds>(
+    end - start).count();
+
+  std::lock_guard<std::mutex> lock(mutex_);
+  auto& stats = stats_[{kind, name}];
+  stats.count++;
+  stats.total_ns += duration_ns;
+  stats.max_ns = std::max<uint64_t>(stats.max_ns, duration_ns);
+  stats.bytes += bytes;
+
+  if (events_.size() >= kMaxEvents) {
+    dropped_events_++;
+    return;
+  }
+  events_.push_back({
+    kind,
+    name,
+    std::chrono::duration_cast<std::chrono::nanoseconds>(
+      start - epoch_).count(),
+    duration_ns,
+    bytes,
+    current_thread_id(),
+  });
+}
+
+std::map<ORTProfileKey, ORTProfileStats> ORTProfiler::GetStats() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return stats_;
+}
+
+std::string ORTProfiler::GetTable(size_t max_rows) const {
+  auto stats = GetStats();
+  std::vector<std::pair<ORTProfileKey, ORTProfileStats>> rows(
+    stats.begin(),
+    stats.end());
+  std::stable_sort(rows.begin(), rows.end(), [](const auto& a, const auto& b) {
+    return a.second.total_ns > b.second.total_ns;
+  });
+  if (max_rows > 0 && rows.size() > max_rows) {
+    rows.resize(max_rows);
+  }
+
+  size_t name_width = 4;
+  for (const auto& row : rows) {
+    name_width = std::max(name_width, row.first.second.size());
+  }
+
+  std::ostringstream out;
+  out << std::left << std::setw(name_width) << "Name"
+    << "  " << std::setw(8) << "Kind"
+    << std::right
+    << std::setw(10) << "Calls"
+    << std::setw(14) << "Total (ms)"
+    << std::setw(12) << "Avg (us)"
+    << std::setw(12) << "Max (us)"
+    << std::setw(14) << "Bytes" << "\n";
+  out << std::string(name_width + 72, '-') << "\n";
+  out << std::fixed;
+  for (const auto& row : rows) {
+    const auto& s = row.second;
+    out << std::left << std::setw(name_width) << row.first.second
+      << "  " << std::setw(8) << ORTProfileEventKindName(row.first.first)
+      << std::right
+      << std::setw(10) << s.count
+      << std::setw(14) << std::setprecision(3) << s.total_ns / 1e6
+      << std::setw(12) << std::setprecision(2)
+        << (s.count ? s.total_ns / 1e3 / s.count : 0.0)
+      << std::setw(12) << std::setprecision(2) << s.max_ns / 1e3
+      << std::setw(14) << s.bytes << "\n";
+  }
+  return out.str();
+}
+
+std::string ORTProfiler::GetChromeTrace() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+
+  std::ostringstream out;
+  out << std::fixed << std::setprecision(3);
+  out << "{\"traceEvents\": [";
+  for (size_t i = 0; i < events_.size(); i++) {
+    const auto& event = events_[i];
+    out << (i ? ",\n" : "\n") << "{\"name\": ";
+    write_json_string(out, event.name);
+    out << ", \"cat\": \"" << ORTProfileEventKindName(event.kind) << "\"";
+    if (event.kind == ORTProfileEventKind::FALLBACK) {
+      out << ", \"ph\": \"i\", \"s\": \"t\"";
+    } else {
+      out << ", \"ph\": \"X\", \"dur\": " << event.duration_ns / 1e3;
+    }
+    out << ", \"ts\": " << event.start_ns / 1e3
+      << ", \"pid\": 0, \"tid\": " << event.thread_id
+      << ", \"args\": {\"bytes\": " << event.bytes << "}}";
+  }
+  out << "\n], \"displayTimeUnit\": \"ms\"";
+  out << ", \"otherData\": {\"dropped_events\": " << dropped_events_ << "}}";
+  return out.str();
+}
+
+ORTProfiler& GetORTProfiler() {
+  static ORTProfiler profiler;
+  return profiler;
+}
+
+ORTProfileScope::ORTProfileScope(ORTProfileEventKind kind, const char* name)
+  : enabled_(GetORTProfiler().IsEnabled()),
+    kind_(kind),
+    name_(name) {
+  if (!enabled_)
+    return;
+
+  if (kind_ == ORTProfileEventKind::ATEN_OP) {
+    parent_ = current_op_scope;
+    current_op_scope = this;
+  }
+  start_ = ORTProfiler::Clock::now();
+}
+
+ORTProfileScope::~ORTProfileScope() {
+  if (!enabled_)
+    return;
+
+  GetORTProfiler().Record(
+    kind_,
+    name_,
+    start_,
+    ORTProfiler::Clock::now(),
+    bytes_);
+
+  if (kind_ == ORTProfileEventKind::ATEN_OP) {
+    current_op_scope = parent_;
+  }
+  if (current_op_scope) {
+    current_op_scope->bytes_ += bytes_;
+  }
+}
+
+void ORTProfileScope::AddBytes(uint64_t bytes) {
+  bytes_ += bytes;
+}
+
+void RecordORTProfileInstant(ORTProfileEventKind kind, const char* name) {
+  auto& profiler = GetORTProfiler();
+  if (!profiler.IsEnabled())
+    return;
+
+  auto now = ORTProfiler::Clock::now();
+  profiler.Record(kind, name, now, now, 0);
+}
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,134 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <atomic>
+#include <chrono>
+#include <map>
+#include <mutex>
+#include <string>
+#include <vector>
+
+namespace torch_ort {
+namespace eager {
+
+enum class ORTProfileEventKind : int {
+  // An ATen op implemented by the ORT device
+  ATEN_OP = 0,
+  // An ONNX kernel invoked on behalf of an ATen op
+  KERNEL = 1,
+  // Data copied on the host instead of being written in place or aliased
+  COPY = 2,
+  // A kernel that could not be deferred by lazy or async mode and forced
+  // the pending work to complete first
+  FALLBACK = 3,
+};
+
+const char* ORTProfileEventKindName(ORTProfileEventKind kind);
+
+struct ORTProfileStats {
+  uint64_t count = 0;
+  uint64_t total_ns = 0;
+  uint64_t max_ns = 0;
+  // Bytes of the outputs allocated by kernels, or copied by copies
+  uint64_t bytes = 0;
+};
+
+struct ORTProfileEvent {
+  ORTProfileEventKind kind;
+  std::string name;
+  // Relative to the time the profiler was enabled or reset
+  int64_t start_ns;
+  int64_t duration_ns;
+  uint64_t bytes;
+  uint64_t thread_id;
+};
+
+using ORTProfileKey = std::pair<ORTProfileEventKind, std::string>;
+
+// Collects call counts, wall time and bytes per ATen op and per ONNX kernel,
+// and a timeline of events for Chrome tracing. Disabled, an instrumentation
+// point costs a single relaxed atomic load.
+//
+// In async mode a kernel's time is the time taken to enqueue it, and the
+// time spent waiting for the queue shows up in the op that synchronizes.
+class ORTProfiler {
+ public:
+  // Timeline events beyond this are counted but not kept
+  static constexpr size_t kMaxEvents = 1 << 20;
+
+  using Clock = std::chrono::steady_clock;
+
+  bool IsEnabled() const {
+    return enabled_.load(std::memory_order_relaxed);
+  }
+
+  void SetEnabled(bool enabled);
+
+  // Clears all statistics and events.
+  void Reset();
+
+  void Record(
+    ORTProfileEventKind kind,
+    const char* name,
+    Clock::time_point start,
+    Clock::time_point end,
+    uint64_t bytes);
+
+  std::map<ORTProfileKey, ORTProfileStats> GetStats() const;
+
+  // Formats the statistics as a table ordered by total time, limited to
+  // max_rows rows if it is non-zero.
+  std::string GetTable(size_t max_rows = 0) const;
+
+  // Formats the recorded events in the Chrome trace event format, for
+  // chrome://tracing or Perfetto.
+  std::string GetChromeTrace() const;
+
+ private:
+  std::atomic<bool> enabled_{false};
+  mutable std::mutex mutex_;
+  Clock::time_point epoch_ = Clock::now();
+  std::map<ORTProfileKey, ORTProfileStats> stats_;
+  std::vector<ORTProfileEvent> events_;
+  uint64_t dropped_events_ = 0;
+};
+
+ORTProfiler& GetORTProfiler();
+
+// Times a scope and records it with the profiler when the scope exits, if
+// the profiler was enabled when it was entered. Bytes added to a kernel or
+// copy scope are also added to the ATen op scope enclosing it on the same
+// thread. name must outlive the scope.
+class ORTProfileScope {
+ public:
+  ORTProfileScope(ORTProfileEventKind kind, const char* name);
+  ~ORTProfileScope();
+
+  ORTProfileScope(const ORTProfileScope&) = delete;
+  ORTProfileScope& operator=(const ORTProfileScope&) = delete;
+
+  bool IsEnabled() const {
+    return enabled_;
+  }
+
+  void AddBytes(uint64_t bytes);
+
+ private:
+  bool enabled_;
+  ORTProfileEventKind kind_;
+  const char* name_;
+  ORTProfiler::Clock::time_point start_;
+  uint64_t bytes_ = 0;
+  ORTProfileScope* parent_ = nullptr;
+};
+
+// Records an event without a duration, e.g. a fallback.
+void RecordORTProfileInstant(ORTProfileEventKind kind, const char* name);
+
+#define ORT_PROFILE_OP(NAME) \
+  ORTProfileScope ort_profile_scope(ORTProfileEventKind::ATEN_OP, NAME)
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,111 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#include <onnx/defs/schema.h>
+#include <onnx/shape_inference/implementation.h>
+
+#include "ort_shape_inference.h"
+
+namespace torch_ort {
+namespace eager {
+
+namespace {
+  constexpr int64_t kMaxInferenceConstantSize = 8;
+
+  bool is_static_tensor_type(const onnx::TypeProto* type) {
+    if (!type || !type->has_tensor_type())
+      return false;
+    const auto& tensor_type = type->tensor_type();
+    if (tensor_type.elem_type() == onnx::TensorProto_DataType_UNDEFINED ||
+      !tensor_type.has_shape())
+      return false;
+    for (const auto& dim : tensor_type.shape().dim()) {
+      if (!dim.has_dim_value())
+        return false;
+    }
+    return true;
+  }
+}
+
+void SetTypeFromTensor(
+  const onnxruntime::Tensor& tensor,
+  onnx::TypeProto& type) {
+  auto* tensor_type = type.mutable_tensor_type();
+  tensor_type->set_elem_type(tensor.GetElementType());
+  auto* shape = tensor_type->mutable_shape();
+  shape->clear_dim();
+  for (auto dim : tensor.Shape().GetDims()) {
+    shape->add_dim()->set_dim_value(dim);
+  }
+}
+
+bool InferNodeOutputs(
+  const onnx::NodeProto& node,
+  const std::vector<OrtValue>& inputs,
+  const std::function<bool(const onnxruntime::Tensor&)>& can_read_data,
+  std::vector<ORTInferredOutput>& outputs) {
+  const auto* schema = onnx::OpSchemaRegistry::Schema(
+    node.op_type(),
+    node.domain());
+  if (!schema || !schema->has_type_and_shape_inference_function())
+    return false;
+
+  std::vector<onnx::TypeProto> input_types(inputs.size());
+  std::vector<onnx::TensorProto> input_data;
+  input_data.reserve(inputs.size());
+  std::unordered_map<std::string, onnx::TypeProto*> types_by_name;
+  std::unordered_map<std::string, const onnx::TensorProto*> data_by_name;
+
+  for (size_t i = 0; i < inputs.size(); i++) {
+    const auto& name = node.input(i);
+    const auto& tensor = inputs[i].Get<onnxruntime::Tensor>();
+    SetTypeFromTensor(tensor, input_types[i]);
+    types_by_name[name] = &input_types[i];
+
+    if (tensor.GetElementType() == onnx::TensorProto_DataType_INT64 &&
+      tensor.Shape().NumDimensions() <= 1 &&
+      tensor.Shape().Size() <= kMaxInferenceConstantSize &&
+      !data_by_name.count(name) &&
+      can_read_data(tensor)) {
+      input_data.emplace_back();
+      auto& data = input_data.back();
+      data.set_data_type(onnx::TensorProto_DataType_INT64);
+      for (auto dim : tensor.Shape().GetDims()) {
+        data.add_dims(dim);
+      }
+      for (auto value : tensor.DataAsSpan<int64_t>()) {
+        data.add_int64_data(value);
+      }
+      data_by_name[name] = &data;
+    }
+  }
+
+  onnx::shape_inference::InferenceContextImpl inference_context(
+    const_cast<onnx::NodeProto&>(node),
+    types_by_name,
+    data_by_name);
+  try {
+    schema->GetTypeAndShapeInferenceFunction()(inference_context);
+  } catch (const onnx::InferenceError&) {
+    return false;
+  }
+
+  outputs.clear();
+  for (int i = 0; i < node.output_size(); i++) {
+    const auto* type = inference_context.getOutputType(i);
+    if (!is_static_tensor_type(type))
+      return false;
+
+    ORTInferredOutput output;
+    output.element_type = onnxruntime::DataTypeImpl::TensorTypeFromONNXEnum(
+      type->tensor_type().elem_type())->GetElementType();
+    for (const auto& dim : type->tensor_type().shape().dim()) {
+      output.dims.push_back(dim.dim_value());
+    }
+    outputs.push_back(std::move(output));
+  }
+  return true;
+}
+
+} // namespace eager
+} // namespace torch_ort
@@ -0,0 +1,35 @@
+// Copyright (c) Microsoft Corporation. All rights reserved.
+// Licensed under the MIT License.
+
+#pragma once
+
+#include <functional>
+
+#include <core/framework/ml_value.h>
+#include <core/graph/onnx_protobuf.h>
+
+namespace torch_ort {
+namespace eager {
+
+struct ORTInferredOutput {
+  onnxruntime::MLDataType element_type;
+  std::vector<int64_t> dims;
+};
+
+void SetTypeFromTensor(
+  const onnxruntime::Tensor& tensor,
+  onnx::TypeProto& type);
+
+// Infers the element type and static shape of every output of node, whose
+// inputs are named by node.input() and have the given values. Small int64
+// inputs (shapes, axes) are handed to ONNX shape inference as constant data
+// if can_read_data allows reading them, so that ops like Reshape can be
+// inferred. Returns false if any output cannot be inferred statically.
+bool InferNodeOutputs(
+  const onnx::NodeProto& node,
+  const std::vector<OrtValue>& inputs,
+  const std::function<bool(const onnxruntime::Tensor&)>& can_read_data,
+  std::vector<ORTInferredOutput>& outputs);
+
+} // namespace eager
+} // namespace torch_ort
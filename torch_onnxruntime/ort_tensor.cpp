@@ -7,6 +7,76 @@
 namespace torch_ort {
 namespace eager {
 
+ORTTensorImpl::ORTTensorImpl(
+  OrtValue storage_value,
+  const at::TensorOptions& options,
+  at::IntArrayRef sizes,
+  at::IntArrayRef strides,
+  int64_t storage_offset)
+  : ORTTensorImpl(std::move(storage_value), options) {
+  set_sizes_and_strides(sizes, strides);
+  set_storage_offset(storage_offset);
+}
+
+void ORTTensorImpl::set_tensor(OrtValue tensor) {
+  tensor_ = std::move(tensor);
+  const auto& ort_tensor = tensor_.Get<onnxruntime::Tensor>();
+  const auto& dims = ort_tensor.Shape().GetDims();
+  set_sizes_and_strides(dims, GetStrides(dims, 1));
+  set_storage_offset(0);
+}
+
+bool ORTTensorImpl::is_storage_equivalent() const {
+  return storage_offset_ == 0 &&
+    is_contiguous_ &&
+    tensor_.Get<onnxruntime::Tensor>().Shape().GetDims() ==
+      std::vector<int64_t>(sizes_.begin(), sizes_.end());
+}
+
+OrtValue ORTTensorImpl::tensor() const {
+  if (is_storage_equivalent()) {
+    return tensor_;
+  }
+
+  TORCH_CHECK(is_contiguous_, "ORT: a non-contiguous view has no ORT value");
+
+  return view_value(std::vector<int64_t>(sizes_.begin(), sizes_.end()));
+}
+
+OrtValue ORTTensorImpl::permuted_tensor(at::IntArrayRef permutation) const {
+  TORCH_CHECK(
+    is_non_overlapping_and_dense_,
+    "ORT: only a dense view can be permuted into memory order");
+
+  std::vector<int64_t> shape;
+  for (auto dim : permutation) {
+    shape.push_back(sizes_[dim]);
+  }
+  if (storage_offset_ == 0 &&
+    tensor_.Get<onnxruntime::Tensor>().Shape().GetDims() == shape) {
+    return tensor_;
+  }
+  return view_value(std::move(shape));
+}
+
+OrtValue ORTTensorImpl::view_value(std::vector<int64_t> shape) const {
+  const auto& storage_tensor = tensor_.Get<onnxruntime::Tensor>();
+  auto element_type = storage_tensor.DataType();
+  auto p_tensor = onnxruntime::make_unique<onnxruntime::Tensor>(
+    element_type,
+    onnxruntime::TensorShape(std::move(shape)),
+    const_cast<void*>(storage_tensor.DataRaw()),
+    storage_tensor.Location(),
+    storage_offset_ * element_type->Size());
+
+  OrtValue value;
+  value.Init(
+    p_tensor.release(),
+    onnxruntime::DataTypeImpl::GetType<onnxruntime::Tensor>(),
+    onnxruntime::DataTypeImpl::GetType<onnxruntime::Tensor>()->GetDeleteFunc());
+  return value;
+}
+
 c10::intrusive_ptr<c10::TensorImpl> ORTTensorImpl::shallow_copy_and_detach(
   const c10::VariableVersion& version_counter,
   bool allow_tensor_metadata_change) const {
@@ -28,6 +98,7 @@ c10::intrusive_ptr<c10::TensorImpl> ORTTensorImpl::shallow_copy_and_detach(
 void ORTTensorImpl::shallow_copy_from(
   const c10::intrusive_ptr<TensorImpl>& impl) {
   auto* src_impl = dynamic_cast<ORTTensorImpl*>(impl.get());
+  tensor_ = src_impl->tensor_;
   copy_tensor_metadata(
     src_impl,
     this,
@@ -35,44 +106,9 @@ void ORTTensorImpl::shallow_copy_from(
     allow_tensor_metadata_change());
 }
 
-at::IntArrayRef ORTTensorImpl::sizes() const {
-  const_cast<ORTTensorImpl*>(this)->cacheSizeMetadata();
-  return c10::TensorImpl::sizes();
-}
-
-int64_t ORTTensorImpl::dim() const {
-  const_cast<ORTTensorImpl*>(this)->cacheSizeMetadata();
-  return c10::TensorImpl::dim();
-}
-
-int64_t ORTTensorImpl::numel() const {
-  const_cast<ORTTensorImpl*>(this)->cacheSizeMetadata();
-  return c10::TensorImpl::numel();
-}
-
-bool ORTTensorImpl::is_contiguous(at::MemoryFormat memory_format) const {
-  return true;
-}
-
-int64_t ORTTensorImpl::size(int64_t d) const {
-  const_cast<ORTTensorImpl*>(this)->cacheSizeMetadata();
-  return c10::TensorImpl::size(d);
-}
-
-void ORTTensorImpl::cacheSizeMetadata() {
-  // TODO: wrap with change generation guard
-  auto& tensor = tensor_.Get<onnxruntime::Tensor>();
-  auto shape = tensor.Shape();
-  numel_ = shape.Size();
-  sizes_ = shape.GetDims();
-  strides_ = GetStrides(
-    shape.GetDims(),
-    tensor.DataType()->Size());
-}
-
 static const at::Storage no_storage_ = {};
 const at::Storage& ORTTensorImpl::storage() const { return no_storage_; }
 bool ORTTensorImpl::has_storage() const { return false; }
 
 } // namespace eager
-} // namespace torch_ort
\ No newline at end of file
+} // namespace torch_ort
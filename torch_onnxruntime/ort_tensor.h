@@ -9,6 +9,10 @@
 namespace torch_ort {
 namespace eager {
 
+// An ATen tensor backed by an ORT tensor. The OrtValue owns the buffer; the
+// ATen sizes, strides and storage offset describe the region of that buffer
+// this tensor covers, in elements. Views share the OrtValue of their base, so
+// creating one never allocates or copies.
 class ORTTensorImpl final : public c10::TensorImpl {
  public:
   explicit ORTTensorImpl(OrtValue tensor, const at::TensorOptions& options)
@@ -22,13 +26,35 @@ class ORTTensorImpl final : public c10::TensorImpl {
     set_tensor(tensor);
   }
 
-  OrtValue& tensor() {
+  // Creates a view over the buffer owned by storage_value.
+  ORTTensorImpl(
+    OrtValue storage_value,
+    const at::TensorOptions& options,
+    at::IntArrayRef sizes,
+    at::IntArrayRef strides,
+    int64_t storage_offset);
+
+  // The value owning the underlying buffer, shaped as it was allocated.
+  OrtValue& storage_value() {
     return tensor_;
   }
 
-  void set_tensor(OrtValue tensor) {
-    tensor_ = std::move(tensor);
-  }
+  // The value as ORT kernels see it: shaped like this tensor and aliasing
+  // the region of the buffer it covers. Only valid for contiguous tensors.
+  OrtValue tensor() const;
+
+  // Like tensor(), but with the dims permuted into the order in which they
+  // are laid out in memory, e.g. NHWC for a channels_last tensor. Only valid
+  // for non-overlapping and dense tensors.
+  OrtValue permuted_tensor(at::IntArrayRef permutation) const;
+
+  // Replaces the underlying buffer, resetting to a contiguous geometry
+  // matching its shape.
+  void set_tensor(OrtValue tensor);
+
+  // True if this tensor covers the whole buffer in allocation order, in
+  // which case tensor() is the storage value itself.
+  bool is_storage_equivalent() const;
 
   c10::intrusive_ptr<TensorImpl> shallow_copy_and_detach(
     const c10::VariableVersion& version_counter,
@@ -36,24 +62,16 @@ class ORTTensorImpl final : public c10::TensorImpl {
 
   void shallow_copy_from(const c10::intrusive_ptr<TensorImpl>& impl) override;
 
-  at::IntArrayRef sizes() const override;
-
-  int64_t dim() const override;
-
-  int64_t numel() const override;
-
-  bool is_contiguous(at::MemoryFormat memory_format) const override;
-
-  int64_t size(int64_t d) const override;
-
   const at::Storage& storage() const override;
 
   bool has_storage() const override;
 
  private:
-  void cacheSizeMetadata();
+  // A value of the given shape aliasing the buffer from the storage offset
+  OrtValue view_value(std::vector<int64_t> shape) const;
+
   OrtValue tensor_;
 };
 
 } // namespace eager
-} // namespace torch_ort
\ No newline at end of file
+} // namespace torch_ort
@@ -39,6 +39,45 @@ void CreateMLValue(void* data_ptr, onnxruntime::MLDataType element_type, const s
                   onnxruntime::DataTypeImpl::GetType<onnxruntime::Tensor>()->GetDeleteFunc());
 }
 
+namespace {
+  // Stands in for the allocator of a tensor whose buffer belongs to a Torch
+  // storage: freeing the buffer drops the tensor's reference to the storage.
+  class StorageReference : public onnxruntime::IAllocator {
+   public:
+    explicit StorageReference(at::Storage storage)
+      : onnxruntime::IAllocator(
+          OrtMemoryInfo(onnxruntime::CPU, OrtDeviceAllocator)),
+        storage_(std::move(storage)) {}
+
+    void* Alloc(size_t) override {
+      ORT_THROW("A storage reference cannot allocate");
+    }
+
+    void Free(void*) override {
+      storage_ = {};
+    }
+
+   private:
+    at::Storage storage_;
+  };
+}
+
+void CreateMLValue(const at::Storage& storage,
+                   onnxruntime::MLDataType element_type,
+                   const std::vector<int64_t>& dims,
+                   ptrdiff_t byte_offset,
+                   OrtValue* p_mlvalue) {
+  onnxruntime::TensorShape shape(dims);
+  std::unique_ptr<onnxruntime::Tensor> p_tensor = onnxruntime::make_unique<onnxruntime::Tensor>(element_type,
+                                                                      shape,
+                                                                      storage.data(),
+                                                                      std::make_shared<StorageReference>(storage),
+                                                                      byte_offset);
+  p_mlvalue->Init(p_tensor.release(),
+                  onnxruntime::DataTypeImpl::GetType<onnxruntime::Tensor>(),
+                  onnxruntime::DataTypeImpl::GetType<onnxruntime::Tensor>()->GetDeleteFunc());
+}
+
 std::vector<int64_t> GetStrides(const std::vector<int64_t>& shape, int64_t element_size){
   std::vector<int64_t> strides;
   if (shape.empty())
@@ -52,5 +91,38 @@ std::vector<int64_t> GetStrides(const std::vector<int64_t>& shape, int64_t eleme
   return strides;
 }
 
+void CopyStrided(const void* src, at::IntArrayRef src_strides,
+                 void* dst, at::IntArrayRef dst_strides,
+                 at::IntArrayRef sizes, size_t element_size) {
+  int64_t numel = 1;
+  for (auto size : sizes)
+    numel *= size;
+  if (numel == 0)
+    return;
+
+  auto* src_bytes = static_cast<const char*>(src);
+  auto* dst_bytes = static_cast<char*>(dst);
+  const int64_t dims = sizes.size();
+  std::vector<int64_t> index(dims, 0);
+  int64_t src_offset = 0;
+  int64_t dst_offset = 0;
+  for (int64_t i = 0; i < numel; i++) {
+    memcpy(dst_bytes + dst_offset * element_size,
+           src_bytes + src_offset * element_size,
+           element_size);
+    // advance the index, innermost dimension first
+    for (int64_t d = dims - 1; d >= 0; d--) {
+      if (++index[d] < sizes[d]) {
+        src_offset += src_strides[d];
+        dst_offset += dst_strides[d];
+        break;
+      }
+      src_offset -= (sizes[d] - 1) * src_strides[d];
+      dst_offset -= (sizes[d] - 1) * dst_strides[d];
+      index[d] = 0;
+    }
+  }
+}
+
 } // namespace eager
 } // namespace torch_ort
\ No newline at end of file
@@ -17,6 +17,15 @@ void CreateMLValue(onnxruntime::AllocatorPtr alloc,
 
 void CreateMLValue(void* data_ptr, onnxruntime::MLDataType element_type, const std::vector<int64_t>& dims, OrtValue* p_mlvalue);
 
+// Creates a value over the buffer of a CPU storage, starting byte_offset bytes
+// into it. The value holds a reference to the storage, so the buffer stays
+// alive for as long as either the storage or the value is in use.
+void CreateMLValue(const at::Storage& storage,
+                   onnxruntime::MLDataType element_type,
+                   const std::vector<int64_t>& dims,
+                   ptrdiff_t byte_offset,
+                   OrtValue* p_mlvalue);
+
 template <typename T>
 inline void CopyVectorToTensor(const std::vector<T>& value, onnxruntime::Tensor& tensor) {
   gsl::copy(gsl::make_span(value), tensor.MutableDataAsSpan<T>());
@@ -33,5 +42,11 @@ inline void CopyVectorToTensor<bool>(const std::vector<bool>& value, onnxruntime
 
 std::vector<int64_t> GetStrides(const std::vector<int64_t>& shape, int64_t element_size);
 
+// Copies sizes-shaped elements between two host buffers, each described by
+// its own strides (in elements).
+void CopyStrided(const void* src, at::IntArrayRef src_strides,
+                 void* dst, at::IntArrayRef dst_strides,
+                 at::IntArrayRef sizes, size_t element_size);
+
 } // namespace eager
 } // namespace torch_ort
\ No newline at end of file
@@ -6,6 +6,7 @@ from torch.utils.cpp_extension import BuildExtension, CppExtension
 from glob import glob
 from shutil import which
 
+import hashlib
 import os
 import subprocess
 import sys
@@ -28,11 +29,34 @@ def build_ort(ort_path, build_dir):
 
 def gen_ort_aten_ops():
     gen_cpp_name = "ort_aten.g.cpp"
-    if os.path.exists(gen_cpp_name):
-        os.remove(gen_cpp_name)
-    args = [python_exe, os.path.join(os.path.dirname(__file__), 'opgen', 'opgen.py'),
-             gen_cpp_name]
+    opgen_dir = os.path.join(os.path.dirname(__file__), 'opgen')
+    opgen_py = os.path.join(opgen_dir, 'opgen.py')
+
+    # The generated file depends on the ATen declarations (see regdecs_path
+    # in opgen.py), the op mappings in opgen.py and the generator itself;
+    # skip lexing and parsing the declarations when none of them changed.
+    regdecs_path = os.path.realpath(os.path.join(
+        opgen_dir, '..', '..', 'build', 'aten', 'src', 'ATen', 'RegistrationDeclarations.h'))
+    gen_inputs = [regdecs_path, opgen_py] + sorted(glob(os.path.join(opgen_dir, 'opgen', '*.py')))
+    digest = hashlib.sha256()
+    for path in gen_inputs:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    gen_hash = digest.hexdigest()
+
+    gen_hash_name = gen_cpp_name + '.sha256'
+    if os.path.exists(gen_cpp_name) and os.path.exists(gen_hash_name):
+        with open(gen_hash_name) as f:
+            if f.read().strip() == gen_hash:
+                print(f'{gen_cpp_name} is up to date')
+                return
+
+    # opgen.py only rewrites the output if its content changed
+    args = [python_exe, opgen_py, gen_cpp_name]
     subprocess.check_call(args)
+    with open(gen_hash_name, 'w') as f:
+        f.write(gen_hash + '\n')
 
 build_ort('onnxruntime', 'ort_build')
 
@@ -89,6 +113,13 @@ if is_debug_build():
         '-DONNX_DEBUG'
     ]
 
+# Log messages more verbose than this level are compiled out; release builds
+# keep errors and warnings (see ORTLogLevel in ort_log.h)
+log_max_level = os.environ.get(
+    'ORT_EAGER_LOG_MAX_LEVEL',
+    '6' if is_debug_build() else '2')
+extra_compile_args += [f'-DORT_LOG_MAX_LEVEL={log_max_level}']
+
 setup(
     name='torch_ort',
     ext_modules=[
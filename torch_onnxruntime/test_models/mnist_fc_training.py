@@ -37,7 +37,7 @@ def train_with_eager(args, model, optimizer, device, train_loader, epoch):
         data = data_cpu.to(device)
 
         x = model(data)
-        loss = my_loss(x.cpu(), target)
+        loss = my_loss(x, target.to(device))
 
         loss.backward()
         optimizer.step()
@@ -48,7 +48,7 @@ def train_with_eager(args, model, optimizer, device, train_loader, epoch):
         if batch_idx % args.log_interval == 0:
             print('Train Epoch: {} [{}/{} ({:.0f}%)]\tLoss: {:.6f}'.format(
                 epoch, batch_idx * len(data_cpu), len(train_loader.dataset),
-                100. * batch_idx / len(train_loader), loss))
+                100. * batch_idx / len(train_loader), loss.item()))
 
 def main():
 #Training settings
@@ -67,6 +67,8 @@ def main():
                         help='random seed (default: 1)')
     parser.add_argument('--log-interval', type=int, default=10, metavar='N',
                         help='how many batches to wait before logging training status')
+    parser.add_argument('--lazy-mode', action='store_true', default=False,
+                        help='capture ORT kernels into a graph that runs on observation')
 
 
     args = parser.parse_args()
@@ -88,6 +90,7 @@ def main():
         batch_size=args.test_batch_size, shuffle=True, **kwargs)
 
     device = torch.device('ort')
+    torch_ort.set_lazy_mode(args.lazy_mode)
     input_size = 784
     hidden_size = 500
     num_classes = 10
@@ -0,0 +1,68 @@
+## Measures the per-op cost of ORT_LOG_FN on the single-arg elementwise ops.
+##
+## "logged" runs each op with VERBOSE logging enabled (stderr redirected to
+## /dev/null), which is what every op paid before log levels were checked
+## before formatting; "unlogged" runs it at the default WARNING level, where
+## ORT_LOG_FN costs one relaxed atomic load. Building with
+## ORT_EAGER_LOG_MAX_LEVEL=4 or lower compiles ORT_LOG_FN out, in which case
+## both columns should match.
+
+import argparse
+import contextlib
+import os
+import time
+
+import torch
+import torch_ort
+
+VERBOSE = 5
+WARNING = 2
+
+@contextlib.contextmanager
+def stderr_to_devnull():
+    saved_fd = os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 2)
+        yield
+    finally:
+        os.dup2(saved_fd, 2)
+        os.close(devnull)
+        os.close(saved_fd)
+
+def time_op(op, x, iters):
+    for _ in range(10):
+        op(x)
+    start = time.perf_counter()
+    for _ in range(iters):
+        op(x)
+    return (time.perf_counter() - start) / iters * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='ORT_LOG_FN overhead benchmark')
+    parser.add_argument('--iters', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=16,
+                        help='number of elements per tensor; small tensors expose per-op overhead')
+    parser.add_argument('--ops', nargs='+',
+                        default=['abs', 'neg', 'exp', 'sigmoid', 'tanh', 'relu', 'sqrt', 'floor'])
+    args = parser.parse_args()
+
+    device = torch_ort.device.cpu()
+    x = torch.rand(args.size).to(device)
+    saved_level = torch_ort.get_log_level()
+
+    print(f'{"op":<10}{"logged (us)":>14}{"unlogged (us)":>16}{"saved (us)":>12}')
+    try:
+        for name in args.ops:
+            op = getattr(torch, name)
+            torch_ort.set_log_level(VERBOSE)
+            with stderr_to_devnull():
+                logged = time_op(op, x, args.iters)
+            torch_ort.set_log_level(WARNING)
+            unlogged = time_op(op, x, args.iters)
+            print(f'{name:<10}{logged:>14.2f}{unlogged:>16.2f}{logged - unlogged:>12.2f}')
+    finally:
+        torch_ort.set_log_level(saved_level)
+
+if __name__ == '__main__':
+    main()